@@ -1,15 +1,21 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from core.config import settings
+from core.rate_limit import RateLimit, BY_IP
 from api.admin_routes.auth import router as auth_router
 from api.admin_routes.users import router as users_router
 from api.admin_routes.inventory import router as inventory_router
 from api.admin_routes.mappings import router as mappings_router
+from api.admin_routes.boxes import router as boxes_router
+from api.admin_routes.subscriptions import router as subscriptions_router
 
 # Создаем главный роутер для админки
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(RateLimit("admin", settings.RATE_LIMIT_ADMIN_PER_IP, key=BY_IP))])
 
 # Включаем все подроутеры
 router.include_router(auth_router)
 router.include_router(users_router)
 router.include_router(inventory_router)
 router.include_router(mappings_router)
+router.include_router(boxes_router)
+router.include_router(subscriptions_router)
 
@@ -3,5 +3,7 @@ from .auth import router as auth_router
 from .users import router as users_router
 from .inventory import router as inventory_router
 from .mappings import router as mappings_router
+from .boxes import router as boxes_router
+from .subscriptions import router as subscriptions_router
 
-__all__ = ["auth_router", "users_router", "inventory_router", "mappings_router"]
\ No newline at end of file
+__all__ = ["auth_router", "users_router", "inventory_router", "mappings_router", "boxes_router", "subscriptions_router"]
\ No newline at end of file
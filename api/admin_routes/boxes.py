@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException
+from core.database import get_db
+from core.security import get_current_admin
+from services.box_generation_service import BoxGenerationService
+from services.toy_box_service import ToyBoxService
+from schemas.toy_box_schemas import (
+    BulkBoxGenerationRequest, BulkBoxGenerationResponse, DeliveryShiftRequest, DeliveryShiftResponse,
+    BoxStatusTransitionRequest, BoxStatusTransitionResponse
+)
+
+router = APIRouter(prefix="/admin", tags=["Admin Boxes"])
+
+
+@router.post("/boxes/bulk-generate", response_model=BulkBoxGenerationResponse)
+def bulk_generate_boxes(
+    request: BulkBoxGenerationRequest,
+    current_admin: dict = Depends(get_current_admin),
+    generation_service: BoxGenerationService = Depends(lambda db=Depends(get_db): BoxGenerationService(db))
+):
+    """Пакетно создать наборы: по списку подписок или для всех подписок с доставкой в due_date
+
+    Синхронный обработчик: генерация тысяч наборов выполняется в пуле потоков
+    и не блокирует event loop.
+    """
+    if (request.subscription_ids is None) == (request.due_date is None):
+        raise HTTPException(status_code=400, detail="Укажите либо subscription_ids, либо due_date")
+
+    return generation_service.generate_boxes(
+        subscription_ids=request.subscription_ids,
+        due_date=request.due_date
+    )
+
+
+@router.post("/boxes/shift-delivery", response_model=DeliveryShiftResponse)
+def shift_delivery(
+    request: DeliveryShiftRequest,
+    current_admin: dict = Depends(get_current_admin),
+    toy_box_service: ToyBoxService = Depends(lambda db=Depends(get_db): ToyBoxService(db))
+):
+    """Перенести доставку и возврат всех активных наборов из окна дат одним UPDATE (например, из-за праздников)"""
+    if request.date_from > request.date_to:
+        raise HTTPException(status_code=400, detail="date_from должна быть не позже date_to")
+    if request.days == 0:
+        raise HTTPException(status_code=400, detail="Сдвиг должен быть ненулевым")
+
+    boxes = toy_box_service.shift_delivery_window(request.date_from, request.date_to, request.days)
+    return DeliveryShiftResponse(updated=len(boxes), box_ids=[box.id for box in boxes])
+
+
+@router.post("/boxes/status", response_model=BoxStatusTransitionResponse)
+def transition_boxes_status(
+    request: BoxStatusTransitionRequest,
+    current_admin: dict = Depends(get_current_admin),
+    toy_box_service: ToyBoxService = Depends(lambda db=Depends(get_db): ToyBoxService(db))
+):
+    """Пакетно перевести наборы в статус (склад: planned -> assembled -> shipped)
+
+    Переходы проверяются по STATUS_TRANSITIONS в одном условном UPDATE; наборы,
+    которые нельзя перевести, возвращаются в rejects с причиной, остальные применяются.
+    """
+    return toy_box_service.transition_boxes_status(request.box_ids, request.status)
@@ -15,6 +15,7 @@ class InventoryItemResponse(BaseModel):
     category_id: int
     category_name: str
     available_quantity: int
+    reserved_quantity: int
     created_at: datetime
     updated_at: datetime
 
@@ -36,6 +37,7 @@ async def get_inventory(
             category_id=item.category_id,
             category_name=item.category.name if item.category else "Неизвестная категория",
             available_quantity=item.available_quantity,
+            reserved_quantity=item.reserved_quantity,
             created_at=item.created_at,
             updated_at=item.updated_at
         ))
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException
+from core.database import get_db
+from core.security import get_current_admin
+from services.subscription_service import SubscriptionService
+from schemas.subscription_schemas import DiscountRecalculationRequest, DiscountRecalculationResponse
+
+router = APIRouter(prefix="/admin", tags=["Admin Subscriptions"])
+
+
+@router.post("/subscriptions/recalculate-discounts", response_model=DiscountRecalculationResponse)
+def recalculate_discounts(
+    request: DiscountRecalculationRequest,
+    current_admin: dict = Depends(get_current_admin),
+    subscription_service: SubscriptionService = Depends(lambda db=Depends(get_db): SubscriptionService(db))
+):
+    """Пересчитать скидки многодетных пользователей (например, после изменения цены плана)"""
+    if request.user_ids is not None and request.plan_id is not None:
+        raise HTTPException(status_code=400, detail="Укажите либо user_ids, либо plan_id")
+
+    if request.user_ids is not None:
+        updated = subscription_service.recalculate_discounts_for_users(request.user_ids)
+    else:
+        updated = subscription_service.recalculate_discounts_for_plan(request.plan_id)
+    return DiscountRecalculationResponse(updated=updated)
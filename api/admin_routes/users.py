@@ -1,120 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from core.database import get_db
 from core.security import get_current_admin
 from services.user_service import UserService
-from services.child_service import ChildService
-from services.subscription_service import SubscriptionService
-from services.delivery_info_service import DeliveryInfoService
 from services.toy_box_service import ToyBoxService
+from services.admin_user_service import AdminUserService
 from models.user import UserRole
-from typing import List
-from schemas.admin_schemas import AdminUserResponse, ChildWithBoxesResponse
-from schemas.toy_box_schemas import ToyBoxResponse, NextBoxResponse, ToyBoxItemResponse, NextBoxItemResponse
+from typing import List, Optional
+from schemas.admin_schemas import AdminUserResponse
 
 router = APIRouter(prefix="/admin", tags=["Admin Users"])
 
 @router.get("/users", response_model=List[AdminUserResponse])
 async def get_all_users(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200, description="Размер страницы"),
+    after_id: Optional[int] = Query(None, description="Курсор: ID последнего пользователя предыдущей страницы"),
+    role: Optional[UserRole] = Query(None, description="Фильтр по роли"),
+    search: Optional[str] = Query(None, description="Поиск по телефону или имени"),
     current_admin: dict = Depends(get_current_admin),
-    user_service: UserService = Depends(lambda db=Depends(get_db): UserService(db)),
-    child_service: ChildService = Depends(lambda db=Depends(get_db): ChildService(db)),
-    subscription_service: SubscriptionService = Depends(lambda db=Depends(get_db): SubscriptionService(db)),
-    delivery_service: DeliveryInfoService = Depends(lambda db=Depends(get_db): DeliveryInfoService(db)),
-    toy_box_service: ToyBoxService = Depends(lambda db=Depends(get_db): ToyBoxService(db))
+    admin_user_service: AdminUserService = Depends(lambda db=Depends(get_db): AdminUserService(db))
 ):
-    """Получает всех пользователей с полной информацией для админки"""
-    
-    # Получаем всех пользователей
-    users = user_service.get_all_users()
+    """Получает пользователей с полной информацией для админки (keyset-пагинация)"""
+    users, next_cursor = admin_user_service.get_users_page(limit, after_id, role, search)
     
-    # Для каждого пользователя собираем полную информацию
-    result = []
-    for user in users:
-        # Получаем детей пользователя
-        children = child_service.get_children_by_parent(user.id)
-        
-        # Получаем адреса доставки
-        delivery_addresses = delivery_service.get_user_addresses(user.id)
-        
-        # Получаем подписки пользователя
-        user_subscriptions = subscription_service.get_user_subscriptions(user.id)
-        
-        # Получаем текущие и следующие наборы для каждого ребенка
-        children_with_boxes = []
-        for child in children:
-            current_box = toy_box_service.get_current_box_by_child(child.id)
-            next_box = toy_box_service.generate_next_box_for_child(child.id)
-            
-            # Преобразуем current_box в схему
-            current_box_response = None
-            if current_box:
-                current_box_items = []
-                if hasattr(current_box, 'items') and current_box.items:
-                    for item in current_box.items:
-                        current_box_items.append(ToyBoxItemResponse(
-                            id=item.id,
-                            toy_category_id=item.toy_category_id,
-                            quantity=item.quantity,
-                            category_name=item.category.name if item.category else "Неизвестная категория"
-                        ))
-                
-                current_box_response = ToyBoxResponse(
-                    id=current_box.id,
-                    subscription_id=current_box.subscription_id,
-                    child_id=current_box.child_id,
-                    status=current_box.status.value,
-                    delivery_date=current_box.delivery_date,
-                    return_date=current_box.return_date,
-                    delivery_time=current_box.delivery_time,
-                    return_time=current_box.return_time,
-                    items=current_box_items
-                )
-            
-            # Преобразуем next_box в схему
-            next_box_response = None
-            if next_box:
-                next_box_items = []
-                if next_box.items:
-                    for item in next_box.items:
-                        next_box_items.append(NextBoxItemResponse(
-                            toy_category_id=item.toy_category_id,
-                            quantity=item.quantity,
-                            category_name=item.category_name
-                        ))
-                
-                next_box_response = NextBoxResponse(
-                    delivery_date=next_box.delivery_date,
-                    return_date=next_box.return_date,
-                    delivery_time=next_box.delivery_time,
-                    return_time=next_box.return_time,
-                    items=next_box_items
-                )
-            
-            children_with_boxes.append(ChildWithBoxesResponse(
-                id=child.id,
-                name=child.name,
-                age=child.age,
-                current_box=current_box_response,
-                next_box=next_box_response
-            ))
-        
-        # Создаем полный ответ для пользователя
-        user_response = AdminUserResponse(
-            id=user.id,
-            name=user.name,
-            phone_number=user.phone_number,
-            email=user.email,
-            role=user.role.value,
-            created_at=user.created_at,
-            children=children_with_boxes,
-            subscriptions=user_subscriptions,
-            delivery_addresses=delivery_addresses
-        )
-        
-        result.append(user_response)
+    # Курсор следующей страницы передаем в заголовке, формат ответа не меняется
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
     
-    return result
+    return users
 
 @router.put("/users/{user_id}/role")
 async def change_user_role(
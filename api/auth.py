@@ -4,8 +4,8 @@ from functools import lru_cache
 from core.database import get_db
 from services import AuthService
 from services.user_service import UserService
-from services.otp_service import OTPService
-from services.otp_factory import get_otp_storage
+from services.otp_service import OTPService, AsyncOTPService
+from services.otp_factory import get_otp_storage, get_async_otp_storage
 from services.jwt_service import get_jwt_service
 from schemas import PhoneRequest, OTPRequest, UserResponse, DevGetCodeResponse
 from schemas.auth_schemas import (
@@ -17,9 +17,15 @@ from schemas.auth_schemas import (
     UserFromToken
 )
 from core.security import get_current_user
+from core.config import settings
+from core.rate_limit import RateLimit, BY_IP, BY_PHONE
 from core.i18n import translate
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(
+    prefix="/auth",
+    tags=["Authentication"],
+    dependencies=[Depends(RateLimit("auth", settings.RATE_LIMIT_AUTH_PER_IP, key=BY_IP))]
+)
 
 
 @lru_cache()
@@ -29,6 +35,12 @@ def get_otp_service() -> OTPService:
     return OTPService(storage)
 
 
+@lru_cache()
+def get_async_otp_service() -> AsyncOTPService:
+    """Асинхронный OTPService для async-роутов входа"""
+    return AsyncOTPService(get_async_otp_storage())
+
+
 def get_auth_service(db: Session = Depends(get_db)) -> AuthService:
     otp_service = get_otp_service()
     return AuthService(db, otp_service)
@@ -38,14 +50,14 @@ def get_user_service(db: Session = Depends(get_db)) -> UserService:
     return UserService(db)
 
 
-@router.post("/send-otp")
+@router.post("/send-otp", dependencies=[Depends(RateLimit("otp-send", settings.RATE_LIMIT_OTP_SEND_PER_PHONE, key=BY_PHONE))])
 async def send_otp(
     request: PhoneRequest,
-    auth_service: AuthService = Depends(get_auth_service),
+    otp_service: AsyncOTPService = Depends(get_async_otp_service),
     req: Request = None
 ):
     lang = req.state.lang if req and hasattr(req.state, 'lang') else 'ru'
-    success = auth_service.verify_phone(request.phone_number)
+    success = await otp_service.send_code(request.phone_number)
     
     if not success:
         print(f"API /send-otp: Не удалось отправить код для {request.phone_number}")
@@ -67,22 +79,25 @@ async def dev_get_code(
     return {"code": code}
 
 
-@router.post("/verify-otp", response_model=AuthResponse)
+@router.post(
+    "/verify-otp",
+    response_model=AuthResponse,
+    dependencies=[Depends(RateLimit("otp-verify", settings.RATE_LIMIT_OTP_VERIFY_PER_PHONE, key=BY_PHONE))]
+)
 async def verify_otp(
     request: OTPRequest,
     auth_service: AuthService = Depends(get_auth_service),
+    otp_service: AsyncOTPService = Depends(get_async_otp_service),
     req: Request = None
 ):
     lang = req.state.lang if req and hasattr(req.state, 'lang') else 'ru'
-    user = auth_service.verify_otp_and_create_user(
-        request.phone_number, 
-        request.code
-    )
-    
-    if not user:
+    # Код проверяется одним неблокирующим обращением к хранилищу
+    if not await otp_service.verify_code(request.phone_number, request.code):
         print(f"API /verify-otp: Неверный код для {request.phone_number}")
         raise HTTPException(status_code=400, detail=translate('invalid_code', lang))
     
+    user = auth_service.get_or_create_user(request.phone_number)
+    
     # Создаем токены
     tokens = auth_service.create_tokens_for_user(user)
     
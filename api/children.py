@@ -1,15 +1,19 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from core.database import get_db
 from core.security import get_current_user
 from core.i18n import translate
 from services.child_service import ChildService
+from services.ownership_service import OwnershipService
 from services.subscription_service import SubscriptionService
 from services.subscription_plan_service import SubscriptionPlanService
 from schemas.child_schemas import ChildCreate, ChildResponse, ChildUpdate
 from schemas.auth_schemas import UserFromToken
 from schemas.subscription_schemas import SubscriptionCreateRequest
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/children", tags=["Children"])
 
 
@@ -25,6 +29,19 @@ def get_subscription_plan_service(db: Session = Depends(get_db)) -> Subscription
     return SubscriptionPlanService(db)
 
 
+def get_ownership_service(db: Session = Depends(get_db)) -> OwnershipService:
+    return OwnershipService(db)
+
+
+def check_child_access(ownership: OwnershipService, child_id: int, user_id: int, lang: str) -> None:
+    """404, если ребенка нет, и 403, если он не принадлежит пользователю (без загрузки ребенка)"""
+    owner_id = ownership.get_child_owner_id(child_id)
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail=translate('child_not_found', lang))
+    if owner_id != user_id:
+        raise HTTPException(status_code=403, detail=translate('no_access_to_child', lang))
+
+
 @router.post("/", response_model=ChildResponse)
 async def create_child(
     child_data: ChildCreate,
@@ -63,16 +80,15 @@ async def create_child(
         
     except Exception as e:
         # Логируем ошибку, но не прерываем создание ребенка
-        print(f"Ошибка при создании базовой подписки: {e}")
+        logger.exception("Ошибка при создании базовой подписки для ребенка %s", child.id)
     
     # Получаем обновленного ребенка с подпиской из БД
     updated_child = child_service.get_child_by_id(child.id)
     if updated_child:
-        print(f"Обновленный ребенок: {updated_child}")
         return updated_child
     else:
         # Если не удалось получить обновленного ребенка, возвращаем исходный
-        print(f"Не удалось получить обновленного ребенка: {child.id}")
+        logger.warning("Не удалось получить обновленного ребенка: %s", child.id)
         return ChildResponse.model_validate(child)
 
 
@@ -81,17 +97,17 @@ async def get_child(
     child_id: int,
     current_user: UserFromToken = Depends(get_current_user),
     child_service: ChildService = Depends(get_child_service),
+    ownership: OwnershipService = Depends(get_ownership_service),
     request: Request = None
 ):
-    child = child_service.get_child_by_id(child_id)
     lang = request.state.lang if request and hasattr(request.state, 'lang') else 'ru'
+    # Проверяем что ребенок принадлежит текущему пользователю
+    check_child_access(ownership, child_id, current_user.id, lang)
+    
+    child = child_service.get_child_by_id(child_id)
     if not child:
         raise HTTPException(status_code=404, detail=translate('child_not_found', lang))
     
-    # Проверяем что ребенок принадлежит текущему пользователю
-    if child.parent_id != current_user.id:
-        raise HTTPException(status_code=403, detail=translate('no_access_to_child', lang))
-    
     return child
 
 
@@ -101,17 +117,13 @@ async def update_child(
     update_data: ChildUpdate,
     current_user: UserFromToken = Depends(get_current_user),
     child_service: ChildService = Depends(get_child_service),
+    ownership: OwnershipService = Depends(get_ownership_service),
     request: Request = None
 ):
     lang = request.state.lang if request and hasattr(request.state, 'lang') else 'ru'
     """Обновить ребенка (включая интересы и навыки)"""
     # Сначала проверяем что ребенок существует и принадлежит пользователю
-    existing_child = child_service.get_child_by_id(child_id)
-    if not existing_child:
-        raise HTTPException(status_code=404, detail=translate('child_not_found', lang))
-    
-    if existing_child.parent_id != current_user.id:
-        raise HTTPException(status_code=403, detail=translate('no_access_to_child', lang))
+    check_child_access(ownership, child_id, current_user.id, lang)
     
     child = child_service.update_child(child_id, update_data)
     if not child:
@@ -126,17 +138,13 @@ async def delete_child(
     current_user: UserFromToken = Depends(get_current_user),
     child_service: ChildService = Depends(get_child_service),
     subscription_service: SubscriptionService = Depends(get_subscription_service),
+    ownership: OwnershipService = Depends(get_ownership_service),
     request: Request = None
 ):
     lang = request.state.lang if request and hasattr(request.state, 'lang') else 'ru'
     """Удалить ребенка"""
     # Сначала проверяем что ребенок существует и принадлежит пользователю
-    existing_child = child_service.get_child_by_id(child_id)
-    if not existing_child:
-        raise HTTPException(status_code=404, detail=translate('child_not_found', lang))
-    
-    if existing_child.parent_id != current_user.id:
-        raise HTTPException(status_code=403, detail=translate('no_access_to_child', lang))
+    check_child_access(ownership, child_id, current_user.id, lang)
     
     # Удаляем ребенка с callback для пересчета скидок
     success = child_service.delete_child(
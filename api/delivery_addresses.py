@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from core.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from core.database import get_db, get_async_db, resolve
 from core.security import get_current_user
-from services.delivery_info_service import DeliveryInfoService
+from services.delivery_info_service import DeliveryInfoService, AsyncDeliveryInfoService
 from schemas.auth_schemas import UserFromToken
 from schemas.delivery_info_schemas import (
     DeliveryInfoCreate,
@@ -20,14 +22,21 @@ def get_delivery_service(db: Session = Depends(get_db)) -> DeliveryInfoService:
     return DeliveryInfoService(db)
 
 
+def get_async_delivery_service(db: AsyncSession = Depends(get_async_db)) -> AsyncDeliveryInfoService:
+    return AsyncDeliveryInfoService(db)
+
+
+get_delivery_reader = get_async_delivery_service if settings.DB_ASYNC_ENABLED else get_delivery_service
+
+
 @router.get("/", response_model=DeliveryInfoListResponse)
 async def get_user_delivery_addresses(
     current_user: UserFromToken = Depends(get_current_user),
     limit: Optional[int] = Query(None, description="Максимальное количество адресов"),
-    delivery_service: DeliveryInfoService = Depends(get_delivery_service)
+    delivery_service: DeliveryInfoService = Depends(get_delivery_reader)
 ):
     """Получить адреса доставки текущего пользователя"""
-    return delivery_service.get_user_addresses(current_user.id, limit)
+    return await resolve(delivery_service.get_user_addresses(current_user.id, limit))
 
 
 @router.post("/", response_model=DeliveryInfoResponse)
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
-from core.database import get_db
-from services.interest_service import InterestService
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from core.database import get_db, get_async_db, resolve
+from core.http_cache import etag_response
+from services.interest_service import InterestService, AsyncInterestService
 from schemas.interest_schemas import InterestsListResponse
 
 router = APIRouter(prefix="/interests", tags=["Interests"])
@@ -11,11 +14,18 @@ def get_interest_service(db: Session = Depends(get_db)) -> InterestService:
     return InterestService(db)
 
 
+def get_async_interest_service(db: AsyncSession = Depends(get_async_db)) -> AsyncInterestService:
+    return AsyncInterestService(db)
+
+
+get_interest_service_dependency = get_async_interest_service if settings.DB_ASYNC_ENABLED else get_interest_service
+
+
 @router.get("/", response_model=InterestsListResponse)
 async def get_all_interests(
     request: Request,
-    interest_service: InterestService = Depends(get_interest_service)
+    interest_service: InterestService = Depends(get_interest_service_dependency)
 ):
     """Получить все интересы"""
     lang = request.state.lang if hasattr(request.state, 'lang') else 'ru'
-    return interest_service.get_all_interests(lang) 
\ No newline at end of file
+    return etag_response(request, await resolve(interest_service.get_all_interests(lang))) 
\ No newline at end of file
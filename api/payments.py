@@ -2,10 +2,15 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from core.database import get_db
 from core.security import get_current_user
+from core.config import settings
+from core.rate_limit import RateLimit, BY_USER
 from services.payment_service import PaymentService
+from services.payment_job_queue import get_payment_job_queue
 from schemas.auth_schemas import UserFromToken
 from schemas.payment_schemas import (
     PaymentResult,
+    PaymentStatusEnum,
+    PaymentJobResponse,
     BatchPaymentCreateRequest,
     BatchPaymentResponse,
     ProcessPaymentResponse,
@@ -17,7 +22,11 @@ from schemas.payment_schemas import (
 from typing import List
 from core.i18n import translate
 
-router = APIRouter(prefix="/payments", tags=["Payments"])
+router = APIRouter(
+    prefix="/payments",
+    tags=["Payments"],
+    dependencies=[Depends(RateLimit("payments", settings.RATE_LIMIT_PAYMENTS_PER_USER, key=BY_USER))]
+)
 
 
 def get_payment_service(db: Session = Depends(get_db)) -> PaymentService:
@@ -61,14 +70,9 @@ async def process_payment(
 ):
     lang = req.state.lang if req and hasattr(req.state, 'lang') else 'ru'
     try:
-        # Асинхронно обрабатываем платеж с имитацией времени
-        success = await payment_service.process_payment_async(payment_id)
-        
-        if success:
-            # Подписки активируются автоматически через property status
-            return ProcessPaymentResponse(status="success", message=translate('payment_success', lang))
-        else:
-            return ProcessPaymentResponse(status="failed", message=translate('payment_failed', lang))
+        # Обработка у банка занимает секунды - отдаем ее фоновому воркеру
+        job = get_payment_job_queue().enqueue(payment_id, current_user.id)
+        return ProcessPaymentResponse(status="pending", message=translate('payment_queued', lang), job_id=job["job_id"])
     except Exception as e:
         raise HTTPException(status_code=500, detail=translate('payment_processing_error', lang))
 
@@ -82,14 +86,19 @@ async def process_subscriptions(
 ):
     lang = req.state.lang if req and hasattr(req.state, 'lang') else 'ru'
     try:
-        # Создаем платеж и сразу обрабатываем его
-        result = await payment_service.create_and_process_payment(request.subscription_ids)
+        # Создаем платеж, а обработку у банка и создание наборов выполняет фоновый воркер
+        payment_id, amount = payment_service.prepare_payment_for_subscriptions(request.subscription_ids)
+        
+        # Воркер работает в своей сессии, поэтому платеж должен быть зафиксирован до постановки в очередь
+        payment_service.db.commit()
+        job = get_payment_job_queue().enqueue(payment_id, current_user.id)
         
         return ProcessSubscriptionsResponse(
-            status=result.status,
-            message=result.message,
-            payment_id=result.payment_id,
-            amount=result.amount
+            status=PaymentStatusEnum.PENDING,
+            message=translate('payment_queued', lang),
+            payment_id=payment_id,
+            amount=amount,
+            job_id=job["job_id"]
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -98,6 +107,21 @@ async def process_subscriptions(
         raise HTTPException(status_code=500, detail=translate('internal_server_error', lang))
 
 
+@router.get("/jobs/{job_id}", response_model=PaymentJobResponse)
+async def get_payment_job(
+    job_id: str,
+    current_user: UserFromToken = Depends(get_current_user),
+    req: Request = None
+):
+    lang = req.state.lang if req and hasattr(req.state, 'lang') else 'ru'
+    """Статус фоновой обработки платежа (для polling)"""
+    job = get_payment_job_queue().get_job(job_id)
+    if not job or job["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail=translate('payment_job_not_found', lang))
+    
+    return PaymentJobResponse(**job)
+
+
 @router.post("/return")
 async def payment_return(
     request: PaymentReturnRequest,
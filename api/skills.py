@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
-from core.database import get_db
-from services.skill_service import SkillService
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from core.database import get_db, get_async_db, resolve
+from core.http_cache import etag_response
+from services.skill_service import SkillService, AsyncSkillService
 from schemas.skill_schemas import SkillsListResponse
 
 router = APIRouter(prefix="/skills", tags=["Skills"])
@@ -11,11 +14,18 @@ def get_skill_service(db: Session = Depends(get_db)) -> SkillService:
     return SkillService(db)
 
 
+def get_async_skill_service(db: AsyncSession = Depends(get_async_db)) -> AsyncSkillService:
+    return AsyncSkillService(db)
+
+
+get_skill_service_dependency = get_async_skill_service if settings.DB_ASYNC_ENABLED else get_skill_service
+
+
 @router.get("/", response_model=SkillsListResponse)
 async def get_all_skills(
     request: Request,
-    skill_service: SkillService = Depends(get_skill_service)
+    skill_service: SkillService = Depends(get_skill_service_dependency)
 ):
     """Получить все навыки"""
     lang = request.state.lang if hasattr(request.state, 'lang') else 'ru'
-    return skill_service.get_all_skills(lang) 
\ No newline at end of file
+    return etag_response(request, await resolve(skill_service.get_all_skills(lang))) 
\ No newline at end of file
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
-from core.database import get_db
-from services.subscription_plan_service import SubscriptionPlanService
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from core.database import get_db, get_async_db, resolve
+from core.http_cache import etag_response
+from services.subscription_plan_service import SubscriptionPlanService, AsyncSubscriptionPlanService
 from schemas.subscription_plan_schemas import SubscriptionPlansListResponse
 
 router = APIRouter(prefix="/subscription-plans", tags=["Subscription Plans"])
@@ -11,11 +14,18 @@ def get_subscription_plan_service(db: Session = Depends(get_db)) -> Subscription
     return SubscriptionPlanService(db)
 
 
+def get_async_subscription_plan_service(db: AsyncSession = Depends(get_async_db)) -> AsyncSubscriptionPlanService:
+    return AsyncSubscriptionPlanService(db)
+
+
+get_subscription_plan_service_dependency = get_async_subscription_plan_service if settings.DB_ASYNC_ENABLED else get_subscription_plan_service
+
+
 @router.get("/", response_model=SubscriptionPlansListResponse)
 async def get_all_subscription_plans(
     request: Request,
-    plan_service: SubscriptionPlanService = Depends(get_subscription_plan_service)
+    plan_service: SubscriptionPlanService = Depends(get_subscription_plan_service_dependency)
 ):
     """Получить все планы подписки с конфигурациями игрушек"""
     lang = request.state.lang if hasattr(request.state, 'lang') else 'ru'
-    return plan_service.get_all_plans(lang) 
\ No newline at end of file
+    return etag_response(request, await resolve(plan_service.get_all_plans(lang))) 
\ No newline at end of file
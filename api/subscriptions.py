@@ -1,8 +1,10 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from core.database import get_db
 from core.security import get_current_user
 from services.subscription_service import SubscriptionService
+from services.ownership_service import OwnershipService
 from schemas.auth_schemas import UserFromToken
 from schemas.subscription_schemas import (
     SubscriptionCreateRequest,
@@ -15,6 +17,8 @@ from schemas.subscription_schemas import (
 from typing import List
 from core.i18n import translate
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/subscriptions", tags=["Subscriptions"])
 
 
@@ -22,23 +26,40 @@ def get_subscription_service(db: Session = Depends(get_db)) -> SubscriptionServi
     return SubscriptionService(db)
 
 
+def get_ownership_service(db: Session = Depends(get_db)) -> OwnershipService:
+    return OwnershipService(db)
+
+
+def check_subscription_access(ownership: OwnershipService, subscription_id: int, user_id: int, lang: str) -> None:
+    """404, если подписки нет, и 403, если она не принадлежит пользователю (без загрузки подписки)"""
+    owner_id = ownership.get_subscription_owner_id(subscription_id)
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail=translate('subscription_not_found', lang))
+    if owner_id != user_id:
+        raise HTTPException(status_code=403, detail=translate('no_access_to_subscription', lang))
+
+
 @router.post("/", response_model=SubscriptionResponse)
 async def create_subscription_order(
     request: SubscriptionCreateRequest,
     current_user: UserFromToken = Depends(get_current_user),
     subscription_service: SubscriptionService = Depends(get_subscription_service),
+    ownership: OwnershipService = Depends(get_ownership_service),
     req: Request = None
 ):
     lang = req.state.lang if req and hasattr(req.state, 'lang') else 'ru'
     """Создает заказ подписки для текущего пользователя"""
-    # TODO: Здесь нужно проверить что child_id принадлежит current_user
-    # Пока оставляю как есть, но нужно добавить проверку
+    owner_id = ownership.get_child_owner_id(request.child_id)
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail=translate('child_not_found', lang))
+    if owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail=translate('no_access_to_child', lang))
     try:
         return subscription_service.create_subscription_order(request)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"Ошибка при создании заказа подписки: {e}")
+        logger.exception("Ошибка при создании заказа подписки")
         raise HTTPException(status_code=500, detail=translate('internal_server_error', lang))
 
 
@@ -51,15 +72,11 @@ async def get_user_subscriptions(
     lang = req.state.lang if req and hasattr(req.state, 'lang') else 'ru'
     """Получает подписки текущего пользователя"""
     try:
-        print(f"DEBUG: Получаем подписки для пользователя {current_user.id}")
         subscriptions = subscription_service.get_user_subscriptions(current_user.id)
-        print(f"DEBUG: Получено {len(subscriptions)} подписок")
+        logger.debug("Получено %s подписок пользователя %s", len(subscriptions), current_user.id)
         return subscriptions
     except Exception as e:
-        print(f"ERROR: Ошибка в get_user_subscriptions: {e}")
-        print(f"ERROR: Тип ошибки: {type(e)}")
-        import traceback
-        print(f"ERROR: Traceback: {traceback.format_exc()}")
+        logger.exception("Ошибка при получении подписок пользователя %s", current_user.id)
         raise HTTPException(status_code=500, detail=translate('error_getting_subscriptions', lang) + f": {str(e)}")
 
 
@@ -68,18 +85,17 @@ async def get_subscription(
     subscription_id: int,
     current_user: UserFromToken = Depends(get_current_user),
     subscription_service: SubscriptionService = Depends(get_subscription_service),
+    ownership: OwnershipService = Depends(get_ownership_service),
     req: Request = None
 ):
     lang = req.state.lang if req and hasattr(req.state, 'lang') else 'ru'
     """Получает подписку по ID"""
+    check_subscription_access(ownership, subscription_id, current_user.id, lang)
+    
     subscription = subscription_service.get_subscription_by_id(subscription_id)
     if not subscription:
         raise HTTPException(status_code=404, detail=translate('subscription_not_found', lang))
     
-    # TODO: Проверить что подписка принадлежит текущему пользователю
-    # if subscription.user_id != current_user.id:
-    #     raise HTTPException(status_code=403, detail="Нет доступа к этой подписке")
-    
     return subscription
 
 @router.patch("/{subscription_id}", response_model=SubscriptionResponse)
@@ -88,11 +104,12 @@ async def update_subscription(
     update_data: SubscriptionUpdateRequest,
     current_user: UserFromToken = Depends(get_current_user),
     subscription_service: SubscriptionService = Depends(get_subscription_service),
+    ownership: OwnershipService = Depends(get_ownership_service),
     req: Request = None
 ):
     lang = req.state.lang if req and hasattr(req.state, 'lang') else 'ru'
     """Обновляет подписку"""
-    # TODO: Проверить что подписка принадлежит текущему пользователю
+    check_subscription_access(ownership, subscription_id, current_user.id, lang)
     try:
         subscription = subscription_service.update_subscription(subscription_id, update_data)
         if not subscription:
@@ -101,7 +118,7 @@ async def update_subscription(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"Ошибка при обновлении подписки: {e}")
+        logger.exception("Ошибка при обновлении подписки")
         raise HTTPException(status_code=500, detail=translate('internal_server_error', lang))
 
 
@@ -155,6 +172,6 @@ async def recalculate_discounts(
         subscription_service.recalculate_discounts_for_user(current_user.id)
         return {"message": translate('discounts_recalculated', lang)}
     except Exception as e:
-        print(f"Ошибка при пересчете скидок: {e}")
+        logger.exception("Ошибка при пересчете скидок")
         raise HTTPException(status_code=500, detail=translate('error_recalculating_discounts', lang))
  
\ No newline at end of file
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from core.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from core.database import get_db, get_async_db, resolve
 from core.security import get_current_user
-from services.toy_box_service import ToyBoxService
+from services.toy_box_service import ToyBoxService, AsyncToyBoxService
+from services.ownership_service import OwnershipService
+from api.children import check_child_access, get_ownership_service
 from schemas.auth_schemas import UserFromToken
 from schemas.toy_box_schemas import (
     ToyBoxResponse,
@@ -13,7 +17,7 @@ from schemas.toy_box_schemas import (
     NextBoxResponse
 )
 from models.toy_box import ToyBoxStatus
-from typing import List
+from typing import List, Optional
 from core.i18n import translate
 
 router = APIRouter(prefix="/toy-boxes", tags=["Toy Boxes"])
@@ -23,17 +27,25 @@ def get_toy_box_service(db: Session = Depends(get_db)) -> ToyBoxService:
     return ToyBoxService(db)
 
 
+def get_async_toy_box_service(db: AsyncSession = Depends(get_async_db)) -> AsyncToyBoxService:
+    return AsyncToyBoxService(db)
+
+
+get_toy_box_reader = get_async_toy_box_service if settings.DB_ASYNC_ENABLED else get_toy_box_service
+
+
 @router.get("/current/{child_id}", response_model=ToyBoxResponse)
 async def get_current_box(
     child_id: int,
     current_user: UserFromToken = Depends(get_current_user),
-    toy_box_service: ToyBoxService = Depends(get_toy_box_service),
+    toy_box_service: ToyBoxService = Depends(get_toy_box_reader),
+    ownership: OwnershipService = Depends(get_ownership_service),
     req: Request = None
 ):
     lang = req.state.lang if req and hasattr(req.state, 'lang') else 'ru'
     """Получить текущий набор ребёнка"""
-    # TODO: Проверить что ребенок принадлежит текущему пользователю
-    current_box = toy_box_service.get_current_box_by_child(child_id)
+    check_child_access(ownership, child_id, current_user.id, lang)
+    current_box = await resolve(toy_box_service.get_current_box_by_child(child_id))
     
     if not current_box:
         raise HTTPException(status_code=404, detail=translate('current_box_not_found', lang))
@@ -44,11 +56,14 @@ async def get_current_box(
 @router.get("/next/{child_id}", response_model=NextBoxResponse)
 async def get_next_box(
     child_id: int,
+    current_user: UserFromToken = Depends(get_current_user),
     toy_box_service: ToyBoxService = Depends(get_toy_box_service),
+    ownership: OwnershipService = Depends(get_ownership_service),
     req: Request = None
 ):
     lang = req.state.lang if req and hasattr(req.state, 'lang') else 'ru'
     """Получить следующий набор для ребёнка (генерируется на лету)"""
+    check_child_access(ownership, child_id, current_user.id, lang)
     try:
         next_box = toy_box_service.generate_next_box_for_child(child_id)
         if not next_box:
@@ -105,15 +120,30 @@ async def get_box_reviews(
     return ToyBoxReviewsResponse(reviews=review_responses)
 
 
+# Наибольший размер страницы истории наборов
+HISTORY_PAGE_MAX = 100
+
+
 @router.get("/history", response_model=ToyBoxListResponse)
 async def get_box_history(
+    response: Response,
     current_user: UserFromToken = Depends(get_current_user),
-    limit: int = 10,
+    limit: int = Query(10, ge=1, description=f"Размер страницы, не больше {HISTORY_PAGE_MAX}"),
     status: List[ToyBoxStatus] = Query(default=[], description="Filter by status"),
-    toy_box_service: ToyBoxService = Depends(get_toy_box_service)
+    after_id: Optional[int] = Query(None, description="Курсор: ID последнего набора предыдущей страницы"),
+    toy_box_service: ToyBoxService = Depends(get_toy_box_reader)
 ):
-    """Получить историю наборов текущего пользователя"""
-    boxes = toy_box_service.get_box_history_by_user(current_user.id, limit, status)
+    """Получить историю наборов текущего пользователя (keyset-пагинация, новые первыми)"""
+    # Старые клиенты запрашивают всю историю большим limit - отдаем первую страницу, а не 422
+    limit = min(limit, HISTORY_PAGE_MAX)
+    boxes, next_cursor = await resolve(
+        toy_box_service.get_box_history_page(current_user.id, limit, status, after_id)
+    )
+    
+    # Курсор следующей страницы передаем в заголовке, формат ответа не меняется
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    
     box_responses = [ToyBoxResponse.model_validate(box) for box in boxes]
     return ToyBoxListResponse(boxes=box_responses)
 
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
-from core.database import get_db
-from services.toy_category_service import ToyCategoryService
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from core.database import get_db, get_async_db, resolve
+from core.http_cache import etag_response
+from services.toy_category_service import ToyCategoryService, AsyncToyCategoryService
 from schemas.toy_category_schemas import ToyCategoriesListResponse
 
 router = APIRouter(prefix="/toy-categories", tags=["Toy Categories"])
@@ -11,11 +14,18 @@ def get_toy_category_service(db: Session = Depends(get_db)) -> ToyCategoryServic
     return ToyCategoryService(db)
 
 
+def get_async_toy_category_service(db: AsyncSession = Depends(get_async_db)) -> AsyncToyCategoryService:
+    return AsyncToyCategoryService(db)
+
+
+get_toy_category_service_dependency = get_async_toy_category_service if settings.DB_ASYNC_ENABLED else get_toy_category_service
+
+
 @router.get("/", response_model=ToyCategoriesListResponse)
 async def get_all_toy_categories(
     request: Request,
-    toy_category_service: ToyCategoryService = Depends(get_toy_category_service)
+    toy_category_service: ToyCategoryService = Depends(get_toy_category_service_dependency)
 ):
     """Получить все категории игрушек"""
     lang = request.state.lang if hasattr(request.state, 'lang') else 'ru'
-    return toy_category_service.get_all_categories(lang) 
\ No newline at end of file
+    return etag_response(request, await resolve(toy_category_service.get_all_categories(lang))) 
\ No newline at end of file
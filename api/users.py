@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from core.database import get_db
+from core.config import settings
+from core.database import get_db, get_async_db, resolve
 from core.security import get_current_user
 from core.i18n import translate
-from services.user_service import UserService
-from services.child_service import ChildService
+from services.user_service import UserService, AsyncUserService
+from services.child_service import ChildService, AsyncChildService
 from schemas import UserProfileUpdateRequest, UserProfileResponse, UserProfileUpdateResponse, ChildResponse
 from schemas.auth_schemas import UserFromToken
 
@@ -20,14 +22,26 @@ def get_child_service(db: Session = Depends(get_db)) -> ChildService:
     return ChildService(db)
 
 
+def get_async_user_service(db: AsyncSession = Depends(get_async_db)) -> AsyncUserService:
+    return AsyncUserService(db)
+
+
+def get_async_child_service(db: AsyncSession = Depends(get_async_db)) -> AsyncChildService:
+    return AsyncChildService(db)
+
+
+get_user_reader = get_async_user_service if settings.DB_ASYNC_ENABLED else get_user_service
+get_child_reader = get_async_child_service if settings.DB_ASYNC_ENABLED else get_child_service
+
+
 @router.get("/profile", response_model=UserProfileResponse)
 async def get_user_profile(
     current_user: UserFromToken = Depends(get_current_user),
-    user_service: UserService = Depends(get_user_service),
+    user_service: UserService = Depends(get_user_reader),
     request: Request = None
 ):
     lang = request.state.lang if request and hasattr(request.state, 'lang') else 'ru'
-    user = user_service.get_user_by_id(current_user.id)
+    user = await resolve(user_service.get_user_by_id(current_user.id))
     if not user:
         raise HTTPException(status_code=404, detail=translate('user_not_found', lang))
     
@@ -52,8 +66,8 @@ async def update_user_profile(
 @router.get("/children", response_model=List[ChildResponse])
 async def get_user_children(
     current_user: UserFromToken = Depends(get_current_user),
-    child_service: ChildService = Depends(get_child_service)
+    child_service: ChildService = Depends(get_child_reader)
 ):
     """Получает детей текущего пользователя с интересами и навыками"""
-    children = child_service.get_children_by_parent(current_user.id)
+    children = await resolve(child_service.get_children_by_parent(current_user.id))
     return children 
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+Микро-бенчмарк проверки JWT: полный jose.jwt.decode против кэша проверенных токенов.
+
+Запуск из корня репозитория:
+    python -m benchmarks.jwt_decode [--tokens 100] [--rounds 20000]
+
+Эмулирует «болтливых» клиентов: небольшое число активных токенов,
+каждый предъявляется много раз подряд.
+"""
+import argparse
+import time
+
+from core.config import settings
+from services.jwt_service import JWTService
+
+
+def _run(service: JWTService, tokens: list, rounds: int) -> float:
+    """Возвращает среднее время одной проверки в микросекундах"""
+    started = time.perf_counter()
+    for i in range(rounds):
+        if service.verify_token(tokens[i % len(tokens)]) is None:
+            raise RuntimeError("token rejected")
+    return (time.perf_counter() - started) / rounds * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=100, help="число различных токенов")
+    parser.add_argument("--rounds", type=int, default=20000, help="число проверок")
+    args = parser.parse_args()
+
+    settings.JWT_CACHE_MAX_ENTRIES = 0
+    uncached = JWTService()
+    settings.JWT_CACHE_MAX_ENTRIES = max(args.tokens, 1)
+    cached = JWTService()
+
+    tokens = [
+        uncached.create_access_token(user_id, f"+99890{user_id:07d}", "Bench")
+        for user_id in range(1, args.tokens + 1)
+    ]
+
+    before = _run(uncached, tokens, args.rounds)
+    after = _run(cached, tokens, args.rounds)
+
+    print(f"tokens={args.tokens} rounds={args.rounds}")
+    print(f"jose.jwt.decode:  {before:8.2f} us/op")
+    print(f"verified cache:   {after:8.2f} us/op")
+    print(f"speedup:          {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
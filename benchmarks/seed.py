@@ -0,0 +1,196 @@
+"""
+Генератор нагрузочных данных для бенчмарков.
+
+Создает поверх справочников (initialize_all_data) реалистичный набор:
+пользователи с адресом доставки, 1-3 ребенка с интересами и навыками,
+по подписке на ребенка, оплаченный пакетный платеж пользователя и история
+наборов с составом. Вставка идет пачками INSERT ... RETURNING, поэтому
+работает одинаково на SQLite и PostgreSQL и не ломает последовательности id.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from models.child import Child, Gender
+from models.delivery_info import DeliveryInfo
+from models.interest import Interest, child_interests
+from models.payment import Payment, PaymentStatus
+from models.skill import Skill, child_skills
+from models.subscription import Subscription, SubscriptionStatus
+from models.subscription_plan import SubscriptionPlan
+from models.toy_box import ToyBox, ToyBoxItem, ToyBoxStatus
+from models.toy_category import ToyCategory
+from models.user import User, UserRole
+
+CHUNK_SIZE = 1000
+PHONE_PREFIX = "+99877"
+DELIVERY_TIMES = ["09:00-12:00", "12:00-15:00", "15:00-18:00", "18:00-21:00"]
+
+
+@dataclass
+class SeedResult:
+    """Что создал генератор: id для сценариев и размеры набора для отчета"""
+    user_ids: List[int] = field(default_factory=list)
+    child_ids: List[int] = field(default_factory=list)
+    phones: Dict[int, str] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+def _insert_returning_ids(db: Session, model, rows: List[dict]) -> List[int]:
+    """Пакетная вставка с возвратом id в порядке строк"""
+    ids: List[int] = []
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        ids.extend(db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), chunk).all())
+    return ids
+
+
+def _insert(db: Session, table, rows: List[dict]) -> None:
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.execute(insert(table), rows[start:start + CHUNK_SIZE])
+
+
+def seed_dataset(db: Session, users: int, boxes_per_child: int = 6, seed: int = 42) -> SeedResult:
+    """Создает users пользователей со всеми связанными данными и коммитит их"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    today = now.date()
+    result = SeedResult()
+
+    interest_ids = list(db.scalars(select(Interest.id)))
+    skill_ids = list(db.scalars(select(Skill.id)))
+    category_ids = list(db.scalars(select(ToyCategory.id)))
+    plans = db.execute(select(SubscriptionPlan.id, SubscriptionPlan.price_monthly)).all()
+    if not (interest_ids and skill_ids and category_ids and plans):
+        raise RuntimeError("Справочники пусты: сначала выполните initialize_all_data")
+
+    # Номера телефонов продолжают уже существующих пользователей, повторный запуск не конфликтует
+    phone_offset = db.scalar(select(func.count(User.id))) or 0
+
+    # Пользователи
+    user_rows = [
+        {
+            "phone_number": f"{PHONE_PREFIX}{phone_offset + i:07d}",
+            "name": f"Bench User {phone_offset + i}",
+            "role": UserRole.USER,
+            "created_at": now - timedelta(days=rng.randint(1, 365)),
+        }
+        for i in range(users)
+    ]
+    result.user_ids = _insert_returning_ids(db, User, user_rows)
+    result.phones = {user_id: row["phone_number"] for user_id, row in zip(result.user_ids, user_rows)}
+
+    # Адрес доставки на пользователя
+    delivery_ids = _insert_returning_ids(db, DeliveryInfo, [
+        {
+            "user_id": user_id,
+            "name": "Дом",
+            "address": f"Ташкент, ул. Тестовая, {user_id}",
+            "date": today + timedelta(days=rng.randint(1, 14)),
+            "time": rng.choice(DELIVERY_TIMES),
+        }
+        for user_id in result.user_ids
+    ])
+    delivery_by_user = dict(zip(result.user_ids, delivery_ids))
+
+    # Дети
+    child_rows = []
+    for user_id in result.user_ids:
+        for n in range(rng.randint(1, 3)):
+            child_rows.append({
+                "name": f"Child {user_id}-{n}",
+                "date_of_birth": today - timedelta(days=rng.randint(365, 365 * 10)),
+                "gender": rng.choice(list(Gender)),
+                "has_limitations": False,
+                "parent_id": user_id,
+                "is_deleted": False,
+            })
+    result.child_ids = _insert_returning_ids(db, Child, child_rows)
+    parent_by_child = {child_id: row["parent_id"] for child_id, row in zip(result.child_ids, child_rows)}
+
+    _insert(db, child_interests, [
+        {"child_id": child_id, "interest_id": interest_id}
+        for child_id in result.child_ids
+        for interest_id in rng.sample(interest_ids, min(2, len(interest_ids)))
+    ])
+    _insert(db, child_skills, [
+        {"child_id": child_id, "skill_id": skill_id}
+        for child_id in result.child_ids
+        for skill_id in rng.sample(skill_ids, min(2, len(skill_ids)))
+    ])
+
+    # Один завершенный платеж на пользователя за все подписки его детей
+    child_plans = {child_id: rng.choice(plans) for child_id in result.child_ids}
+    totals: Dict[int, float] = {}
+    for child_id, (_, price) in child_plans.items():
+        totals[parent_by_child[child_id]] = totals.get(parent_by_child[child_id], 0.0) + price
+    payment_ids = _insert_returning_ids(db, Payment, [
+        {
+            "user_id": user_id,
+            "amount": totals[user_id],
+            "currency": "RUB",
+            "status": PaymentStatus.COMPLETED,
+            "external_payment_id": f"bench_{user_id}",
+        }
+        for user_id in result.user_ids
+    ])
+    payment_by_user = dict(zip(result.user_ids, payment_ids))
+
+    # Подписки: большинство активны, часть на паузе
+    subscription_rows = []
+    for child_id in result.child_ids:
+        plan_id, price = child_plans[child_id]
+        user_id = parent_by_child[child_id]
+        paused = rng.random() < 0.1
+        subscription_rows.append({
+            "child_id": child_id,
+            "plan_id": plan_id,
+            "delivery_info_id": delivery_by_user[user_id],
+            "payment_id": payment_by_user[user_id],
+            "discount_percent": 0.0,
+            "individual_price": price,
+            "expires_at": now + timedelta(days=rng.randint(5, 30)),
+            "created_at": now - timedelta(days=boxes_per_child * 15),
+            "is_paused": paused,
+            "stored_status": SubscriptionStatus.PAUSED if paused else SubscriptionStatus.ACTIVE,
+        })
+    subscription_ids = _insert_returning_ids(db, Subscription, subscription_rows)
+
+    # История наборов: старые возвращены, последний в работе
+    box_rows = []
+    for subscription_id, row in zip(subscription_ids, subscription_rows):
+        for n in range(boxes_per_child):
+            delivery_date = today - timedelta(days=(boxes_per_child - n - 1) * 15)
+            is_last = n == boxes_per_child - 1
+            box_rows.append({
+                "subscription_id": subscription_id,
+                "child_id": row["child_id"],
+                "delivery_info_id": row["delivery_info_id"],
+                "status": rng.choice([ToyBoxStatus.PLANNED, ToyBoxStatus.DELIVERED]) if is_last else ToyBoxStatus.RETURNED,
+                "delivery_date": delivery_date,
+                "return_date": delivery_date + timedelta(days=14),
+                "delivery_time": rng.choice(DELIVERY_TIMES),
+                "return_time": rng.choice(DELIVERY_TIMES),
+                "created_at": now - timedelta(days=(boxes_per_child - n) * 15, seconds=rng.randint(0, 3600)),
+            })
+    box_ids = _insert_returning_ids(db, ToyBox, box_rows)
+
+    _insert(db, ToyBoxItem, [
+        {"box_id": box_id, "toy_category_id": category_id, "quantity": rng.randint(1, 2)}
+        for box_id in box_ids
+        for category_id in rng.sample(category_ids, min(3, len(category_ids)))
+    ])
+
+    db.commit()
+    result.counts = {
+        "users": len(result.user_ids),
+        "children": len(result.child_ids),
+        "subscriptions": len(subscription_ids),
+        "payments": len(payment_ids),
+        "toy_boxes": len(box_ids),
+    }
+    return result
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from core.config import settings
+from models.toy_category import ToyCategory, category_interests, category_skills
+
+
+class CategoryAffinityIndex:
+    """Индекс связей категорий с интересами и навыками для скоринга без обращений к БД
+
+    interest_id/skill_id -> множество категорий, плюс знаменатели (сколько
+    интересов и навыков привязано к каждой категории).
+    """
+
+    def __init__(self, category_ids: Iterable[int],
+                 interest_pairs: Iterable[Tuple[int, int]],
+                 skill_pairs: Iterable[Tuple[int, int]]):
+        self.category_ids: List[int] = sorted(category_ids)
+        self.categories_by_interest: Dict[int, Set[int]] = defaultdict(set)
+        self.categories_by_skill: Dict[int, Set[int]] = defaultdict(set)
+        self.interest_counts: Dict[int, int] = defaultdict(int)
+        self.skill_counts: Dict[int, int] = defaultdict(int)
+
+        for category_id, interest_id in interest_pairs:
+            self.categories_by_interest[interest_id].add(category_id)
+            self.interest_counts[category_id] += 1
+
+        for category_id, skill_id in skill_pairs:
+            self.categories_by_skill[skill_id].add(category_id)
+            self.skill_counts[category_id] += 1
+
+    @classmethod
+    def build(cls, db: Session) -> "CategoryAffinityIndex":
+        """Строит индекс тремя запросами к таблицам связей"""
+        category_ids = db.execute(select(ToyCategory.id)).scalars().all()
+        interest_pairs = db.execute(
+            select(category_interests.c.category_id, category_interests.c.interest_id)
+        ).all()
+        skill_pairs = db.execute(
+            select(category_skills.c.category_id, category_skills.c.skill_id)
+        ).all()
+        return cls(category_ids, interest_pairs, skill_pairs)
+
+    def _ratios(self, tag_ids: Iterable[int], categories_by_tag: Dict[int, Set[int]],
+                counts: Dict[int, int]) -> Dict[int, float]:
+        hits: Dict[int, int] = defaultdict(int)
+        for tag_id in set(tag_ids):
+            for category_id in categories_by_tag.get(tag_id, ()):
+                hits[category_id] += 1
+        return {category_id: hit / counts[category_id] for category_id, hit in hits.items()}
+
+    def score(self, interest_ids: List[int], skill_ids: List[int]) -> List[Tuple[int, float]]:
+        """Скоринг всех категорий для ребенка, по убыванию скоринга
+
+        Совпадает с CategoryMappingService.get_category_score: доля совпавших
+        интересов/навыков категории, при наличии обоих - среднее.
+        """
+        interest_scores = self._ratios(interest_ids, self.categories_by_interest, self.interest_counts)
+        skill_scores = self._ratios(skill_ids, self.categories_by_skill, self.skill_counts)
+
+        scored = []
+        for category_id in self.category_ids:
+            if interest_ids and skill_ids:
+                score = (interest_scores.get(category_id, 0.0) + skill_scores.get(category_id, 0.0)) / 2
+            elif interest_ids:
+                score = interest_scores.get(category_id, 0.0)
+            elif skill_ids:
+                score = skill_scores.get(category_id, 0.0)
+            else:
+                score = 0.0
+            scored.append((category_id, score))
+
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return scored
+
+
+_index: Optional[CategoryAffinityIndex] = None
+_built_at = 0.0
+_lock = threading.Lock()
+
+
+def get_affinity_index(db: Session) -> CategoryAffinityIndex:
+    """Возвращает индекс процесса, перестраивая его после инвалидации или по TTL"""
+    global _index, _built_at
+    index = _index
+    if index is not None and time.monotonic() - _built_at < settings.AFFINITY_INDEX_TTL_SECONDS:
+        return index
+
+    with _lock:
+        if _index is None or time.monotonic() - _built_at >= settings.AFFINITY_INDEX_TTL_SECONDS:
+            _index = CategoryAffinityIndex.build(db)
+            _built_at = time.monotonic()
+        return _index
+
+
+def invalidate_affinity_index() -> None:
+    """Сбрасывает индекс - он будет перестроен при следующем обращении"""
+    global _index
+    with _lock:
+        _index = None
+
+
+def invalidate_affinity_index_on_commit(db: Session) -> None:
+    """Сбрасывает индекс сейчас и после commit сессии, чтобы не закэшировать незафиксированное состояние"""
+    invalidate_affinity_index()
+    event.listen(db, "after_commit", lambda session: invalidate_affinity_index(), once=True)
@@ -1,9 +1,162 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import functools
+import inspect
+import logging
+from contextlib import contextmanager
+from typing import Optional
+from sqlalchemy import Select, create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
 from .config import settings
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+logger = logging.getLogger(__name__)
+
+# Асинхронные драйверы для синхронных URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_engine_options(url: str) -> dict:
+    """Параметры пула и statement_timeout из настроек для движка с данным URL"""
+    url = make_url(url)
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.get_backend_name() == "sqlite":
+        # У SQLite свой пул соединений, размер пула к нему не применяется
+        return options
+
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0 and url.get_backend_name() == "postgresql":
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+def _to_async_url(sync_url: str) -> str:
+    url = make_url(sync_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Нет асинхронного драйвера для {backend}, задайте ASYNC_DATABASE_URL")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def get_async_database_url() -> str:
+    """Возвращает URL для асинхронного движка"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    return _to_async_url(settings.DATABASE_URL)
+
+
+def get_async_replica_url() -> Optional[str]:
+    """Возвращает URL реплики для асинхронного движка (None - реплики нет)"""
+    if settings.ASYNC_DATABASE_REPLICA_URL:
+        return settings.ASYNC_DATABASE_REPLICA_URL
+    if settings.DATABASE_REPLICA_URL:
+        return _to_async_url(settings.DATABASE_REPLICA_URL)
+    return None
+
+
+class RoutingSession(Session):
+    """Сессия, направляющая чтения внутри replica_reads() на реплику, а все остальное - в основную БД
+
+    На реплику уходят только SELECT, и только пока сессия ничего не записала:
+    после первой записи (flush, UPDATE/DELETE/INSERT) сессия до конца работы читает
+    из основной БД, чтобы видеть свои изменения.
+    """
+
+    replica_bind: Optional[Engine] = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._replica_depth = 0
+        self._has_writes = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or (clause is not None and not isinstance(clause, Select)):
+            self._has_writes = True
+        elif (self._replica_depth and not self._has_writes
+              and self.replica_bind is not None and isinstance(clause, Select)):
+            return self.replica_bind
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+    @contextmanager
+    def using_replica(self):
+        self._replica_depth += 1
+        try:
+            yield self
+        finally:
+            self._replica_depth -= 1
+
+
+class AsyncRoutingSession(RoutingSession):
+    """Синхронная часть AsyncSession с маршрутизацией на асинхронную реплику"""
+
+
+@contextmanager
+def replica_reads(db):
+    """Чтения внутри блока идут на реплику (если она настроена и сессия еще ничего не записала)"""
+    session = getattr(db, "sync_session", db)
+    if isinstance(session, RoutingSession):
+        with session.using_replica():
+            yield db
+    else:
+        yield db
+
+
+def read_replica(method):
+    """Декоратор read-only метода репозитория: запросы метода идут на реплику
+
+    Сессия берется из self.db (или self._db). Подходит и для async-методов.
+    """
+    def _session(repository):
+        return getattr(repository, "db", None) or getattr(repository, "_db", None)
+
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            with replica_reads(_session(self)):
+                return await method(self, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with replica_reads(_session(self)):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+engine = create_engine(settings.DATABASE_URL, **get_engine_options(settings.DATABASE_URL))
+replica_engine = (
+    create_engine(settings.DATABASE_REPLICA_URL, **get_engine_options(settings.DATABASE_REPLICA_URL))
+    if settings.DATABASE_REPLICA_URL else None
+)
+RoutingSession.replica_bind = replica_engine
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession)
+
+# Асинхронный движок создается только если включен (нужен asyncpg/aiosqlite)
+async_engine = (
+    create_async_engine(get_async_database_url(), **get_engine_options(get_async_database_url()))
+    if settings.DB_ASYNC_ENABLED else None
+)
+async_replica_engine = (
+    create_async_engine(get_async_replica_url(), **get_engine_options(get_async_replica_url()))
+    if settings.DB_ASYNC_ENABLED and get_async_replica_url() else None
+)
+AsyncRoutingSession.replica_bind = async_replica_engine.sync_engine if async_replica_engine is not None else None
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, class_=AsyncSession, sync_session_class=AsyncRoutingSession,
+                       autoflush=False, expire_on_commit=False)
+    if async_engine is not None else None
+)
 
 class Base(DeclarativeBase):
     pass
@@ -14,10 +167,31 @@ def get_db():
     try:
         yield db
         db.commit()  # Автоматический commit при успехе
-        print("Commit success")
     except Exception as e:
-        print(f"Ошибка при работе с базой данных: {e}")
+        logger.info("Rollback транзакции: %s", e)
         db.rollback()  # Автоматический rollback при ошибке
         raise
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """Асинхронная сессия: запросы не блокируют event loop"""
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Асинхронный режим БД выключен (DB_ASYNC_ENABLED=false)")
+    
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()  # Автоматический commit при успехе
+        except Exception as e:
+            logger.info("Rollback транзакции: %s", e)
+            await db.rollback()  # Автоматический rollback при ошибке
+            raise
+
+
+async def resolve(result):
+    """Дожидается результата сервиса, если он асинхронный (async-режим БД)"""
+    if inspect.isawaitable(result):
+        return await result
+    return result
@@ -0,0 +1,20 @@
+import hashlib
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+
+def etag_response(request: Request, payload: BaseModel) -> Response:
+    """JSON-ответ с ETag; при совпадении If-None-Match возвращает 304 без тела
+
+    ETag считается по содержимому, поэтому остается корректным после
+    перезапуска и одинаков во всех воркерах.
+    """
+    body = payload.model_dump_json().encode()
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Language"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,4 +1,5 @@
-from typing import Protocol, Optional, List, Dict
+from enum import Enum
+from typing import Protocol, Optional, List, Dict, Tuple
 from abc import ABC, abstractmethod
 from models.user import User
 from models.child import Child
@@ -34,6 +35,15 @@ class ISubscriptionRepository(Protocol):
     def deactivate_user_subscriptions(self, user_id: int) -> None: ...
 
 
+class OTPCheck(str, Enum):
+    """Результат проверки OTP кода"""
+    OK = "ok"
+    MISSING = "missing"
+    TOO_MANY_ATTEMPTS = "too_many_attempts"
+    EXPIRED = "expired"
+    INVALID = "invalid"
+
+
 class IOTPStorage(ABC):
     """Абстрактный класс хранилища OTP кодов"""
     
@@ -56,6 +66,107 @@ class IOTPStorage(ABC):
     def delete_code(self, phone: str) -> bool:
         """Удаляет код для телефона"""
         pass
+    
+    def verify_code(self, phone: str, code: str, max_attempts: int, ttl_seconds: int,
+                    now: float) -> Tuple[OTPCheck, int]:
+        """Проверяет код и расходует попытку; при успехе, истечении или исчерпании попыток удаляет код
+        
+        Возвращает результат и число попыток. Реализация по умолчанию собрана из
+        операций выше; хранилища могут выполнять ее атомарно за одно обращение.
+        """
+        stored_data = self.get_code_data(phone)
+        if not stored_data:
+            return OTPCheck.MISSING, 0
+        
+        if stored_data["attempts"] >= max_attempts:
+            self.delete_code(phone)
+            return OTPCheck.TOO_MANY_ATTEMPTS, stored_data["attempts"]
+        
+        if now - stored_data["timestamp"] > ttl_seconds:
+            self.delete_code(phone)
+            return OTPCheck.EXPIRED, stored_data["attempts"]
+        
+        attempts = self.increment_attempts(phone)
+        if stored_data["code"] == code:
+            self.delete_code(phone)
+            return OTPCheck.OK, attempts
+        return OTPCheck.INVALID, attempts
+
+
+class IAsyncOTPStorage(ABC):
+    """Асинхронное хранилище OTP кодов (не блокирует event loop)"""
+    
+    @abstractmethod
+    async def store_code(self, phone: str, code: str) -> bool:
+        """Сохраняет код для телефона"""
+        pass
+    
+    @abstractmethod
+    async def get_code_data(self, phone: str) -> Optional[Dict]:
+        """Получает данные кода для телефона"""
+        pass
+    
+    @abstractmethod
+    async def verify_code(self, phone: str, code: str, max_attempts: int, ttl_seconds: int,
+                          now: float) -> Tuple[OTPCheck, int]:
+        """Проверяет код и расходует попытку (см. IOTPStorage.verify_code)"""
+        pass
+
+
+class IRateLimitBackend(ABC):
+    """Хранилище счетчиков ограничения частоты запросов (token bucket)"""
+    
+    @abstractmethod
+    async def hit(self, key: str, capacity: int, refill_per_second: float, now: float) -> Tuple[bool, float]:
+        """Забирает один токен из корзины key; возвращает (разрешено, через сколько секунд повторить)"""
+        pass
+
+
+class IJobStorage(ABC):
+    """Абстрактный класс хранилища состояний фоновых задач"""
+    
+    @abstractmethod
+    def save_job(self, job_id: str, data: Dict) -> bool:
+        """Сохраняет (перезаписывает) состояние задачи"""
+        pass
+    
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Получает состояние задачи"""
+        pass
+
+
+class IVersionStore(ABC):
+    """Абстрактный класс хранилища версий (для инвалидации кэшей)"""
+    
+    @abstractmethod
+    def get_version(self, namespace: str) -> int:
+        """Возвращает текущую версию пространства имен"""
+        pass
+    
+    @abstractmethod
+    def bump(self, namespace: str) -> int:
+        """Увеличивает версию и возвращает новую"""
+        pass
+
+
+class IPreviewStore(ABC):
+    """Абстрактный класс хранилища сериализованных превью (ключ - строка, значение - JSON)"""
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Возвращает значение или None, если его нет или оно истекло"""
+        pass
+    
+    @abstractmethod
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        """Сохраняет значение на ttl_seconds"""
+        pass
+    
+    @abstractmethod
+    def delete(self, keys: List[str]) -> None:
+        """Удаляет значения"""
+        pass
 
 
 class IOTPService(Protocol):
@@ -0,0 +1,105 @@
+"""
+Настройка логирования приложения.
+
+Обработчики запросов только кладут запись в очередь (QueueHandler),
+форматирование и запись в stdout выполняет фоновый поток QueueListener.
+Отладочные сообщения отсекаются по уровню до форматирования аргументов,
+поэтому в сервисах используем logger.debug("... %s", value), а не f-строки.
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from core.config import settings
+
+# Стандартные атрибуты LogRecord; все остальное пришло через extra=
+_RESERVED_ATTRS = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__.keys()
+) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+class JSONFormatter(logging.Formatter):
+    """Одна запись - одна JSON-строка; поля из extra= попадают в корень объекта"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который не блокирует запрос при переполненной очереди.
+
+    Сообщение форматируется (getMessage) еще в потоке запроса: аргументы могут
+    ссылаться на ORM-объекты, которые нельзя трогать из другого потока.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        # Трейсбек форматируется уже в фоновом потоке
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def _build_formatter() -> logging.Formatter:
+    if settings.LOG_FORMAT.lower() == "json":
+        return JSONFormatter()
+    return logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+
+def setup_logging() -> None:
+    """Подключает очередь к корневому логгеру и запускает фоновый поток записи"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(_build_formatter())
+
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=max(settings.LOG_QUEUE_SIZE, 0))
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_DroppingQueueHandler(log_queue))
+        root.setLevel(settings.LOG_LEVEL.upper())
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Дописывает оставшиеся записи и останавливает фоновый поток"""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,247 @@
+"""
+Инструментирование запросов: число SQL-запросов, время в БД и латентность по маршрутам.
+
+Счетчики SQL ведутся через события before/after_cursor_execute движков и
+привязываются к текущему HTTP-запросу через ContextVar (sync-роуты выполняются
+в пуле потоков с копией контекста, поэтому тоже попадают в статистику).
+Метрики хранятся в памяти процесса и отдаются на /metrics в текстовом
+формате Prometheus; при нескольких воркерах каждый отдает свои значения.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Метка маршрута для запросов, не попавших ни в один роут (404 и т.п.)
+UNMATCHED_ROUTE = "unmatched"
+
+
+@dataclass
+class RequestStats:
+    """SQL-статистика одного HTTP-запроса"""
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Статистика текущего запроса (None вне HTTP-запроса, например в фоновых воркерах)"""
+    return _request_stats.get()
+
+
+class _Histogram:
+    """Кумулятивная гистограмма Prometheus с метками"""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[Tuple[str, str], ...], list] = {}
+
+    def observe(self, labels: Tuple[Tuple[str, str], ...], value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            # [счетчики по корзинам (+Inf последняя), сумма, количество]
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (None,), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound is None else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class _Counter:
+    """Счетчик Prometheus с метками"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._series: Dict[Tuple[Tuple[str, str], ...], int] = {}
+
+    def inc(self, labels: Tuple[Tuple[str, str], ...]) -> None:
+        self._series[labels] = self._series.get(labels, 0) + 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+
+_lock = threading.Lock()
+_requests_total = _Counter("http_requests_total", "HTTP requests by route and status")
+_request_duration = _Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", LATENCY_BUCKETS
+)
+_request_queries = _Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request", QUERY_COUNT_BUCKETS
+)
+_request_db_time = _Histogram(
+    "http_request_db_seconds", "Time spent in SQL per HTTP request", LATENCY_BUCKETS
+)
+_over_budget_total = _Counter(
+    "http_requests_over_budget_total", "HTTP requests over the query-count or latency budget"
+)
+
+
+def observe_request(method: str, route: str, status: int, duration: float, stats: RequestStats) -> None:
+    """Записывает завершенный запрос в метрики"""
+    labels = (("method", method), ("route", route))
+    with _lock:
+        _requests_total.inc(labels + (("status", str(status)),))
+        _request_duration.observe(labels, duration)
+        _request_queries.observe(labels, stats.queries)
+        _request_db_time.observe(labels, stats.db_seconds)
+
+
+def render_metrics() -> str:
+    """Все метрики процесса в текстовом формате Prometheus"""
+    with _lock:
+        lines = []
+        for metric in (_requests_total, _request_duration, _request_queries, _request_db_time, _over_budget_total):
+            lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Подключает подсчет SQL-запросов к движку (для AsyncEngine передается engine.sync_engine)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _request_stats.get() is not None:
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _finish_query(conn) -> None:
+    stats = _request_stats.get()
+    starts = conn.info.get("metrics_query_start")
+    if stats is None or not starts:
+        return
+    stats.queries += 1
+    stats.db_seconds += time.perf_counter() - starts.pop()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    _finish_query(conn)
+
+
+def _handle_error(exception_context) -> None:
+    # Упавший запрос тоже занимал БД; соединения может не быть при ошибке подключения
+    if exception_context.connection is not None:
+        _finish_query(exception_context.connection)
+
+
+_route_paths: Dict[Callable, Optional[str]] = {}
+
+
+def _route_label(request: Request) -> str:
+    """Шаблон пути маршрута (/children/{child_id}), чтобы id не раздували число серий"""
+    endpoint = request.scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    if endpoint not in _route_paths:
+        paths = {route.path for route in request.app.routes if getattr(route, "endpoint", None) is endpoint}
+        # Один обработчик на нескольких путях - определяем путь сопоставлением
+        _route_paths[endpoint] = paths.pop() if len(paths) == 1 else None
+    path = _route_paths[endpoint]
+    if path is not None:
+        return path
+    for route in request.app.routes:
+        if getattr(route, "endpoint", None) is endpoint and route.matches(request.scope)[0] == Match.FULL:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+async def instrumentation_middleware(request: Request, call_next):
+    """Собирает латентность, число SQL-запросов и время в БД для каждого запроса"""
+    if not settings.METRICS_ENABLED:
+        return await call_next(request)
+
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        duration = time.perf_counter() - started
+        _request_stats.reset(token)
+        route = _route_label(request)
+        observe_request(request.method, route, status, duration, stats)
+        _check_budget(request.method, route, status, duration, stats)
+
+
+def _check_budget(method: str, route: str, status: int, duration: float, stats: RequestStats) -> None:
+    """Логирует запросы сверх бюджета по числу SQL-запросов или латентности"""
+    reasons = []
+    if settings.METRICS_QUERY_BUDGET and stats.queries > settings.METRICS_QUERY_BUDGET:
+        reasons.append("queries")
+    if settings.METRICS_LATENCY_BUDGET_MS and duration * 1000 > settings.METRICS_LATENCY_BUDGET_MS:
+        reasons.append("latency")
+    if not reasons:
+        return
+
+    labels = (("method", method), ("route", route))
+    with _lock:
+        for reason in reasons:
+            _over_budget_total.inc(labels + (("reason", reason),))
+    logger.warning(
+        "Запрос сверх бюджета: %s %s", method, route,
+        extra={
+            "route": route,
+            "method": method,
+            "status": status,
+            "duration_ms": round(duration * 1000, 2),
+            "db_queries": stats.queries,
+            "db_ms": round(stats.db_seconds * 1000, 2),
+            "over_budget": reasons,
+        },
+    )
@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from core.config import settings
+from core.interfaces import IPreviewStore, IVersionStore
+from core.redis_client import get_redis_client
+from core.reference_cache import InMemoryVersionStore, RedisVersionStore
+from schemas.toy_box_schemas import NextBoxResponse
+
+logger = logging.getLogger(__name__)
+
+# Пространство имен поколения превью: его увеличение сбрасывает все превью разом
+NAMESPACE = "next_box_preview"
+
+# Сохраненный "нет превью" (нет активной подписки или конфигурации плана)
+_EMPTY = "null"
+
+# Ключи session.info для накопления инвалидаций до commit
+_PENDING_CHILDREN = "next_box_preview_children"
+_PENDING_ALL = "next_box_preview_all"
+
+
+class InMemoryPreviewStore(IPreviewStore):
+    """Превью в памяти процесса (один воркер), вытесняются давно не использованные"""
+
+    def __init__(self, max_entries: int = settings.NEXT_BOX_PREVIEW_MAX_ENTRIES):
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._max_entries = max(max_entries, 1)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, keys: List[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class RedisPreviewStore(IPreviewStore):
+    """Превью в Redis: общие для всех воркеров; при недоступности Redis - промах кэша"""
+
+    def __init__(self, redis_url: str):
+        self._redis = get_redis_client(redis_url)
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            value = self._redis.get(key)
+        except Exception as e:
+            logger.warning("Ошибка Redis при чтении превью набора: %s", e)
+            return None
+        if isinstance(value, bytes):
+            value = value.decode()
+        return value
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        try:
+            self._redis.set(key, value, px=max(int(ttl_seconds * 1000), 1))
+        except Exception as e:
+            logger.warning("Ошибка Redis при сохранении превью набора: %s", e)
+
+    def delete(self, keys: List[str]) -> None:
+        if not keys:
+            return
+        try:
+            self._redis.delete(*keys)
+        except Exception as e:
+            logger.warning("Ошибка Redis при удалении превью наборов: %s", e)
+
+
+class NextBoxPreviewCache:
+    """Кэш превью следующего набора по ребенку
+
+    Превью зависит от активной подписки ребенка, конфигурации ее плана (с данными
+    категорий) и дат текущего набора. Изменения набора и подписки сбрасывают превью
+    конкретных детей, изменения планов и категорий - все превью (через поколение
+    в ключе, старые записи доживают свой TTL). Хранится JSON ответа, а не ORM-объекты.
+    """
+
+    def __init__(self, store: IPreviewStore, versions: IVersionStore,
+                 ttl: int = settings.NEXT_BOX_PREVIEW_TTL_SECONDS):
+        self._store = store
+        self._versions = versions
+        self.ttl = ttl
+
+    def _key(self, child_id: int) -> str:
+        return f"nextbox:{self._versions.get_version(NAMESPACE)}:{child_id}"
+
+    def get(self, child_id: int) -> Tuple[bool, Optional[NextBoxResponse]]:
+        """(найдено ли, превью); превью None - сохраненный ответ "набора не будет\""""
+        value = self._store.get(self._key(child_id))
+        if value is None:
+            return False, None
+        if value == _EMPTY:
+            return True, None
+        return True, NextBoxResponse.model_validate_json(value)
+
+    def set(self, child_id: int, preview: Optional[NextBoxResponse], ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        value = preview.model_dump_json() if preview is not None else _EMPTY
+        self._store.set(self._key(child_id), value, ttl)
+
+    def invalidate_children(self, child_ids: Iterable[int]) -> None:
+        """Сбросить превью детей"""
+        keys = [self._key(child_id) for child_id in set(child_ids)]
+        self._store.delete(keys)
+
+    def invalidate_all(self) -> None:
+        """Сбросить все превью (во всех воркерах при Redis)"""
+        self._versions.bump(NAMESPACE)
+
+
+@lru_cache()
+def get_next_box_preview_cache() -> Optional[NextBoxPreviewCache]:
+    """Создает единый кэш превью для процесса; None, если кэш выключен"""
+    if settings.NEXT_BOX_PREVIEW_TTL_SECONDS <= 0:
+        return None
+    if settings.NEXT_BOX_PREVIEW_CACHE_TYPE == "redis":
+        return NextBoxPreviewCache(RedisPreviewStore(settings.REDIS_URL), RedisVersionStore(settings.REDIS_URL))
+    return NextBoxPreviewCache(InMemoryPreviewStore(), InMemoryVersionStore())
+
+
+def invalidate_next_box_previews_on_commit(db: Session, child_ids: Optional[Iterable[int]] = None) -> None:
+    """Сбрасывает превью детей (None - все превью) сейчас и после commit сессии
+
+    Повторный сброс после commit не дает параллельному запросу закэшировать
+    состояние до фиксации. Инвалидации одной транзакции копятся в session.info
+    и применяются одним обращением к хранилищу.
+    """
+    cache = get_next_box_preview_cache()
+    if cache is None:
+        return
+
+    if child_ids is None:
+        cache.invalidate_all()
+        db.info[_PENDING_ALL] = True
+    else:
+        child_ids = set(child_ids)
+        if not child_ids:
+            return
+        cache.invalidate_children(child_ids)
+        db.info.setdefault(_PENDING_CHILDREN, set()).update(child_ids)
+
+    if not event.contains(db, "after_commit", _apply_pending):
+        event.listen(db, "after_commit", _apply_pending)
+
+
+def _apply_pending(session: Session) -> None:
+    cache = get_next_box_preview_cache()
+    invalidate_all = session.info.pop(_PENDING_ALL, False)
+    child_ids = session.info.pop(_PENDING_CHILDREN, None)
+    if cache is None:
+        return
+    if invalidate_all:
+        cache.invalidate_all()
+    elif child_ids:
+        cache.invalidate_children(child_ids)
@@ -0,0 +1,193 @@
+import ipaddress
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+from fastapi import HTTPException, Request, status
+from core.config import settings
+from core.interfaces import IRateLimitBackend
+from core.redis_client import get_async_redis_client
+from services.jwt_service import get_jwt_service
+
+logger = logging.getLogger(__name__)
+
+# Ключи ограничения
+BY_IP = "ip"
+BY_PHONE = "phone"
+BY_USER = "user"  # ID пользователя из access-токена, без токена - IP
+
+
+class InMemoryRateLimitBackend(IRateLimitBackend):
+    """Корзины токенов в памяти процесса (один воркер)
+
+    Число корзин ограничено: при переполнении вытесняется давно не использованная.
+    """
+
+    def __init__(self, max_keys: int = settings.RATE_LIMIT_MEMORY_MAX_KEYS):
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._max_keys = max(max_keys, 1)
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, capacity: int, refill_per_second: float, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (float(capacity), now))
+            tokens = min(float(capacity), tokens + (now - updated_at) * refill_per_second)
+
+            allowed = tokens >= 1
+            retry_after = 0.0
+            if allowed:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / refill_per_second
+
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+# Корзина целиком на сервере Redis: чтение, пополнение и списание токена - одно обращение
+# KEYS[1] - ключ корзины; ARGV: емкость, пополнение в секунду, текущее время
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisRateLimitBackend(IRateLimitBackend):
+    """Корзины токенов в Redis (redis.asyncio) - лимиты общие для всех воркеров
+
+    При недоступности Redis запрос пропускается: ограничитель не должен ронять вход.
+    """
+
+    def __init__(self, redis_url: str):
+        self._redis = get_async_redis_client(redis_url)
+        self._script = self._redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def hit(self, key: str, capacity: int, refill_per_second: float, now: float) -> Tuple[bool, float]:
+        try:
+            allowed, retry_after = await self._script(
+                keys=[f"ratelimit:{key}"], args=[capacity, refill_per_second, now]
+            )
+            return bool(int(allowed)), float(retry_after)
+        except Exception as e:
+            logger.warning("Ошибка Redis в ограничителе запросов: %s", e)
+            return True, 0.0
+
+
+@lru_cache()
+def get_rate_limit_backend() -> IRateLimitBackend:
+    """Создает singleton хранилища лимитов в зависимости от конфигурации"""
+    if settings.RATE_LIMIT_STORAGE_TYPE == "redis":
+        return RedisRateLimitBackend(settings.REDIS_URL)
+    return InMemoryRateLimitBackend()
+
+
+@lru_cache()
+def _trusted_proxies() -> Tuple[Union[ipaddress.IPv4Network, ipaddress.IPv6Network], ...]:
+    """Сети доверенных прокси из RATE_LIMIT_TRUSTED_PROXIES"""
+    return tuple(
+        ipaddress.ip_network(value.strip(), strict=False)
+        for value in settings.RATE_LIMIT_TRUSTED_PROXIES.split(",") if value.strip()
+    )
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in _trusted_proxies())
+
+
+def _client_ip(request: Request) -> str:
+    """IP клиента для лимитов
+
+    X-Forwarded-For задает клиент, поэтому ему верим только если соединение пришло
+    от доверенного прокси, и берем адрес, добавленный прокси: первый справа,
+    не являющийся доверенным прокси.
+    """
+    peer = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    if not forwarded or not _is_trusted_proxy(peer):
+        return peer
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+def _user_id(request: Request) -> Optional[str]:
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    user_id = get_jwt_service().extract_user_id(token)
+    return str(user_id) if user_id is not None else None
+
+
+class RateLimit:
+    """FastAPI-зависимость: не более limit запросов за window_seconds на ключ (token bucket)
+
+    Проверка выполняется до обработчика, так что отклоненный запрос не доходит
+    до БД и хранилища OTP. Ответ 429 содержит Retry-After.
+
+        router = APIRouter(dependencies=[Depends(RateLimit("auth", 30, key=BY_IP))])
+    """
+
+    def __init__(self, scope: str, limit: int, window_seconds: float = settings.RATE_LIMIT_WINDOW_SECONDS,
+                 key: str = BY_IP):
+        self.scope = scope
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.key = key
+
+    async def _identifier(self, request: Request) -> str:
+        if self.key == BY_PHONE:
+            # Тело уже прочитано FastAPI для обработчика - повторное чтение берется из кэша запроса
+            try:
+                body = await request.json()
+            except Exception:
+                body = None
+            phone = body.get("phone_number") if isinstance(body, dict) else None
+            if phone:
+                return f"phone:{phone}"
+        elif self.key == BY_USER:
+            user_id = _user_id(request)
+            if user_id:
+                return f"user:{user_id}"
+        return f"ip:{_client_ip(request)}"
+
+    async def __call__(self, request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED or self.limit <= 0:
+            return
+
+        identifier = await self._identifier(request)
+        allowed, retry_after = await get_rate_limit_backend().hit(
+            f"{self.scope}:{identifier}", self.limit, self.limit / self.window_seconds, time.time()
+        )
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Слишком много запросов, попробуйте позже",
+                headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+            )
@@ -0,0 +1,42 @@
+from functools import lru_cache
+from core.config import settings
+
+
+@lru_cache()
+def get_redis_client(redis_url: str):
+    """Клиент Redis на общем ограниченном пуле соединений процесса
+
+    BlockingConnectionPool не открывает больше REDIS_MAX_CONNECTIONS соединений:
+    при всплеске запросов они ждут свободное соединение до REDIS_POOL_TIMEOUT секунд.
+    """
+    try:
+        import redis
+    except ImportError:
+        raise ImportError("Для Redis storage нужен пакет redis: pip install redis")
+
+    pool = redis.BlockingConnectionPool.from_url(
+        redis_url,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        decode_responses=True,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+@lru_cache()
+def get_async_redis_client(redis_url: str):
+    """Асинхронный клиент Redis (redis.asyncio) на своем ограниченном пуле - не блокирует event loop"""
+    try:
+        import redis.asyncio as aioredis
+    except ImportError:
+        raise ImportError("Для Redis storage нужен пакет redis: pip install redis")
+
+    pool = aioredis.BlockingConnectionPool.from_url(
+        redis_url,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        decode_responses=True,
+    )
+    return aioredis.Redis(connection_pool=pool)
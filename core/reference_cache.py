@@ -0,0 +1,133 @@
+import logging
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from core.config import settings
+from core.interfaces import IVersionStore
+from core.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Пространства имен справочников
+INTERESTS = "interests"
+SKILLS = "skills"
+CATEGORIES = "categories"
+PLANS = "plans"  # Планы вместе с конфигурациями игрушек (и данными категорий в них)
+
+
+class InMemoryVersionStore(IVersionStore):
+    """Версии в памяти процесса (один воркер)"""
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get_version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    def bump(self, namespace: str) -> int:
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            return self._versions[namespace]
+
+
+class RedisVersionStore(IVersionStore):
+    """Версии в Redis: изменение в одном воркере сбрасывает кэш во всех
+
+    Чтобы не ходить в Redis на каждое чтение, версия сверяется не чаще
+    REFERENCE_CACHE_VERSION_CHECK_SECONDS. При недоступности Redis используется
+    последняя известная версия.
+    """
+
+    def __init__(self, redis_url: str):
+        self._redis = get_redis_client(redis_url)
+        self._known: Dict[str, Tuple[int, float]] = {}
+
+    def _get_key(self, namespace: str) -> str:
+        return f"refcache:version:{namespace}"
+
+    def get_version(self, namespace: str) -> int:
+        version, checked_at = self._known.get(namespace, (0, 0.0))
+        if time.monotonic() - checked_at < settings.REFERENCE_CACHE_VERSION_CHECK_SECONDS:
+            return version
+
+        try:
+            version = int(self._redis.get(self._get_key(namespace)) or 0)
+        except Exception as e:
+            logger.warning("Ошибка Redis при чтении версии кэша: %s", e)
+        self._known[namespace] = (version, time.monotonic())
+        return version
+
+    def bump(self, namespace: str) -> int:
+        try:
+            version = int(self._redis.incr(self._get_key(namespace)))
+        except Exception as e:
+            logger.warning("Ошибка Redis при увеличении версии кэша: %s", e)
+            version = self._known.get(namespace, (0, 0.0))[0] + 1
+        self._known[namespace] = (version, time.monotonic())
+        return version
+
+
+class ReferenceCache:
+    """Read-through кэш справочников в памяти процесса
+
+    Значение хранится вместе с версией своего пространства имен; изменение
+    справочника увеличивает версию, и все его записи становятся устаревшими.
+    Кэшировать нужно простые данные (схемы, снимки), а не ORM-объекты сессии.
+    """
+
+    def __init__(self, versions: IVersionStore, ttl: int = settings.REFERENCE_CACHE_TTL_SECONDS):
+        self._versions = versions
+        self._ttl = ttl
+        self._entries: Dict[Tuple[str, str], Tuple[int, float, Any]] = {}
+
+    def _lookup(self, namespace: str, key: str) -> Tuple[int, Any, bool]:
+        version = self._versions.get_version(namespace)
+        entry = self._entries.get((namespace, key))
+        if entry and entry[0] == version and entry[1] > time.monotonic():
+            return version, entry[2], True
+        return version, None, False
+
+    def _store(self, namespace: str, key: str, version: int, value: Any) -> None:
+        self._entries[(namespace, key)] = (version, time.monotonic() + self._ttl, value)
+
+    def get_or_load(self, namespace: str, key: str, loader: Callable[[], Any]) -> Any:
+        """Вернуть значение из кэша или загрузить и сохранить его"""
+        version, value, hit = self._lookup(namespace, key)
+        if hit:
+            return value
+        value = loader()
+        self._store(namespace, key, version, value)
+        return value
+
+    async def get_or_load_async(self, namespace: str, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Асинхронный вариант get_or_load для AsyncSession"""
+        version, value, hit = self._lookup(namespace, key)
+        if hit:
+            return value
+        value = await loader()
+        self._store(namespace, key, version, value)
+        return value
+
+    def invalidate(self, *namespaces: str) -> None:
+        """Сбросить кэш пространств имен (во всех воркерах при Redis)"""
+        for namespace in namespaces:
+            self._versions.bump(namespace)
+
+
+@lru_cache()
+def get_reference_cache() -> ReferenceCache:
+    """Создает единый кэш справочников для процесса"""
+    if settings.REFERENCE_CACHE_TYPE == "redis":
+        return ReferenceCache(RedisVersionStore(settings.REDIS_URL))
+    return ReferenceCache(InMemoryVersionStore())
+
+
+def invalidate_reference_on_commit(db: Session, *namespaces: str) -> None:
+    """Сбрасывает кэш сейчас и после commit сессии, чтобы не закэшировать незафиксированное состояние"""
+    cache = get_reference_cache()
+    cache.invalidate(*namespaces)
+    event.listen(db, "after_commit", lambda session: cache.invalidate(*namespaces), once=True)
@@ -1,8 +1,9 @@
-from fastapi import Depends, HTTPException, status
+import hmac
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from core.config import settings
 from services.jwt_service import get_jwt_service
 from schemas.auth_schemas import UserFromToken
-from jose import jwt, JWTError
 
 # Bearer token схема
 security = HTTPBearer()
@@ -11,7 +12,7 @@ security = HTTPBearer()
 ADMIN_JWT_SECRET = "admin_secret_key_123"
 ADMIN_JWT_ALGORITHM = "HS256"
 
-__all__ = ["get_current_user", "get_current_admin", "ADMIN_JWT_SECRET", "ADMIN_JWT_ALGORITHM"]
+__all__ = ["get_current_user", "get_current_admin", "verify_metrics_token", "ADMIN_JWT_SECRET", "ADMIN_JWT_ALGORITHM"]
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
@@ -64,10 +65,23 @@ def get_current_admin(
     # Проверяем токен
     token = credentials.credentials
     
-    try:
-        payload = jwt.decode(token, ADMIN_JWT_SECRET, algorithms=[ADMIN_JWT_ALGORITHM])
-        if payload.get("role") != "admin":
-            raise HTTPException(status_code=403, detail="Недостаточно прав")
-        return payload
-    except JWTError:
+    payload = get_jwt_service().decode(token, ADMIN_JWT_SECRET, ADMIN_JWT_ALGORITHM)
+    if not payload:
         raise credentials_exception
+    if payload.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Недостаточно прав")
+    return payload
+
+
+def verify_metrics_token(request: Request) -> None:
+    """Пускает к /metrics только с токеном METRICS_TOKEN; без настроенного токена эндпоинта нет"""
+    if not settings.METRICS_ENABLED or not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -1,19 +1,26 @@
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from api import auth, admin,users, subscriptions, payments, children, interests, skills, toy_categories, subscription_plans, delivery_addresses, toy_boxes
-from core.database import Base, engine, get_db
+from core.database import Base, engine, replica_engine, async_engine, async_replica_engine, get_db
 from core.config import settings
 from core.data_initialization import initialize_all_data
 from core.i18n import translate
+from core.logging_config import setup_logging, shutdown_logging
+from core.metrics import instrument_engine, instrumentation_middleware, render_metrics
+from core.security import verify_metrics_token
+from services.payment_job_queue import get_payment_job_queue
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Настройка логирования: запись в stdout из фонового потока
+setup_logging()
+
+# Подсчет SQL-запросов и времени в БД для метрик запросов
+if settings.METRICS_ENABLED:
+    for _engine in (engine, replica_engine, async_engine, async_replica_engine):
+        if _engine is not None:
+            instrument_engine(getattr(_engine, "sync_engine", _engine))
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -33,6 +40,10 @@ async def lifespan(app: FastAPI):
     initialize_all_data(db)
     db.close()
     
+    # Запускаем воркеры фоновой обработки платежей
+    payment_job_queue = get_payment_job_queue()
+    await payment_job_queue.start()
+    
     # Инициализация завершена
     logger.info("Application initialization completed")
     
@@ -40,7 +51,15 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down Box4Kids API server...")
+    await payment_job_queue.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
+    if replica_engine is not None:
+        replica_engine.dispose()
     logger.info("Shutdown completed")
+    shutdown_logging()
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -91,6 +110,9 @@ async def language_middleware(request: Request, call_next):
     response = await call_next(request)
     return response
 
+# Регистрируется последним, чтобы оборачивать все остальные middleware
+app.middleware("http")(instrumentation_middleware)
+
 @app.get("/")
 async def root(request: Request):
     lang = getattr(request.state, 'lang', 'ru')
@@ -102,5 +124,9 @@ async def root(request: Request):
 @app.get("/health")
 async def health_check():
     """Health check endpoint для мониторинга"""
-    return {"status": "healthy", "timestamp": "2024-01-01T00:00:00Z", "version": "1.0.0"} 
+    return {"status": "healthy", "timestamp": "2024-01-01T00:00:00Z", "version": "1.0.0"}
 
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(verify_metrics_token)])
+async def metrics():
+    """Метрики запросов в текстовом формате Prometheus (только с METRICS_TOKEN)"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
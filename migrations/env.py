@@ -0,0 +1,50 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool
+from core.config import settings
+from core.database import Base
+import models  # noqa: F401 - регистрирует таблицы в Base.metadata
+import models.inventory  # noqa: F401 - склад не экспортируется из models
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def get_url() -> str:
+    """URL из -x database_url=... или из настроек приложения"""
+    return context.get_x_argument(as_dictionary=True).get("database_url", settings.DATABASE_URL)
+
+
+def run_migrations_offline() -> None:
+    """Генерирует SQL без подключения к базе (alembic upgrade --sql)"""
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Применяет миграции к базе"""
+    connectable = create_engine(get_url(), poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite не умеет ALTER COLUMN - изменения таблиц через пересоздание
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
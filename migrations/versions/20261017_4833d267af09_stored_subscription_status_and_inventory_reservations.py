@@ -0,0 +1,143 @@
+"""Хранимый статус подписок, резервы склада и статус платежа PROCESSING
+
+Схема до этой ревизии - таблицы, созданные Base.metadata.create_all из исходных
+моделей. Приложение при старте по-прежнему вызывает create_all, поэтому новые
+таблицы и индексы могли появиться раньше миграции - такие шаги пропускаются.
+
+Revision ID: 4833d267af09
+Revises:
+Create Date: 2026-10-17 18:30:00.000000
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = '4833d267af09'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+SUBSCRIPTION_STATUSES = ("PENDING_PAYMENT", "ACTIVE", "PAUSED", "CANCELLED", "EXPIRED")
+
+subscription_status = sa.Enum(*SUBSCRIPTION_STATUSES, name="subscriptionstatus").with_variant(
+    postgresql.ENUM(*SUBSCRIPTION_STATUSES, name="subscriptionstatus", create_type=False), "postgresql"
+)
+
+
+# Проверки схемы; при генерации SQL (--sql) базы нет - выводятся все шаги
+
+def _has_table(table: str) -> bool:
+    return not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table(table)
+
+
+def _has_column(table: str, column: str) -> bool:
+    return not context.is_offline_mode() and any(
+        item["name"] == column for item in sa.inspect(op.get_bind()).get_columns(table)
+    )
+
+
+def _has_index(table: str, index: str) -> bool:
+    return not context.is_offline_mode() and any(
+        item["name"] == index for item in sa.inspect(op.get_bind()).get_indexes(table)
+    )
+
+
+def _backfill_subscription_statuses() -> None:
+    """Заполняет статус подписок той же логикой, что SubscriptionRepository.sync_statuses"""
+    status_type = sa.Enum(*SUBSCRIPTION_STATUSES, name="subscriptionstatus")
+    subscriptions = sa.table(
+        "subscriptions",
+        sa.column("status", status_type),
+        sa.column("is_paused", sa.Boolean),
+        sa.column("payment_id", sa.Integer),
+    )
+    payments = sa.table("payments", sa.column("id", sa.Integer), sa.column("status", sa.String))
+    payment_status = (
+        sa.select(payments.c.status)
+        .where(payments.c.id == subscriptions.c.payment_id)
+        .scalar_subquery()
+    )
+
+    def status_value(status: str):
+        return sa.cast(sa.literal(status), status_type)
+
+    op.execute(
+        subscriptions.update().values(status=sa.case(
+            (subscriptions.c.is_paused == sa.true(), status_value("PAUSED")),
+            (payment_status == "COMPLETED", status_value("ACTIVE")),
+            (payment_status == "REFUNDED", status_value("CANCELLED")),
+            else_=status_value("PENDING_PAYMENT")
+        ))
+    )
+
+
+def upgrade() -> None:
+    is_postgresql = op.get_context().dialect.name == "postgresql"
+
+    # Новое значение enum в PostgreSQL добавляется вне транзакции
+    if is_postgresql:
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE paymentstatus ADD VALUE IF NOT EXISTS 'PROCESSING'")
+
+    # Хранимый статус подписки и индекс для поиска активной подписки ребенка
+    if not _has_column("subscriptions", "status"):
+        if is_postgresql:
+            op.execute(sa.text(
+                "CREATE TYPE subscriptionstatus AS ENUM (%s)"
+                % ", ".join(f"'{status}'" for status in SUBSCRIPTION_STATUSES)
+            ))
+        op.add_column("subscriptions", sa.Column(
+            "status", subscription_status, nullable=False, server_default="PENDING_PAYMENT"
+        ))
+    _backfill_subscription_statuses()
+    if not _has_index("subscriptions", "ix_subscriptions_child_id_status"):
+        op.create_index("ix_subscriptions_child_id_status", "subscriptions", ["child_id", "status"])
+
+    # Текущий набор и история наборов ребенка
+    if not _has_index("toy_boxes", "ix_toy_boxes_child_id_created_at"):
+        op.create_index(
+            "ix_toy_boxes_child_id_created_at", "toy_boxes",
+            ["child_id", sa.text("created_at DESC"), sa.text("id DESC")]
+        )
+
+    # Резервы склада: счетчик в остатках и журнал резервов наборов
+    if not _has_column("inventory", "reserved_quantity"):
+        op.add_column("inventory", sa.Column(
+            "reserved_quantity", sa.Integer(), nullable=False, server_default="0"
+        ))
+    if not _has_table("inventory_reservations"):
+        op.create_table(
+            "inventory_reservations",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("box_id", sa.Integer(), nullable=False),
+            sa.Column("category_id", sa.Integer(), nullable=False),
+            sa.Column("quantity", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("released_at", sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(["box_id"], ["toy_boxes.id"]),
+            sa.ForeignKeyConstraint(["category_id"], ["toy_categories.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_inventory_reservations_id", "inventory_reservations", ["id"])
+        op.create_index("ix_inventory_reservations_box_id", "inventory_reservations", ["box_id"])
+
+
+def downgrade() -> None:
+
+    op.drop_index("ix_inventory_reservations_box_id", table_name="inventory_reservations")
+    op.drop_index("ix_inventory_reservations_id", table_name="inventory_reservations")
+    op.drop_table("inventory_reservations")
+    with op.batch_alter_table("inventory") as batch_op:
+        batch_op.drop_column("reserved_quantity")
+
+    op.drop_index("ix_toy_boxes_child_id_created_at", table_name="toy_boxes")
+
+    op.drop_index("ix_subscriptions_child_id_status", table_name="subscriptions")
+    with op.batch_alter_table("subscriptions") as batch_op:
+        batch_op.drop_column("status")
+    if op.get_context().dialect.name == "postgresql":
+        op.execute("DROP TYPE IF EXISTS subscriptionstatus")
+
+    # Значение PROCESSING из enum paymentstatus PostgreSQL не удаляет; платежи в этом
+    # статусе нужно сверить с банком до отката - иначе старый код их не прочитает
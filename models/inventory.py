@@ -2,6 +2,7 @@ from sqlalchemy import ForeignKey, Integer, DateTime, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from core.database import Base
 from datetime import datetime
+from typing import Optional
 
 
 class Inventory(Base):
@@ -9,10 +10,22 @@ class Inventory(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     category_id: Mapped[int] = mapped_column(Integer, ForeignKey("toy_categories.id"), nullable=False, index=True)
-    available_quantity: Mapped[int] = mapped_column(Integer, default=0)  # Доступно на складе
-    # reserved_quantity: Mapped[int] = mapped_column(Integer, default=0)   # Зарезервировано в наборах (для будущего)
+    available_quantity: Mapped[int] = mapped_column(Integer, default=0)  # Доступно на складе (свободно)
+    reserved_quantity: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)  # Зарезервировано в наборах
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
 
     # Связь с категорией
-    category = relationship("ToyCategory", back_populates="inventory")
\ No newline at end of file
+    category = relationship("ToyCategory", back_populates="inventory")
+
+
+class InventoryReservation(Base):
+    """Журнал резервов: сколько игрушек категории зарезервировано под набор"""
+    __tablename__ = "inventory_reservations"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    box_id: Mapped[int] = mapped_column(Integer, ForeignKey("toy_boxes.id"), nullable=False, index=True)
+    category_id: Mapped[int] = mapped_column(Integer, ForeignKey("toy_categories.id"), nullable=False)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now())
+    released_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)  # Заполняется при возврате набора
@@ -7,6 +7,7 @@ from core.database import Base
 
 class PaymentStatus(enum.Enum):
     PENDING = "pending"
+    PROCESSING = "processing"  # Платеж захвачен обработчиком и отправлен в банк
     COMPLETED = "completed"
     FAILED = "failed"
     REFUNDED = "refunded"
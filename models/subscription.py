@@ -1,8 +1,10 @@
-from sqlalchemy import Integer, DateTime, Float, ForeignKey, func
+from sqlalchemy import Integer, DateTime, Float, ForeignKey, Enum, Index, func
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from datetime import datetime, timezone
+from typing import Optional
 import enum
 from core.database import Base
+from models.payment import PaymentStatus
 
 
 class SubscriptionStatus(enum.Enum):
@@ -13,8 +15,27 @@ class SubscriptionStatus(enum.Enum):
     EXPIRED = "expired"
 
 
+def resolve_subscription_status(is_paused: bool, payment_status: Optional[PaymentStatus]) -> SubscriptionStatus:
+    """Хранимый статус подписки по паузе и статусу платежа (истечение учитывается при чтении)"""
+    if is_paused:
+        return SubscriptionStatus.PAUSED
+    if payment_status == PaymentStatus.COMPLETED:
+        return SubscriptionStatus.ACTIVE
+    if payment_status == PaymentStatus.REFUNDED:
+        return SubscriptionStatus.CANCELLED
+    return SubscriptionStatus.PENDING_PAYMENT
+
+
+def _as_utc(value: datetime) -> datetime:
+    """SQLite возвращает даты без часового пояса; хранимые значения - UTC"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        Index("ix_subscriptions_child_id_status", "child_id", "status"),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     child_id: Mapped[int] = mapped_column(Integer, ForeignKey("children.id"), nullable=False)
@@ -27,6 +48,12 @@ class Subscription(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now())
     auto_renewal: Mapped[bool] = mapped_column(default=False)
     is_paused: Mapped[bool] = mapped_column(default=False)
+    # Хранимый статус: обновляется при изменении платежа и паузы (SubscriptionRepository.sync_statuses)
+    stored_status: Mapped[SubscriptionStatus] = mapped_column(
+        "status", Enum(SubscriptionStatus), nullable=False,
+        default=SubscriptionStatus.PENDING_PAYMENT,
+        server_default=SubscriptionStatus.PENDING_PAYMENT.name
+    )
     
     # Relationships
     child = relationship("Child", back_populates="subscriptions")
@@ -41,38 +68,20 @@ class Subscription(Base):
     
     @property
     def is_active(self) -> bool:
-        """Проверяет активна ли подписка"""
-        if not self.payment:
-            return False
+        """Проверяет активна ли подписка (оплачена и не истекла)"""
         return (
-            self.payment.status.value == "completed" and 
-            self.expires_at and
-            self.expires_at > datetime.now(timezone.utc)
+            self.stored_status in (SubscriptionStatus.ACTIVE, SubscriptionStatus.PAUSED) and
+            self.expires_at is not None and
+            _as_utc(self.expires_at) > datetime.now(timezone.utc)
         )
     
     @property
     def status(self) -> SubscriptionStatus:
-        """Получает статус подписки"""
-        # Проверяем паузу в первую очередь
-        if self.is_paused:
-            return SubscriptionStatus.PAUSED
-            
-        if not self.payment:
-            return SubscriptionStatus.PENDING_PAYMENT
-        
-        if self.payment.status.value == "pending":
-            return SubscriptionStatus.PENDING_PAYMENT
-        elif self.payment.status.value == "failed":
-            return SubscriptionStatus.PENDING_PAYMENT
-        elif self.payment.status.value == "refunded":
-            return SubscriptionStatus.CANCELLED
-        elif self.payment.status.value == "completed":
-            if self.expires_at and self.expires_at <= datetime.now(timezone.utc):
-                return SubscriptionStatus.EXPIRED
-            else:
-                return SubscriptionStatus.ACTIVE
-        else:
-            return SubscriptionStatus.PENDING_PAYMENT
+        """Получает статус подписки без загрузки платежа"""
+        if (self.stored_status == SubscriptionStatus.ACTIVE and
+                self.expires_at and _as_utc(self.expires_at) <= datetime.now(timezone.utc)):
+            return SubscriptionStatus.EXPIRED
+        return self.stored_status
     
     def renew(self, months: int = 1):
         """Продлевает подписку на указанное количество месяцев"""
@@ -1,9 +1,9 @@
-from sqlalchemy import Integer, ForeignKey, DateTime, Enum, String, Text, Date, func, JSON
+from sqlalchemy import Integer, ForeignKey, DateTime, Enum, String, Text, Date, func, JSON, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from datetime import date, datetime
 import enum
 from core.database import Base
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 class ToyBoxStatus(enum.Enum):
     """Статусы набора игрушек в процессе аренды"""
@@ -14,6 +14,14 @@ class ToyBoxStatus(enum.Enum):
     DELIVERED = "delivered"    # ✅ Клиент получил набор, период аренды активен
     RETURNED = "returned"      # 🔄 Игрушки возвращены, набор завершён
 
+# Допустимые переходы статусов: каждый статус - только из предыдущего шага
+STATUS_TRANSITIONS: Dict[ToyBoxStatus, List[ToyBoxStatus]] = {
+    ToyBoxStatus.ASSEMBLED: [ToyBoxStatus.PLANNED],
+    ToyBoxStatus.SHIPPED: [ToyBoxStatus.ASSEMBLED],
+    ToyBoxStatus.DELIVERED: [ToyBoxStatus.SHIPPED],
+    ToyBoxStatus.RETURNED: [ToyBoxStatus.DELIVERED],
+}
+
 class ToyBox(Base):
     __tablename__ = "toy_boxes"
 
@@ -33,6 +41,9 @@ class ToyBox(Base):
     items = relationship("ToyBoxItem", back_populates="box", cascade="all, delete-orphan")
     reviews = relationship("ToyBoxReview", back_populates="box", cascade="all, delete-orphan")
 
+# Текущий набор ребенка и история: последний по (created_at, id) в пределах child_id
+Index("ix_toy_boxes_child_id_created_at", ToyBox.child_id, ToyBox.created_at.desc(), ToyBox.id.desc())
+
 class ToyBoxItem(Base):
     __tablename__ = "toy_box_items"
 
@@ -0,0 +1,31 @@
+from typing import Optional, List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from models.child import Child
+
+
+class AsyncChildRepository:
+    """Асинхронный репозиторий для работы с детьми"""
+    
+    def __init__(self, db: AsyncSession):
+        self._db = db
+    
+    def _with_profile(self):
+        # В AsyncSession ленивые загрузки недоступны - грузим все, что нужно схемам ответа
+        return select(Child).options(
+            selectinload(Child.interests),
+            selectinload(Child.skills),
+            selectinload(Child.subscriptions),
+        )
+    
+    async def get_by_id(self, child_id: int) -> Optional[Child]:
+        return await self._db.scalar(
+            self._with_profile().where(Child.id == child_id, Child.is_deleted == False)
+        )
+    
+    async def get_by_parent_id(self, parent_id: int) -> List[Child]:
+        result = await self._db.scalars(
+            self._with_profile().where(Child.parent_id == parent_id, Child.is_deleted == False)
+        )
+        return list(result.all())
@@ -0,0 +1,29 @@
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.delivery_info import DeliveryInfo
+
+
+class AsyncDeliveryInfoRepository:
+    """Асинхронный репозиторий адресов доставки"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_by_id(self, delivery_id: int) -> Optional[DeliveryInfo]:
+        """Получить адрес доставки по ID"""
+        return await self.db.get(DeliveryInfo, delivery_id)
+    
+    async def get_by_user_id(self, user_id: int, limit: Optional[int] = None) -> List[DeliveryInfo]:
+        """Получить адреса доставки пользователя"""
+        query = (
+            select(DeliveryInfo)
+            .where(DeliveryInfo.user_id == user_id)
+            .order_by(DeliveryInfo.created_at.desc())
+        )
+        
+        if limit:
+            query = query.limit(limit)
+        
+        result = await self.db.scalars(query)
+        return list(result.all())
@@ -0,0 +1,27 @@
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.interest import Interest
+from core.database import read_replica
+
+
+class AsyncInterestRepository:
+    """Асинхронный репозиторий для работы с интересами"""
+    
+    def __init__(self, db: AsyncSession):
+        self._db = db
+    
+    @read_replica
+    async def get_all(self) -> List[Interest]:
+        """Получить все интересы"""
+        result = await self._db.scalars(select(Interest))
+        return list(result.all())
+    
+    async def get_by_ids(self, ids: List[int]) -> List[Interest]:
+        """Получить интересы по списку ID"""
+        result = await self._db.scalars(select(Interest).where(Interest.id.in_(ids)))
+        return list(result.all())
+    
+    async def get_by_id(self, interest_id: int) -> Optional[Interest]:
+        """Получить интерес по ID"""
+        return await self._db.get(Interest, interest_id)
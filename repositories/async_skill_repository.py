@@ -0,0 +1,27 @@
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.skill import Skill
+from core.database import read_replica
+
+
+class AsyncSkillRepository:
+    """Асинхронный репозиторий для работы с навыками"""
+    
+    def __init__(self, db: AsyncSession):
+        self._db = db
+    
+    @read_replica
+    async def get_all(self) -> List[Skill]:
+        """Получить все навыки"""
+        result = await self._db.scalars(select(Skill))
+        return list(result.all())
+    
+    async def get_by_ids(self, ids: List[int]) -> List[Skill]:
+        """Получить навыки по списку ID"""
+        result = await self._db.scalars(select(Skill).where(Skill.id.in_(ids)))
+        return list(result.all())
+    
+    async def get_by_id(self, skill_id: int) -> Optional[Skill]:
+        """Получить навык по ID"""
+        return await self._db.get(Skill, skill_id)
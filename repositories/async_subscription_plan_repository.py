@@ -0,0 +1,31 @@
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from models.subscription_plan import SubscriptionPlan
+from models.plan_toy_configuration import PlanToyConfiguration
+from core.database import read_replica
+
+
+class AsyncSubscriptionPlanRepository:
+    """Асинхронный репозиторий планов подписки"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    @read_replica
+    async def get_all(self) -> List[SubscriptionPlan]:
+        """Получить все планы подписки вместе с конфигурациями и категориями"""
+        result = await self.db.scalars(
+            select(SubscriptionPlan)
+            .options(
+                selectinload(SubscriptionPlan.toy_configurations)
+                .selectinload(PlanToyConfiguration.category)
+            )
+            .order_by(SubscriptionPlan.id)
+        )
+        return list(result.all())
+    
+    async def get_by_id(self, plan_id: int) -> Optional[SubscriptionPlan]:
+        """Получить план по ID"""
+        return await self.db.get(SubscriptionPlan, plan_id)
@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from models.child import Child
+from models.subscription import Subscription, SubscriptionStatus
+
+
+class AsyncSubscriptionRepository:
+    """Асинхронный репозиторий подписок (чтение)"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    def _with_details(self):
+        # payment подгружаем заранее: ленивой загрузки в AsyncSession нет
+        return select(Subscription).options(
+            selectinload(Subscription.payment),
+            selectinload(Subscription.plan),
+            selectinload(Subscription.child).selectinload(Child.parent),
+        )
+    
+    async def get_by_id(self, subscription_id: int) -> Optional[Subscription]:
+        """Получает подписку по ID"""
+        return await self.db.scalar(self._with_details().where(Subscription.id == subscription_id))
+    
+    async def get_by_child_id(self, child_id: int) -> List[Subscription]:
+        """Получает все подписки ребенка"""
+        result = await self.db.scalars(
+            self._with_details()
+            .where(Subscription.child_id == child_id)
+            .order_by(Subscription.created_at.desc())
+        )
+        return list(result.all())
+    
+    async def get_active_by_child_id(self, child_id: int) -> Optional[Subscription]:
+        """Получает активную подписку ребенка"""
+        return await self.db.scalar(
+            self._with_details()
+            .where(
+                Subscription.child_id == child_id,
+                Subscription.stored_status == SubscriptionStatus.ACTIVE,
+                Subscription.expires_at > datetime.now(timezone.utc)
+            )
+            .limit(1)
+        )
+    
+    async def get_by_user_id(self, user_id: int) -> List[Subscription]:
+        """Получает все подписки пользователя (через детей)"""
+        result = await self.db.scalars(
+            self._with_details()
+            .join(Child, Subscription.child_id == Child.id)
+            .where(Child.parent_id == user_id)
+            .order_by(Subscription.created_at.desc())
+        )
+        return list(result.all())
@@ -0,0 +1,37 @@
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from models.toy_box import ToyBox, ToyBoxStatus
+from core.database import read_replica
+from repositories.toy_box_repository import history_page_query
+
+
+class AsyncToyBoxRepository:
+    """Асинхронный репозиторий наборов игрушек"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    def _with_details(self):
+        return select(ToyBox).options(selectinload(ToyBox.items), selectinload(ToyBox.reviews))
+    
+    async def get_by_id(self, box_id: int) -> Optional[ToyBox]:
+        """Получить набор по ID с составом"""
+        return await self.db.scalar(self._with_details().where(ToyBox.id == box_id))
+    
+    async def get_current_box_by_child(self, child_id: int) -> Optional[ToyBox]:
+        """Получить текущий набор ребёнка (последний созданный)"""
+        return await self.db.scalar(
+            self._with_details()
+            .where(ToyBox.child_id == child_id)
+            .order_by(ToyBox.created_at.desc(), ToyBox.id.desc())
+            .limit(1)
+        )
+    
+    @read_replica
+    async def get_history_page(self, parent_id: int, limit: int, statuses: Optional[List[ToyBoxStatus]] = None,
+                               after_id: Optional[int] = None) -> List[ToyBox]:
+        """Страница истории наборов всех детей родителя (см. history_page_query)"""
+        result = await self.db.scalars(history_page_query(parent_id, limit, statuses, after_id))
+        return list(result.all())
@@ -0,0 +1,27 @@
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.toy_category import ToyCategory
+from core.database import read_replica
+
+
+class AsyncToyCategoryRepository:
+    """Асинхронный репозиторий категорий игрушек"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    @read_replica
+    async def get_all(self) -> List[ToyCategory]:
+        """Получить все категории игрушек"""
+        result = await self.db.scalars(select(ToyCategory))
+        return list(result.all())
+    
+    async def get_by_id(self, category_id: int) -> Optional[ToyCategory]:
+        """Получить категорию по ID"""
+        return await self.db.get(ToyCategory, category_id)
+    
+    async def get_by_ids(self, ids: List[int]) -> List[ToyCategory]:
+        """Получить категории по списку ID"""
+        result = await self.db.scalars(select(ToyCategory).where(ToyCategory.id.in_(ids)))
+        return list(result.all())
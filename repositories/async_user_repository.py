@@ -0,0 +1,21 @@
+from typing import Optional, List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.user import User
+
+
+class AsyncUserRepository:
+    """Асинхронный репозиторий для работы с пользователями"""
+    
+    def __init__(self, db: AsyncSession):
+        self._db = db
+    
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        return await self._db.get(User, user_id)
+    
+    async def get_by_phone(self, phone_number: str) -> Optional[User]:
+        return await self._db.scalar(select(User).where(User.phone_number == phone_number))
+    
+    async def get_all(self) -> List[User]:
+        result = await self._db.scalars(select(User))
+        return list(result.all())
@@ -1,12 +1,34 @@
+from enum import Enum
 from typing import Optional, List
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, load_only, selectinload
 from models.child import Child
 from models.interest import Interest
 from models.skill import Skill
 from core.interfaces import IChildRepository
+from core.next_box_preview_cache import invalidate_next_box_previews_on_commit
 from datetime import datetime, timezone
 
 
+class ChildLoad(str, Enum):
+    """Профили загрузки ребенка - что подгружать вместе с ним"""
+    OWNERSHIP = "ownership"  # Только id и parent_id: проверки прав и существования
+    TAGS = "tags"  # Интересы и навыки: состав наборов, теги
+    SUBSCRIPTIONS = "subscriptions"  # Подписки ребенка
+    PROFILE = "profile"  # Интересы, навыки и подписки: ответ ChildResponse
+
+
+def _load_options(load: ChildLoad) -> tuple:
+    """Опции загрузки профиля; коллекции грузятся отдельными SELECT ... IN,
+    без декартова произведения интересы x навыки x подписки"""
+    if load == ChildLoad.OWNERSHIP:
+        return (load_only(Child.id, Child.parent_id),)
+    if load == ChildLoad.TAGS:
+        return (selectinload(Child.interests), selectinload(Child.skills))
+    if load == ChildLoad.SUBSCRIPTIONS:
+        return (selectinload(Child.subscriptions),)
+    return (selectinload(Child.interests), selectinload(Child.skills), selectinload(Child.subscriptions))
+
+
 class ChildRepository(IChildRepository):
     """Репозиторий для работы с детьми"""
     
@@ -19,16 +41,24 @@ class ChildRepository(IChildRepository):
         self._db.refresh(child)
         return child
     
-    def get_by_id(self, child_id: int) -> Optional[Child]:
+    def get_by_id(self, child_id: int, load: ChildLoad = ChildLoad.PROFILE) -> Optional[Child]:
         return self._db.query(Child)\
-            .options(joinedload(Child.interests), joinedload(Child.skills), joinedload(Child.subscriptions))\
+            .options(*_load_options(load))\
             .filter(Child.id == child_id, Child.is_deleted == False).first()
     
-    def get_by_parent_id(self, parent_id: int) -> List[Child]:
+    def get_by_parent_id(self, parent_id: int, load: ChildLoad = ChildLoad.PROFILE) -> List[Child]:
         return self._db.query(Child)\
-            .options(joinedload(Child.interests), joinedload(Child.skills), joinedload(Child.subscriptions))\
+            .options(*_load_options(load))\
             .filter(Child.parent_id == parent_id, Child.is_deleted == False).all()
     
+    def get_by_parent_ids(self, parent_ids: List[int]) -> List[Child]:
+        """Получить детей сразу нескольких родителей (без связей)"""
+        if not parent_ids:
+            return []
+        return self._db.query(Child)\
+            .filter(Child.parent_id.in_(parent_ids), Child.is_deleted == False)\
+            .order_by(Child.id).all()
+    
     def update(self, child: Child) -> Child:
         self._db.flush()  # Только flush для применения изменений
         self._db.refresh(child)
@@ -42,11 +72,12 @@ class ChildRepository(IChildRepository):
         child.is_deleted = True
         child.deleted_at = datetime.now(timezone.utc)
         self._db.flush()  # Только flush для применения изменений
+        invalidate_next_box_previews_on_commit(self._db, [child_id])
         return True
     
     def update_interests(self, child_id: int, interest_ids: List[int]) -> bool:
         """Обновить интересы ребенка"""
-        child = self.get_by_id(child_id)
+        child = self.get_by_id(child_id, ChildLoad.TAGS)
         if not child:
             return False
         
@@ -60,7 +91,7 @@ class ChildRepository(IChildRepository):
     
     def update_skills(self, child_id: int, skill_ids: List[int]) -> bool:
         """Обновить навыки ребенка"""
-        child = self.get_by_id(child_id)
+        child = self.get_by_id(child_id, ChildLoad.TAGS)
         if not child:
             return False
         
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from models.delivery_info import DeliveryInfo
 from typing import List, Optional
+from core.database import read_replica
 
 
 class DeliveryInfoRepository:
@@ -24,6 +25,18 @@ class DeliveryInfoRepository:
             
         return query.all()
     
+    @read_replica
+    def get_by_user_ids(self, user_ids: List[int]) -> List[DeliveryInfo]:
+        """Получить адреса доставки сразу нескольких пользователей"""
+        if not user_ids:
+            return []
+        return (
+            self.db.query(DeliveryInfo)
+            .filter(DeliveryInfo.user_id.in_(user_ids))
+            .order_by(DeliveryInfo.created_at.desc())
+            .all()
+        )
+    
     def create(self, delivery_data: dict) -> DeliveryInfo:
         """Создать новый адрес доставки"""
         delivery = DeliveryInfo(**delivery_data)
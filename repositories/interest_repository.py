@@ -1,6 +1,8 @@
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from models.interest import Interest
+from core.reference_cache import invalidate_reference_on_commit, INTERESTS
+from core.database import read_replica
 
 
 class InterestRepository:
@@ -9,6 +11,7 @@ class InterestRepository:
     def __init__(self, db: Session):
         self._db = db
     
+    @read_replica
     def get_all(self) -> List[Interest]:
         """Получить все интересы"""
         return self._db.query(Interest).all()
@@ -31,6 +34,7 @@ class InterestRepository:
         self._db.add(interest)
         self._db.flush()  # Только flush для получения ID
         self._db.refresh(interest)
+        invalidate_reference_on_commit(self._db, INTERESTS)
         return interest
     
     def create_many(self, interests_data: List[dict]) -> List[Interest]:
@@ -47,4 +51,5 @@ class InterestRepository:
         for interest in interests:
             self._db.refresh(interest)
         
+        invalidate_reference_on_commit(self._db, INTERESTS)
         return interests 
\ No newline at end of file
@@ -1,8 +1,11 @@
-from typing import List, Optional
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import bindparam, func, update
 from sqlalchemy.orm import Session
-from models.inventory import Inventory
+from models.inventory import Inventory, InventoryReservation
 from repositories.toy_category_repository import ToyCategoryRepository
 import logging
+from core.database import read_replica
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +17,7 @@ class InventoryRepository:
         self._db = db
         self.category_repo = ToyCategoryRepository(db)
     
+    @read_replica
     def get_all(self) -> List[Inventory]:
         """Получить все категории на складе"""
         return self._db.query(Inventory).all()
@@ -30,6 +34,105 @@ class InventoryRepository:
         """Получить категорию на складе по ID категории"""
         return self._db.query(Inventory).filter(Inventory.category_id == category_id).first()
     
+    def get_quantities_by_category(self) -> Dict[int, int]:
+        """Получить остатки всех категорий одним запросом: category_id -> available_quantity"""
+        rows = self._db.query(Inventory.category_id, Inventory.available_quantity).all()
+        return {category_id: available for category_id, available in rows}
+    
+    def get_tracked_category_ids(self, category_ids: Iterable[int]) -> Set[int]:
+        """Категории из списка, для которых есть строка остатков (остальные склад не учитывает)"""
+        category_ids = set(category_ids)
+        if not category_ids:
+            return set()
+        rows = self._db.query(Inventory.category_id).filter(Inventory.category_id.in_(category_ids)).all()
+        return {category_id for category_id, in rows}
+
+    def try_reserve(self, category_id: int, quantity: int) -> bool:
+        """Атомарно перенести quantity из свободных в резерв, если хватает остатка
+
+        Для категории без строки остатков тоже возвращает False - отличить такую
+        категорию можно через get_tracked_category_ids.
+
+        Условный UPDATE блокирует только строку категории, поэтому параллельные
+        резервы не теряют обновлений и не уводят остаток в минус.
+        """
+        updated = self._db.query(Inventory).filter(
+            Inventory.category_id == category_id,
+            Inventory.available_quantity >= quantity
+        ).update({
+            Inventory.available_quantity: Inventory.available_quantity - quantity,
+            Inventory.reserved_quantity: Inventory.reserved_quantity + quantity
+        }, synchronize_session=False)
+        return updated > 0
+
+    def lock_available(self, category_ids: Iterable[int]) -> Dict[int, int]:
+        """Заблокировать строки категорий (SELECT ... FOR UPDATE) и вернуть свободные остатки
+
+        Строки блокируются в порядке category_id, чтобы параллельные транзакции не
+        ловили взаимоблокировки.
+        """
+        category_ids = sorted(set(category_ids))
+        if not category_ids:
+            return {}
+        rows = (
+            self._db.query(Inventory.category_id, Inventory.available_quantity)
+            .filter(Inventory.category_id.in_(category_ids))
+            .order_by(Inventory.category_id)
+            .with_for_update()
+            .all()
+        )
+        return {category_id: available for category_id, available in rows}
+
+    def _shift_quantities(self, quantities: Dict[int, int]) -> None:
+        """Перенести количества из свободных в резерв (отрицательные - обратно) одним executemany"""
+        if not quantities:
+            return
+        table = Inventory.__table__
+        statement = (
+            update(table)
+            .where(table.c.category_id == bindparam("b_category_id"))
+            .values(
+                available_quantity=table.c.available_quantity - bindparam("b_quantity"),
+                reserved_quantity=table.c.reserved_quantity + bindparam("b_quantity"),
+                updated_at=func.now()
+            )
+        )
+        self._db.execute(statement, [
+            {"b_category_id": category_id, "b_quantity": quantity}
+            for category_id, quantity in sorted(quantities.items())
+        ])
+
+    def reserve_locked(self, quantities: Dict[int, int]) -> None:
+        """Зарезервировать количества по категориям, строки которых уже заблокированы lock_available"""
+        self._shift_quantities(quantities)
+
+    def add_reservations(self, rows: List[dict]) -> None:
+        """Записать резервы наборов в журнал пакетным INSERT (box_id, category_id, quantity)"""
+        if rows:
+            self._db.execute(InventoryReservation.__table__.insert(), rows)
+
+    def release_boxes(self, box_ids: List[int]) -> Dict[int, int]:
+        """Вернуть в свободные остатки резервы наборов
+
+        Записи журнала закрываются условным UPDATE ... RETURNING, поэтому повторный
+        возврат того же набора ничего не освобождает дважды.
+        """
+        if not box_ids:
+            return {}
+        table = InventoryReservation.__table__
+        released = self._db.execute(
+            update(table)
+            .where(table.c.box_id.in_(box_ids), table.c.released_at.is_(None))
+            .values(released_at=func.now())
+            .returning(table.c.category_id, table.c.quantity)
+        ).all()
+
+        quantities: Dict[int, int] = defaultdict(int)
+        for category_id, quantity in released:
+            quantities[category_id] += quantity
+        self._shift_quantities({category_id: -quantity for category_id, quantity in quantities.items()})
+        return dict(quantities)
+    
     def create(self, category_id: int, quantity: int) -> Inventory:
         """Создать новую категорию на складе"""
         inventory = Inventory(category_id=category_id, available_quantity=quantity)
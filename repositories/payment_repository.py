@@ -1,3 +1,4 @@
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from models.payment import Payment, PaymentStatus
 from typing import List, Optional
@@ -30,9 +31,37 @@ class PaymentRepository:
         if payment:
             payment.status = status
             self.db.flush()
+            # Хранимый статус подписок зависит от статуса платежа
+            from repositories.subscription_repository import SubscriptionRepository
+            subscription_repo = SubscriptionRepository(self.db)
+            subscription_repo.sync_statuses(payment_ids=[payment_id])
+            # Отмененные подписки не получат свои наборы - освобождаем их резервы
+            if status == PaymentStatus.REFUNDED:
+                subscription_repo.release_refunded_box_reservations([payment_id])
             self.db.refresh(payment)
         return payment
 
+    def claim_for_processing(self, payment_id: int) -> Optional[str]:
+        """Атомарно переводит платеж из PENDING/FAILED в PROCESSING
+
+        Возвращает внешний ID захваченного платежа или None, если платеж не найден
+        или его уже обрабатывает кто-то другой. Условный UPDATE гарантирует, что
+        из параллельных обработчиков платеж захватит (и спишет деньги) только один.
+        """
+        external_payment_id = self.db.execute(
+            update(Payment)
+            .where(
+                Payment.id == payment_id,
+                Payment.status.in_([PaymentStatus.PENDING, PaymentStatus.FAILED])
+            )
+            .values(status=PaymentStatus.PROCESSING)
+            .returning(Payment.external_payment_id),
+            execution_options={"synchronize_session": "fetch"}
+        ).first()
+        # Статус подписок от PROCESSING не меняется (остается PENDING_PAYMENT),
+        # поэтому пересчитывать его здесь не нужно
+        return external_payment_id[0] if external_payment_id else None
+
     def get_by_external_id(self, external_payment_id: str) -> Optional[Payment]:
         """Получает платеж по внешнему ID"""
         return self.db.query(Payment).filter(
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session, joinedload
 from models.plan_toy_configuration import PlanToyConfiguration
 from typing import List, Optional
+from core.reference_cache import invalidate_reference_on_commit, PLANS
+from core.next_box_preview_cache import invalidate_next_box_previews_on_commit
 
 
 class PlanToyConfigurationRepository:
@@ -11,6 +13,15 @@ class PlanToyConfigurationRepository:
         """Получить все конфигурации"""
         return self.db.query(PlanToyConfiguration).all()
     
+    def get_all_with_categories(self) -> List[PlanToyConfiguration]:
+        """Получить все конфигурации с загрузкой категорий"""
+        return (
+            self.db.query(PlanToyConfiguration)
+            .options(joinedload(PlanToyConfiguration.category))
+            .order_by(PlanToyConfiguration.id)
+            .all()
+        )
+    
     def get_by_plan_id(self, plan_id: int) -> List[PlanToyConfiguration]:
         """Получить конфигурации для плана с загрузкой категорий"""
         return (
@@ -20,6 +31,18 @@ class PlanToyConfigurationRepository:
             .all()
         )
     
+    def get_by_plan_ids(self, plan_ids: List[int]) -> List[PlanToyConfiguration]:
+        """Получить конфигурации нескольких планов с загрузкой категорий"""
+        if not plan_ids:
+            return []
+        return (
+            self.db.query(PlanToyConfiguration)
+            .options(joinedload(PlanToyConfiguration.category))
+            .filter(PlanToyConfiguration.plan_id.in_(plan_ids))
+            .order_by(PlanToyConfiguration.id)
+            .all()
+        )
+    
     def get_by_id(self, config_id: int) -> Optional[PlanToyConfiguration]:
         """Получить конфигурацию по ID"""
         return self.db.query(PlanToyConfiguration).filter(PlanToyConfiguration.id == config_id).first()
@@ -30,6 +53,8 @@ class PlanToyConfigurationRepository:
         self.db.add(config)
         self.db.flush()
         self.db.refresh(config)
+        invalidate_reference_on_commit(self.db, PLANS)
+        invalidate_next_box_previews_on_commit(self.db)
         return config
     
     def create_many(self, configs_data: List[dict]) -> List[PlanToyConfiguration]:
@@ -45,9 +70,13 @@ class PlanToyConfigurationRepository:
         for config in configs:
             self.db.refresh(config)
         
+        invalidate_reference_on_commit(self.db, PLANS)
+        invalidate_next_box_previews_on_commit(self.db)
         return configs
     
     def delete_by_plan_id(self, plan_id: int) -> None:
         """Удалить все конфигурации для плана"""
         self.db.query(PlanToyConfiguration).filter(PlanToyConfiguration.plan_id == plan_id).delete()
-        self.db.flush() 
\ No newline at end of file
+        self.db.flush()
+        invalidate_reference_on_commit(self.db, PLANS)
+        invalidate_next_box_previews_on_commit(self.db)
@@ -1,6 +1,8 @@
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from models.skill import Skill
+from core.reference_cache import invalidate_reference_on_commit, SKILLS
+from core.database import read_replica
 
 
 class SkillRepository:
@@ -9,6 +11,7 @@ class SkillRepository:
     def __init__(self, db: Session):
         self._db = db
     
+    @read_replica
     def get_all(self) -> List[Skill]:
         """Получить все навыки"""
         return self._db.query(Skill).all()
@@ -31,6 +34,7 @@ class SkillRepository:
         self._db.add(skill)
         self._db.flush()  # Только flush для получения ID
         self._db.refresh(skill)
+        invalidate_reference_on_commit(self._db, SKILLS)
         return skill
     
     def create_many(self, skills_data: List[dict]) -> List[Skill]:
@@ -47,4 +51,5 @@ class SkillRepository:
         for skill in skills:
             self._db.refresh(skill)
         
+        invalidate_reference_on_commit(self._db, SKILLS)
         return skills 
\ No newline at end of file
@@ -1,12 +1,16 @@
 from sqlalchemy.orm import Session
 from models.subscription_plan import SubscriptionPlan
 from typing import List, Optional
+from core.reference_cache import invalidate_reference_on_commit, PLANS
+from core.next_box_preview_cache import invalidate_next_box_previews_on_commit
+from core.database import read_replica
 
 
 class SubscriptionPlanRepository:
     def __init__(self, db: Session):
         self.db = db
     
+    @read_replica
     def get_all(self) -> List[SubscriptionPlan]:
         """Получить все планы подписки"""
         return self.db.query(SubscriptionPlan).all()
@@ -25,6 +29,8 @@ class SubscriptionPlanRepository:
         self.db.add(plan)
         self.db.flush()
         self.db.refresh(plan)
+        invalidate_reference_on_commit(self.db, PLANS)
+        invalidate_next_box_previews_on_commit(self.db)
         return plan
     
     def create_many(self, plans_data: List[dict]) -> List[SubscriptionPlan]:
@@ -40,4 +46,6 @@ class SubscriptionPlanRepository:
         for plan in plans:
             self.db.refresh(plan)
         
+        invalidate_reference_on_commit(self.db, PLANS)
+        invalidate_next_box_previews_on_commit(self.db)
         return plans 
\ No newline at end of file
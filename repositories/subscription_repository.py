@@ -1,11 +1,16 @@
-from sqlalchemy.orm import Session
-from models.subscription import Subscription
+from sqlalchemy import and_, case, cast, func, literal, or_, select, update
+from sqlalchemy.orm import Session, joinedload
+from models.subscription import Subscription, SubscriptionStatus
 from models.payment import Payment, PaymentStatus
-from datetime import datetime, timezone
-from typing import List, Optional
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 from core.config import settings
 from models.child import Child
+from models.toy_box import ToyBox, ToyBoxStatus
+from core.database import read_replica
+from core.next_box_preview_cache import invalidate_next_box_previews_on_commit
+from repositories.inventory_repository import InventoryRepository
 
 
 class SubscriptionUpdateFields(BaseModel):
@@ -30,6 +35,7 @@ class SubscriptionRepository:
         self.db.add(subscription)
         self.db.flush()
         self.db.refresh(subscription)
+        invalidate_next_box_previews_on_commit(self.db, [subscription.child_id])
         return subscription
 
     def get_by_id(self, subscription_id: int) -> Optional[Subscription]:
@@ -50,14 +56,146 @@ class SubscriptionRepository:
 
     def get_active_by_child_id(self, child_id: int) -> Optional[Subscription]:
         """Получает активную подписку ребенка"""
-        # Активная подписка = есть payment, payment.status=COMPLETED, expires_at > now, НЕ на паузе
-        return self.db.query(Subscription).join(Payment).filter(
+        # Активная подписка = хранимый статус ACTIVE (оплачена, НЕ на паузе) и expires_at > now
+        return self.db.query(Subscription).filter(
             Subscription.child_id == child_id,
-            Payment.status == PaymentStatus.COMPLETED,
-            Subscription.expires_at > datetime.now(timezone.utc),
-            Subscription.is_paused == False
+            Subscription.stored_status == SubscriptionStatus.ACTIVE,
+            Subscription.expires_at > datetime.now(timezone.utc)
         ).first()
 
+    def get_effective_by_child_ids(self, child_ids: List[int]) -> Dict[int, Subscription]:
+        """Действующая подписка каждого ребенка одним запросом (с планом)
+
+        Приоритет как у цепочки get_active_by_child_id -> get_pending_payment_by_child_id ->
+        get_paused_by_child_id: активная, иначе ожидающая оплаты, иначе приостановленная.
+        """
+        if not child_ids:
+            return {}
+        return self._get_effective(Subscription.child_id.in_(child_ids))
+
+    def get_effective_by_parent_ids(self, parent_ids: List[int]) -> Dict[int, Subscription]:
+        """Действующие подписки всех (не удаленных) детей нескольких пользователей одним запросом"""
+        if not parent_ids:
+            return {}
+        children = select(Child.id).where(Child.parent_id.in_(parent_ids), Child.is_deleted == False)
+        return self._get_effective(Subscription.child_id.in_(children))
+
+    def _get_effective(self, child_filter) -> Dict[int, Subscription]:
+        priority = case(
+            (Subscription.stored_status == SubscriptionStatus.ACTIVE, 0),
+            (Subscription.stored_status == SubscriptionStatus.PENDING_PAYMENT, 1),
+            else_=2
+        )
+        ranked = (
+            select(
+                Subscription.id.label("subscription_id"),
+                func.row_number().over(
+                    partition_by=Subscription.child_id,
+                    order_by=(priority, Subscription.created_at.desc(), Subscription.id.desc())
+                ).label("rn")
+            )
+            .outerjoin(Payment, Subscription.payment_id == Payment.id)
+            .where(
+                child_filter,
+                or_(
+                    and_(
+                        Subscription.stored_status == SubscriptionStatus.ACTIVE,
+                        Subscription.expires_at > datetime.now(timezone.utc)
+                    ),
+                    and_(
+                        Subscription.stored_status == SubscriptionStatus.PENDING_PAYMENT,
+                        Subscription.payment_id.is_(None) | (Payment.status == PaymentStatus.FAILED)
+                    ),
+                    and_(
+                        Subscription.stored_status == SubscriptionStatus.PAUSED,
+                        Payment.status == PaymentStatus.COMPLETED
+                    )
+                )
+            )
+            .subquery()
+        )
+        subscriptions = (
+            self.db.query(Subscription)
+            .options(joinedload(Subscription.plan))
+            .join(ranked, ranked.c.subscription_id == Subscription.id)
+            .filter(ranked.c.rn == 1)
+            .all()
+        )
+        return {subscription.child_id: subscription for subscription in subscriptions}
+
+    def get_parent_ids_by_plan(self, plan_id: Optional[int] = None) -> List[int]:
+        """ID пользователей, у детей которых есть подписки (на план plan_id, если указан)"""
+        query = self.db.query(Child.parent_id).join(Subscription, Subscription.child_id == Child.id)\
+            .filter(Child.is_deleted == False)
+        if plan_id is not None:
+            query = query.filter(Subscription.plan_id == plan_id)
+        return [row[0] for row in query.distinct().all()]
+
+    def bulk_update_prices(self, prices: List[Dict]) -> int:
+        """Обновляет скидку и цену многих подписок одним UPDATE по первичному ключу
+
+        prices - список словарей {"id", "discount_percent", "individual_price"}.
+        """
+        if not prices:
+            return 0
+        self.db.flush()
+        self.db.execute(update(Subscription), prices)
+
+        # Загруженные в сессию подписки перечитают цены при следующем обращении
+        updated_ids = {row["id"] for row in prices}
+        for instance in list(self.db.identity_map.values()):
+            if isinstance(instance, Subscription) and instance.id in updated_ids:
+                self.db.expire(instance, ["discount_percent", "individual_price"])
+        return len(prices)
+
+    def sync_statuses(self, subscription_ids: Optional[List[int]] = None,
+                      payment_ids: Optional[List[int]] = None) -> int:
+        """Пересчитывает хранимый статус подписок одним UPDATE по паузе и статусу платежа
+
+        Без аргументов пересчитывает все подписки (заполнение колонки на существующей базе).
+        """
+        self.db.flush()
+        status_type = Subscription.__table__.c.status.type
+        payment_status = (
+            select(Payment.status)
+            .where(Payment.id == Subscription.payment_id)
+            .scalar_subquery()
+        )
+
+        # Явный CAST: иначе PostgreSQL выводит тип CASE из строковых литералов как text
+        def status_value(status: SubscriptionStatus):
+            return cast(literal(status, status_type), status_type)
+
+        status_expression = case(
+            (Subscription.is_paused == True, status_value(SubscriptionStatus.PAUSED)),
+            (payment_status == PaymentStatus.COMPLETED, status_value(SubscriptionStatus.ACTIVE)),
+            (payment_status == PaymentStatus.REFUNDED, status_value(SubscriptionStatus.CANCELLED)),
+            else_=status_value(SubscriptionStatus.PENDING_PAYMENT)
+        )
+
+        statement = update(Subscription).values(stored_status=status_expression)
+        if subscription_ids is not None:
+            statement = statement.where(Subscription.id.in_(subscription_ids))
+        if payment_ids is not None:
+            statement = statement.where(Subscription.payment_id.in_(payment_ids))
+        child_ids = self.db.scalars(
+            statement.returning(Subscription.child_id),
+            execution_options={"synchronize_session": False}
+        ).all()
+        updated = len(child_ids)
+
+        # Статус определяет активную подписку, а значит и превью следующего набора
+        if subscription_ids is None and payment_ids is None:
+            invalidate_next_box_previews_on_commit(self.db)
+        else:
+            invalidate_next_box_previews_on_commit(self.db, child_ids)
+
+        # Загруженные в сессию подписки перечитают статус при следующем обращении
+        for instance in list(self.db.identity_map.values()):
+            if isinstance(instance, Subscription):
+                self.db.expire(instance, ["stored_status"])
+        return updated
+
     def get_by_user_id(self, user_id: int) -> List[Subscription]:
         """Получает все подписки пользователя (через детей)"""
         return self.db.query(Subscription).join(
@@ -66,6 +204,65 @@ class SubscriptionRepository:
             Child.parent_id == user_id
         ).order_by(Subscription.created_at.desc()).all()
 
+    @read_replica
+    def get_by_user_ids(self, user_ids: List[int]) -> List[Subscription]:
+        """Получает подписки нескольких пользователей вместе с ребенком и планом"""
+        if not user_ids:
+            return []
+        return self.db.query(Subscription).join(
+            Child, Subscription.child_id == Child.id
+        ).options(
+            joinedload(Subscription.child),
+            joinedload(Subscription.plan)
+        ).filter(
+            Child.parent_id.in_(user_ids)
+        ).order_by(Subscription.created_at.desc()).all()
+
+    def _with_box_details(self, query):
+        """Подгружает все, что нужно для генерации набора: адрес, ребенка с интересами и навыками"""
+        return query.options(
+            joinedload(Subscription.delivery_info),
+            joinedload(Subscription.child).selectinload(Child.interests),
+            joinedload(Subscription.child).selectinload(Child.skills)
+        )
+
+    def get_by_ids_with_box_details(self, subscription_ids: List[int]) -> List[Subscription]:
+        """Получает подписки по списку ID с данными для генерации наборов"""
+        if not subscription_ids:
+            return []
+        return self._with_box_details(
+            self.db.query(Subscription).filter(Subscription.id.in_(subscription_ids))
+        ).order_by(Subscription.id).all()
+
+    def get_due_for_box(self, due_date: date) -> List[Subscription]:
+        """Получает активные подписки, следующий набор которых нужно доставить в due_date
+
+        Следующий набор доставляется через NEXT_DELIVERY_PERIOD дней после возврата
+        текущего (последнего созданного) набора ребенка.
+        """
+        latest_box = (
+            self.db.query(
+                ToyBox.child_id.label("child_id"),
+                ToyBox.return_date.label("return_date"),
+                func.row_number().over(
+                    partition_by=ToyBox.child_id,
+                    order_by=(ToyBox.created_at.desc(), ToyBox.id.desc())
+                ).label("rn")
+            )
+            .subquery()
+        )
+        return_date = due_date - timedelta(days=settings.NEXT_DELIVERY_PERIOD)
+        return self._with_box_details(
+            self.db.query(Subscription)
+            .join(latest_box, latest_box.c.child_id == Subscription.child_id)
+            .filter(
+                Subscription.stored_status == SubscriptionStatus.ACTIVE,
+                Subscription.expires_at > datetime.now(timezone.utc),
+                latest_box.c.rn == 1,
+                latest_box.c.return_date == return_date
+            )
+        ).order_by(Subscription.id).all()
+
     def get_pending_payment_by_user_id(self, user_id: int) -> List[Subscription]:
         """Получает подписки пользователя ожидающие оплату"""
         return self.db.query(Subscription).join(
@@ -90,6 +287,8 @@ class SubscriptionRepository:
             ).update({
                 "status": PaymentStatus.REFUNDED
             })
+            self.sync_statuses(payment_ids=ids_list)
+            self.release_refunded_box_reservations(ids_list)
             return updated_count
         
         return 0
@@ -111,10 +310,26 @@ class SubscriptionRepository:
             ).update({
                 "status": PaymentStatus.REFUNDED
             })
+            self.sync_statuses(payment_ids=ids_list)
+            self.release_refunded_box_reservations(ids_list)
             return updated_count
         
         return 0
 
+    def release_refunded_box_reservations(self, payment_ids: List[int]) -> Dict[int, int]:
+        """Возвращает на склад резервы еще не отправленных наборов подписок возвращенных платежей
+
+        Отправленные наборы у клиента - их резерв освобождается при возврате набора.
+        Журнал резервов закрывается условно, поэтому повторный вызов ничего не удвоит.
+        """
+        box_ids = [box_id for box_id, in self.db.query(ToyBox.id).join(
+            Subscription, ToyBox.subscription_id == Subscription.id
+        ).filter(
+            Subscription.payment_id.in_(payment_ids),
+            ToyBox.status.in_([ToyBoxStatus.PLANNED, ToyBoxStatus.ASSEMBLED])
+        ).all()]
+        return InventoryRepository(self.db).release_boxes(box_ids)
+
     def get_pending_payment_subscriptions(self) -> List[Subscription]:
         """Получает подписки ожидающие оплату"""
         return self.db.query(Subscription).filter(
@@ -122,9 +337,9 @@ class SubscriptionRepository:
         ).all()
 
     def get_active_subscriptions(self) -> List[Subscription]:
-        """Получает все активные подписки"""
-        return self.db.query(Subscription).join(Payment).filter(
-            Payment.status == PaymentStatus.COMPLETED,
+        """Получает все активные подписки (включая приостановленные)"""
+        return self.db.query(Subscription).filter(
+            Subscription.stored_status.in_([SubscriptionStatus.ACTIVE, SubscriptionStatus.PAUSED]),
             Subscription.expires_at > datetime.now(timezone.utc)
         ).all()
 
@@ -196,11 +411,18 @@ class SubscriptionRepository:
             return None
         
         # Обновляем только переданные поля (не None)
-        for field, value in update_data.model_dump(exclude_unset=True).items():
-            if value is not None:
-                setattr(subscription, field, value)
+        changes = {
+            field: value for field, value in update_data.model_dump(exclude_unset=True).items()
+            if value is not None
+        }
+        previous_child_id = subscription.child_id
+        for field, value in changes.items():
+            setattr(subscription, field, value)
         
         self.db.flush()
+        invalidate_next_box_previews_on_commit(self.db, {previous_child_id, subscription.child_id})
+        if "is_paused" in changes or "payment_id" in changes:
+            self.sync_statuses(subscription_ids=[subscription.id])
         self.db.refresh(subscription)
         
         return subscription 
\ No newline at end of file
@@ -1,8 +1,40 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Select, and_, func, insert, or_, select, update
+from sqlalchemy.orm import Session, aliased, joinedload, selectinload
 from models.toy_box import ToyBox, ToyBoxItem, ToyBoxReview, ToyBoxStatus
 from models.child import Child
-from typing import List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import date
+from core.database import read_replica
+from core.next_box_preview_cache import invalidate_next_box_previews_on_commit
+
+# Наборы, которые еще не доставлены: их даты и время следуют за адресом доставки
+ACTIVE_BOX_STATUSES = [ToyBoxStatus.PLANNED, ToyBoxStatus.ASSEMBLED, ToyBoxStatus.SHIPPED]
+
+
+def history_page_query(parent_id: int, limit: int, statuses: Optional[List[ToyBoxStatus]] = None,
+                       after_id: Optional[int] = None) -> Select:
+    """Страница истории наборов всех детей родителя, новые первыми (общий запрос для sync и async)
+
+    Keyset по (created_at, id): after_id - ID последнего набора предыдущей страницы,
+    его created_at берется подзапросом, так что курсор сравнивается в представлении БД.
+    Состав и отзывы наборов догружаются пакетными SELECT по ID страницы.
+    """
+    query = (
+        select(ToyBox)
+        .join(Child, Child.id == ToyBox.child_id)
+        .where(Child.parent_id == parent_id, Child.is_deleted == False)
+        .options(selectinload(ToyBox.items), selectinload(ToyBox.reviews))
+    )
+    if statuses:
+        query = query.where(ToyBox.status.in_(statuses))
+    if after_id is not None:
+        cursor_box = aliased(ToyBox)
+        cursor_created_at = select(cursor_box.created_at).where(cursor_box.id == after_id).scalar_subquery()
+        query = query.where(or_(
+            ToyBox.created_at < cursor_created_at,
+            and_(ToyBox.created_at == cursor_created_at, ToyBox.id < after_id),
+        ))
+    return query.order_by(ToyBox.created_at.desc(), ToyBox.id.desc()).limit(limit)
 
 
 class ToyBoxRepository:
@@ -15,6 +47,7 @@ class ToyBoxRepository:
         self.db.add(box)
         self.db.flush()
         self.db.refresh(box)
+        invalidate_next_box_previews_on_commit(self.db, [box.child_id])
         return box
 
     def get_by_id(self, box_id: int) -> Optional[ToyBox]:
@@ -32,10 +65,43 @@ class ToyBoxRepository:
             self.db.query(ToyBox)
             .options(joinedload(ToyBox.items), joinedload(ToyBox.reviews))
             .filter(ToyBox.child_id == child_id)
-            .order_by(ToyBox.created_at.desc())
+            .order_by(ToyBox.created_at.desc(), ToyBox.id.desc())
             .first()
         )
 
+    @read_replica
+    def get_current_boxes_by_child_ids(self, child_ids: List[int]) -> Dict[int, ToyBox]:
+        """Получить текущий (последний) набор для каждого ребёнка из списка одним запросом
+
+        PostgreSQL: DISTINCT ON (child_id), остальные БД - row_number() по окну ребенка.
+        Оба варианта идут по индексу (child_id, created_at DESC, id DESC);
+        состав и отзывы догружаются пакетными SELECT.
+        """
+        if not child_ids:
+            return {}
+        if self.db.get_bind().dialect.name == "postgresql":
+            query = (
+                select(ToyBox)
+                .where(ToyBox.child_id.in_(child_ids))
+                .order_by(ToyBox.child_id, ToyBox.created_at.desc(), ToyBox.id.desc())
+                .distinct(ToyBox.child_id)
+            )
+        else:
+            ranked = (
+                select(
+                    ToyBox.id.label("box_id"),
+                    func.row_number().over(
+                        partition_by=ToyBox.child_id,
+                        order_by=(ToyBox.created_at.desc(), ToyBox.id.desc())
+                    ).label("rn")
+                )
+                .where(ToyBox.child_id.in_(child_ids))
+                .subquery()
+            )
+            query = select(ToyBox).join(ranked, ranked.c.box_id == ToyBox.id).where(ranked.c.rn == 1)
+        boxes = self.db.scalars(query.options(selectinload(ToyBox.items), selectinload(ToyBox.reviews))).all()
+        return {box.child_id: box for box in boxes}
+
     def get_boxes_by_child(self, child_id: int, limit: Optional[int] = None) -> List[ToyBox]:
         """Получить все наборы ребёнка"""
         query = (
@@ -48,53 +114,120 @@ class ToyBoxRepository:
             query = query.limit(limit)
         return query.all()
 
-    def get_active_boxes_by_delivery_info_id(self, delivery_info_id: int, user_id: int) -> List[ToyBox]:
-        """Получить активные наборы по ID адреса доставки для конкретного пользователя"""
-        active_statuses = [ToyBoxStatus.PLANNED, ToyBoxStatus.ASSEMBLED, ToyBoxStatus.SHIPPED]
-        return (
+    @read_replica
+    def get_history_page(self, parent_id: int, limit: int, statuses: Optional[List[ToyBoxStatus]] = None,
+                         after_id: Optional[int] = None) -> List[ToyBox]:
+        """Страница истории наборов всех детей родителя (см. history_page_query)"""
+        return list(self.db.scalars(history_page_query(parent_id, limit, statuses, after_id)).all())
+
+    def get_recent_boxes_by_child_ids(self, child_ids: List[int], limit: int) -> Dict[int, List[ToyBox]]:
+        """Получить последние limit наборов каждого ребёнка (новые первыми) вместе с составом"""
+        if not child_ids:
+            return {}
+        ranked = (
+            self.db.query(
+                ToyBox.id.label("box_id"),
+                func.row_number().over(
+                    partition_by=ToyBox.child_id,
+                    order_by=(ToyBox.created_at.desc(), ToyBox.id.desc())
+                ).label("rn")
+            )
+            .filter(ToyBox.child_id.in_(child_ids))
+            .subquery()
+        )
+        boxes = (
             self.db.query(ToyBox)
-            .options(joinedload(ToyBox.items))
-            .join(Child, ToyBox.child_id == Child.id)  # Присоединяем ребенка
-            .filter(
+            .options(selectinload(ToyBox.items))
+            .join(ranked, ranked.c.box_id == ToyBox.id)
+            .filter(ranked.c.rn <= limit)
+            .order_by(ToyBox.child_id, ranked.c.rn)
+            .all()
+        )
+        result: Dict[int, List[ToyBox]] = {}
+        for box in boxes:
+            result.setdefault(box.child_id, []).append(box)
+        return result
+
+    def get_planned_delivery_dates(self, child_ids: List[int]) -> Set[Tuple[int, date]]:
+        """Пары (child_id, delivery_date) запланированных наборов детей одним запросом"""
+        if not child_ids:
+            return set()
+        rows = self.db.query(ToyBox.child_id, ToyBox.delivery_date).filter(
+            ToyBox.child_id.in_(child_ids),
+            ToyBox.status == ToyBoxStatus.PLANNED
+        ).all()
+        return {(child_id, delivery_date) for child_id, delivery_date in rows}
+
+    def bulk_create_boxes(self, boxes_data: List[dict], items_data: List[List[dict]]) -> List[int]:
+        """Создать наборы и их состав пакетными INSERT
+
+        items_data[i] - состав для boxes_data[i]. Возвращает ID наборов в том же порядке.
+        """
+        if not boxes_data:
+            return []
+        box_ids = list(self.db.scalars(
+            insert(ToyBox).returning(ToyBox.id, sort_by_parameter_order=True),
+            boxes_data
+        ))
+        rows = [
+            {"box_id": box_id, **item}
+            for box_id, items in zip(box_ids, items_data)
+            for item in items
+        ]
+        if rows:
+            self.db.execute(insert(ToyBoxItem), rows)
+        invalidate_next_box_previews_on_commit(self.db, [box["child_id"] for box in boxes_data])
+        return box_ids
+
+    def update_active_boxes_delivery(self, delivery_info_id: int, user_id: int, values: dict) -> List[ToyBox]:
+        """Обновить поля доставки активных наборов адреса пользователя одним UPDATE ... RETURNING
+
+        values - новые значения колонок (delivery_date, return_date, delivery_time, return_time).
+        Возвращает измененные наборы (без загруженного состава).
+        """
+        statement = (
+            update(ToyBox)
+            .where(
                 ToyBox.delivery_info_id == delivery_info_id,
-                ToyBox.status.in_(active_statuses),
-                Child.parent_id == user_id  # Проверяем что ребенок принадлежит пользователю
+                ToyBox.status.in_(ACTIVE_BOX_STATUSES),
+                # Ребенок принадлежит пользователю
+                ToyBox.child_id.in_(select(Child.id).where(Child.parent_id == user_id))
             )
-            .order_by(ToyBox.created_at.desc())
-            .all()
+            .values(**values)
         )
+        return self._update_returning(statement)
 
-    def update_delivery_date(self, box_id: int, delivery_date: date, return_date: date) -> Optional[ToyBox]:
-        """Обновить дату доставки и возврата набора"""
-        box = self.get_by_id(box_id)
-        if box:
-            box.delivery_date = delivery_date
-            box.return_date = return_date
-            self.db.flush()
-            self.db.refresh(box)
-        return box
+    def shift_delivery_dates(self, date_from: date, date_to: date, days: int) -> List[ToyBox]:
+        """Сдвинуть даты доставки и возврата активных наборов с доставкой в [date_from, date_to] на days дней"""
+        statement = (
+            update(ToyBox)
+            .where(
+                ToyBox.delivery_date.between(date_from, date_to),
+                ToyBox.status.in_(ACTIVE_BOX_STATUSES)
+            )
+            .values(
+                delivery_date=self._add_days(ToyBox.delivery_date, days),
+                return_date=self._add_days(ToyBox.return_date, days)
+            )
+        )
+        return self._update_returning(statement)
 
-    def update_delivery_time(self, box_id: int, delivery_time: str) -> Optional[ToyBox]:
-        """Обновить время доставки и возврата набора"""
-        box = self.get_by_id(box_id)
-        if box:
-            box.delivery_time = delivery_time
-            box.return_time = delivery_time  # Используем то же время для возврата
-            self.db.flush()
-            self.db.refresh(box)
-        return box
+    def _add_days(self, column, days: int):
+        """Выражение "дата + days дней" для текущего диалекта"""
+        if self.db.get_bind().dialect.name == "sqlite":
+            # SQLite хранит даты строками
+            return func.date(column, f"{days:+d} days")
+        return column + days
 
-    def update_delivery_date_and_time(self, box_id: int, delivery_date: date, delivery_time: str, return_date: date) -> Optional[ToyBox]:
-        """Обновить дату и время доставки и возврата набора"""
-        box = self.get_by_id(box_id)
-        if box:
-            box.delivery_date = delivery_date
-            box.delivery_time = delivery_time
-            box.return_date = return_date
-            box.return_time = delivery_time  # Используем то же время для возврата
-            self.db.flush()
-            self.db.refresh(box)
-        return box
+    def _update_returning(self, statement) -> List[ToyBox]:
+        """Выполнить UPDATE наборов, вернуть измененные строки и сбросить превью их детей"""
+        self.db.flush()
+        boxes = list(self.db.scalars(
+            statement.returning(ToyBox),
+            execution_options={"synchronize_session": "fetch"}
+        ))
+        invalidate_next_box_previews_on_commit(self.db, [box.child_id for box in boxes])
+        return boxes
 
     def update_status(self, box_id: int, status: ToyBoxStatus) -> Optional[ToyBox]:
         """Обновить статус набора"""
@@ -105,6 +238,29 @@ class ToyBoxRepository:
             self.db.refresh(box)
         return box
 
+    def transition_status(self, box_ids: List[int], status: ToyBoxStatus,
+                          from_statuses: List[ToyBoxStatus]) -> List[int]:
+        """Перевести наборы в status одним условным UPDATE: меняются только наборы в from_statuses
+
+        Возвращает ID измененных наборов.
+        """
+        if not box_ids or not from_statuses:
+            return []
+        self.db.flush()
+        statement = (
+            update(ToyBox)
+            .where(ToyBox.id.in_(box_ids), ToyBox.status.in_(from_statuses))
+            .values(status=status)
+            .returning(ToyBox.id)
+        )
+        return list(self.db.scalars(statement, execution_options={"synchronize_session": "fetch"}))
+
+    def get_statuses(self, box_ids: List[int]) -> Dict[int, ToyBoxStatus]:
+        """Текущие статусы наборов по ID (без загрузки наборов)"""
+        if not box_ids:
+            return {}
+        return dict(self.db.execute(select(ToyBox.id, ToyBox.status).where(ToyBox.id.in_(box_ids))).all())
+
     def add_items(self, box_id: int, items_data: List[dict]) -> List[ToyBoxItem]:
         """Добавить состав в набор"""
         items = []
@@ -3,7 +3,11 @@ from models.toy_category import ToyCategory
 from models.interest import Interest
 from models.skill import Skill
 from typing import List, Optional
+from core.reference_cache import invalidate_reference_on_commit, CATEGORIES, PLANS
+from core.next_box_preview_cache import invalidate_next_box_previews_on_commit
+from core.category_affinity_index import invalidate_affinity_index_on_commit
 import logging
+from core.database import read_replica
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +16,7 @@ class ToyCategoryRepository:
     def __init__(self, db: Session):
         self.db = db
     
+    @read_replica
     def get_all(self) -> List[ToyCategory]:
         """Получить все категории игрушек"""
         return self.db.query(ToyCategory).all()
@@ -30,6 +35,10 @@ class ToyCategoryRepository:
         self.db.add(category)
         self.db.flush()  # Только flush для получения ID
         self.db.refresh(category)
+        invalidate_reference_on_commit(self.db, CATEGORIES, PLANS)
+        invalidate_next_box_previews_on_commit(self.db)
+        # Новая категория должна попасть в скоринг подбора наборов
+        invalidate_affinity_index_on_commit(self.db)
         return category
     
     def create_many(self, categories_data: List[dict]) -> List[ToyCategory]:
@@ -45,6 +54,10 @@ class ToyCategoryRepository:
         for category in categories:
             self.db.refresh(category)
         
+        invalidate_reference_on_commit(self.db, CATEGORIES, PLANS)
+        invalidate_next_box_previews_on_commit(self.db)
+        # Новая категория должна попасть в скоринг подбора наборов
+        invalidate_affinity_index_on_commit(self.db)
         return categories
     
     def add_interest(self, category_id: int, interest: Interest) -> bool:
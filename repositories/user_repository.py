@@ -1,7 +1,9 @@
 from typing import Optional, List
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from core.interfaces import IUserRepository
-from models.user import User
+from models.user import User, UserRole
+from core.database import read_replica
 
 
 class UserRepository(IUserRepository):
@@ -26,6 +28,20 @@ class UserRepository(IUserRepository):
     def get_all(self) -> List[User]:
         return self._db.query(User).all()
     
+    @read_replica
+    def get_page(self, limit: int, after_id: Optional[int] = None,
+                 role: Optional[UserRole] = None, search: Optional[str] = None) -> List[User]:
+        """Страница пользователей по курсору (id > after_id), отсортированная по id"""
+        query = self._db.query(User)
+        if after_id is not None:
+            query = query.filter(User.id > after_id)
+        if role is not None:
+            query = query.filter(User.role == role)
+        if search:
+            pattern = f"%{search}%"
+            query = query.filter(or_(User.phone_number.ilike(pattern), User.name.ilike(pattern)))
+        return query.order_by(User.id).limit(limit).all()
+    
     def update(self, user: User) -> User:
         self._db.add(user)
         self._db.flush()
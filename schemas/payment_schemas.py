@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from enum import Enum
 
 
@@ -7,6 +8,15 @@ class PaymentStatusEnum(str, Enum):
     """Статусы платежа"""
     SUCCESS = "success"
     FAILED = "failed"
+    PENDING = "pending"  # Платеж поставлен в очередь фоновой обработки
+
+
+class PaymentJobStatusEnum(str, Enum):
+    """Статусы фоновой задачи обработки платежа"""
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
 
 
 class PaymentResult(BaseModel):
@@ -35,8 +45,9 @@ class BatchPaymentResponse(BaseModel):
 
 class ProcessPaymentResponse(BaseModel):
     """Схема ответа при обработке платежа"""
-    status: str  # "success" или "failed"
+    status: str  # "success", "failed" или "pending"
     message: str
+    job_id: Optional[str] = None
 
 
 class PaymentReturnRequest(BaseModel):
@@ -61,4 +72,17 @@ class ProcessSubscriptionsResponse(BaseModel):
     status: PaymentStatusEnum
     message: str
     payment_id: int
-    amount: float 
\ No newline at end of file
+    amount: float
+    job_id: Optional[str] = None
+
+
+class PaymentJobResponse(BaseModel):
+    """Схема состояния фоновой задачи обработки платежа"""
+    job_id: str
+    payment_id: int
+    status: PaymentJobStatusEnum
+    attempts: int
+    payment_succeeded: Optional[bool] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime 
\ No newline at end of file
@@ -73,4 +73,14 @@ class SubscriptionListResponse(BaseModel):
     """Схема для списка подписок"""
     subscriptions: list[SubscriptionWithDetailsResponse]
     total_count: int
-    active_count: int 
\ No newline at end of file
+    active_count: int 
+
+class DiscountRecalculationRequest(BaseModel):
+    """Запрос на пакетный пересчет скидок: по списку пользователей или по плану (без параметров - все)"""
+    user_ids: Optional[list[int]] = Field(default=None, description="ID пользователей")
+    plan_id: Optional[int] = Field(default=None, description="ID плана, цена которого изменилась")
+
+
+class DiscountRecalculationResponse(BaseModel):
+    """Результат пакетного пересчета скидок"""
+    updated: int = Field(..., description="Количество подписок с измененной ценой")
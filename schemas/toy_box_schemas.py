@@ -82,4 +82,59 @@ class ToyBoxListResponse(BaseModel):
 
 class ToyBoxReviewsResponse(BaseModel):
     """Список отзывов на набор"""
-    reviews: List[ToyBoxReviewResponse] 
\ No newline at end of file
+    reviews: List[ToyBoxReviewResponse] 
+
+class BulkBoxGenerationRequest(BaseModel):
+    """Запрос на пакетную генерацию наборов: список подписок или все подписки к дате доставки"""
+    subscription_ids: Optional[List[int]] = Field(None, description="ID подписок")
+    due_date: Optional[date] = Field(None, description="Дата доставки следующего набора")
+
+
+class BulkBoxGenerationFailure(BaseModel):
+    """Подписка, для которой набор не создан"""
+    subscription_id: int
+    reason: str
+
+
+class BulkBoxGenerationResponse(BaseModel):
+    """Результат пакетной генерации наборов"""
+    requested: int
+    created: int
+    box_ids: List[int]
+    failures: List[BulkBoxGenerationFailure]
+    duration_ms: float
+    boxes_per_second: float
+
+
+class DeliveryShiftRequest(BaseModel):
+    """Перенос доставок активных наборов из окна дат"""
+    date_from: date = Field(..., description="Начало окна дат доставки (включительно)")
+    date_to: date = Field(..., description="Конец окна дат доставки (включительно)")
+    days: int = Field(..., description="На сколько дней сдвинуть доставку и возврат (может быть отрицательным)")
+
+
+class DeliveryShiftResponse(BaseModel):
+    """Результат переноса доставок"""
+    updated: int
+    box_ids: List[int]
+
+
+class BoxStatusTransitionRequest(BaseModel):
+    """Пакетный перевод наборов в статус (например, отсканированная паллета на складе)"""
+    box_ids: List[int] = Field(..., min_length=1, max_length=5000, description="ID наборов")
+    status: ToyBoxStatus = Field(..., description="Новый статус")
+
+
+class BoxStatusTransitionReject(BaseModel):
+    """Набор, статус которого не изменен"""
+    box_id: int
+    current_status: Optional[ToyBoxStatus] = None
+    reason: str
+
+
+class BoxStatusTransitionResponse(BaseModel):
+    """Результат пакетного перевода статусов"""
+    requested: int
+    updated: int
+    box_ids: List[int]
+    rejects: List[BoxStatusTransitionReject]
@@ -0,0 +1,126 @@
+from collections import defaultdict
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from repositories.user_repository import UserRepository
+from repositories.child_repository import ChildRepository
+from repositories.delivery_info_repository import DeliveryInfoRepository
+from repositories.subscription_repository import SubscriptionRepository
+from repositories.toy_box_repository import ToyBoxRepository
+from models.user import UserRole
+from models.subscription import SubscriptionStatus
+from schemas.admin_schemas import AdminUserResponse, ChildWithBoxesResponse
+from schemas.delivery_info_schemas import DeliveryInfoResponse, DeliveryInfoListResponse
+from schemas.subscription_schemas import SubscriptionWithDetailsResponse
+from schemas.toy_box_schemas import ToyBoxResponse
+from services.toy_box_service import build_next_box_response
+from services.subscription_plan_service import get_plan_configs_by_plan
+
+
+class AdminUserService:
+    """Read-модель админки: пользователи со всеми данными за фиксированное число запросов"""
+
+    def __init__(self, db: Session):
+        self.user_repo = UserRepository(db)
+        self.child_repo = ChildRepository(db)
+        self.delivery_repo = DeliveryInfoRepository(db)
+        self.subscription_repo = SubscriptionRepository(db)
+        self.box_repo = ToyBoxRepository(db)
+        self.db = db
+
+    def get_users_page(self, limit: int = 50, after_id: Optional[int] = None,
+                       role: Optional[UserRole] = None,
+                       search: Optional[str] = None) -> Tuple[List[AdminUserResponse], Optional[int]]:
+        """Страница пользователей для админки и курсор следующей страницы
+
+        Количество запросов не зависит ни от числа пользователей, ни от числа детей:
+        пользователи, дети, адреса, подписки и текущие наборы загружаются пачками
+        по списку ID, конфигурации планов берутся из кэша справочников.
+        """
+        # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+        users = self.user_repo.get_page(limit + 1, after_id, role, search)
+        has_more = len(users) > limit
+        users = users[:limit]
+        if not users:
+            return [], None
+
+        user_ids = [user.id for user in users]
+
+        children_by_user = defaultdict(list)
+        children = self.child_repo.get_by_parent_ids(user_ids)
+        for child in children:
+            children_by_user[child.parent_id].append(child)
+
+        addresses_by_user = defaultdict(list)
+        for address in self.delivery_repo.get_by_user_ids(user_ids):
+            addresses_by_user[address.user_id].append(address)
+
+        subscriptions_by_user = defaultdict(list)
+        active_by_child = {}
+        for subscription in self.subscription_repo.get_by_user_ids(user_ids):
+            subscriptions_by_user[subscription.child.parent_id].append(subscription)
+            if subscription.status == SubscriptionStatus.ACTIVE:
+                active_by_child.setdefault(subscription.child_id, subscription)
+
+        current_boxes = self.box_repo.get_current_boxes_by_child_ids([child.id for child in children])
+
+        configs_by_plan = get_plan_configs_by_plan(self.db)
+
+        result = []
+        for user in users:
+            children_with_boxes = []
+            for child in children_by_user[user.id]:
+                current_box = current_boxes.get(child.id)
+                active_subscription = active_by_child.get(child.id)
+
+                # Следующий набор считается так же, как в generate_next_box_for_child
+                next_box = None
+                if active_subscription and configs_by_plan.get(active_subscription.plan_id):
+                    next_box = build_next_box_response(configs_by_plan[active_subscription.plan_id], current_box)
+
+                children_with_boxes.append(ChildWithBoxesResponse(
+                    id=child.id,
+                    name=child.name,
+                    date_of_birth=child.date_of_birth.isoformat(),
+                    gender=child.gender.value,
+                    has_limitations=child.has_limitations,
+                    comment=child.comment,
+                    current_box=ToyBoxResponse.model_validate(current_box) if current_box else None,
+                    next_box=next_box
+                ))
+
+            subscriptions = [
+                SubscriptionWithDetailsResponse(
+                    id=subscription.id,
+                    child_id=subscription.child_id,
+                    plan_id=subscription.plan_id,
+                    delivery_info_id=subscription.delivery_info_id,
+                    status=subscription.status,
+                    discount_percent=subscription.discount_percent,
+                    created_at=subscription.created_at,
+                    expires_at=subscription.expires_at,
+                    is_paused=subscription.is_paused,
+                    child_name=subscription.child.name,
+                    plan_name=subscription.plan.name,
+                    plan_price=subscription.plan.price_monthly,
+                    final_price=subscription.individual_price,
+                    user_id=user.id,
+                    user_name=user.name
+                )
+                for subscription in subscriptions_by_user[user.id]
+            ]
+
+            result.append(AdminUserResponse(
+                id=user.id,
+                phone_number=user.phone_number,
+                name=user.name,
+                role=user.role.value,
+                created_at=user.created_at,
+                children=children_with_boxes,
+                subscriptions=subscriptions,
+                delivery_addresses=DeliveryInfoListResponse(addresses=[
+                    DeliveryInfoResponse.model_validate(address) for address in addresses_by_user[user.id]
+                ])
+            ))
+
+        next_cursor = users[-1].id if has_more else None
+        return result, next_cursor
@@ -1,9 +1,12 @@
+import logging
 from sqlalchemy.orm import Session
 from models.user import User
 from .otp_service import OTPService
 from .jwt_service import get_jwt_service
 from typing import Optional, Dict
 
+logger = logging.getLogger(__name__)
+
 
 class AuthService:
     def __init__(self, db: Session, otp_service: OTPService):
@@ -28,13 +31,16 @@ class AuthService:
     def verify_otp_and_create_user(self, phone: str, code: str) -> Optional[User]:
         """Проверяет OTP код и создает пользователя"""
         if not self.otp_service.verify_code(phone, code):
-            print(f"AuthService: Код {code} для {phone} не прошел проверку")
+            logger.debug("Код для %s не прошел проверку", phone)
             return None
-        
+        return self.get_or_create_user(phone)
+    
+    def get_or_create_user(self, phone: str) -> User:
+        """Возвращает пользователя с телефоном (код уже проверен), создавая его при первом входе"""
         # Проверяем, существует ли пользователь
         existing_user = self.db.query(User).filter(User.phone_number == phone).first()
         if existing_user:
-            print(f"AuthService: Пользователь {phone} уже существует")
+            logger.debug("Пользователь %s уже существует", phone)
             return existing_user
         
         # Создаем нового пользователя
@@ -43,7 +49,7 @@ class AuthService:
         self.db.flush()  # Только flush для получения ID
         self.db.refresh(new_user)
         
-        print(f"AuthService: Создан новый пользователь {phone}")
+        logger.info("Создан новый пользователь %s", phone)
         return new_user
     
     def initiate_phone_change(self, user_id: int, current_phone: str, current_code: str, new_phone: str) -> bool:
@@ -51,31 +57,31 @@ class AuthService:
         # Получаем пользователя
         user = self.db.query(User).filter(User.id == user_id).first()
         if not user:
-            print(f"AuthService: Пользователь с ID {user_id} не найден")
+            logger.info("Пользователь с ID %s не найден", user_id)
             return False
         
         # Проверяем что текущий номер совпадает
         if user.phone_number != current_phone:
-            print(f"AuthService: Неверный текущий номер {current_phone} для пользователя {user_id}")
+            logger.info("Неверный текущий номер %s для пользователя %s", current_phone, user_id)
             return False
         
         # Проверяем OTP для текущего номера
         if not self.otp_service.verify_code(current_phone, current_code):
-            print(f"AuthService: Неверный код {current_code} для текущего номера {current_phone}")
+            logger.info("Неверный код для текущего номера %s", current_phone)
             return False
         
         # Проверяем что новый номер не занят другим пользователем
         existing_user = self.db.query(User).filter(User.phone_number == new_phone).first()
         if existing_user and existing_user.id != user_id:
-            print(f"AuthService: Новый номер {new_phone} уже занят пользователем {existing_user.id}")
+            logger.info("Новый номер %s уже занят пользователем %s", new_phone, existing_user.id)
             return False
         
         # Отправляем OTP на новый номер
         success = self.otp_service.send_code(new_phone)
         if success:
-            print(f"AuthService: OTP отправлен на новый номер {new_phone} для пользователя {user_id}")
+            logger.info("OTP отправлен на новый номер %s для пользователя %s", new_phone, user_id)
         else:
-            print(f"AuthService: Не удалось отправить OTP на новый номер {new_phone}")
+            logger.warning("Не удалось отправить OTP на новый номер %s", new_phone)
         
         return success
     
@@ -84,18 +90,18 @@ class AuthService:
         # Получаем пользователя
         user = self.db.query(User).filter(User.id == user_id).first()
         if not user:
-            print(f"AuthService: Пользователь с ID {user_id} не найден")
+            logger.info("Пользователь с ID %s не найден", user_id)
             return None
         
         # Проверяем OTP для нового номера
         if not self.otp_service.verify_code(new_phone, new_code):
-            print(f"AuthService: Неверный код {new_code} для нового номера {new_phone}")
+            logger.info("Неверный код для нового номера %s", new_phone)
             return None
         
         # Проверяем что новый номер не занят другим пользователем
         existing_user = self.db.query(User).filter(User.phone_number == new_phone).first()
         if existing_user and existing_user.id != user_id:
-            print(f"AuthService: Новый номер {new_phone} уже занят пользователем {existing_user.id}")
+            logger.info("Новый номер %s уже занят пользователем %s", new_phone, existing_user.id)
             return None
         
         # Обновляем номер телефона
@@ -105,7 +111,7 @@ class AuthService:
         self.db.flush()
         self.db.refresh(user)
         
-        print(f"AuthService: Номер телефона изменен с {old_phone} на {new_phone} для пользователя {user_id}")
+        logger.info("Номер телефона изменен с %s на %s для пользователя %s", old_phone, new_phone, user_id)
         return user
     
     def get_user_by_phone(self, phone: str) -> Optional[User]:
@@ -0,0 +1,181 @@
+import logging
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from core.config import settings
+from models.subscription import Subscription, SubscriptionStatus
+from models.toy_box import ToyBox, ToyBoxStatus
+from repositories.subscription_repository import SubscriptionRepository
+from repositories.toy_box_repository import ToyBoxRepository
+from schemas.toy_box_schemas import BulkBoxGenerationResponse, BulkBoxGenerationFailure
+from services.inventory_service import InventoryService, InventoryLimits
+from services.category_mapping_service import CategoryMappingService
+from services.toy_box_service import build_interest_tags, compose_box_items
+from services.subscription_plan_service import get_plan_configs_by_plan
+
+logger = logging.getLogger(__name__)
+
+
+class BoxGenerationService:
+    """Пакетная генерация наборов для волн продлений
+
+    Все данные (подписки с детьми и адресами, конфигурации планов, последние
+    наборы детей, остатки склада) загружаются пачками, состав считается в памяти,
+    наборы, их состав и резервы склада сохраняются пакетными запросами.
+    Подписки, ребенку которых уже запланирован набор на ту же дату, пропускаются.
+    Количество запросов не зависит от числа подписок (кроме деления на пачки
+    BULK_BOX_BATCH_SIZE).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.subscription_repo = SubscriptionRepository(db)
+        self.box_repo = ToyBoxRepository(db)
+        self.inventory_service = InventoryService(db)
+        self.mapping_service = CategoryMappingService(db)
+
+    def generate_boxes(self, subscription_ids: Optional[List[int]] = None,
+                       due_date: Optional[date] = None) -> BulkBoxGenerationResponse:
+        """Создать наборы для списка подписок или для всех подписок с доставкой в due_date"""
+        started = time.perf_counter()
+        failures: List[BulkBoxGenerationFailure] = []
+
+        if due_date is not None:
+            subscriptions = self.subscription_repo.get_due_for_box(due_date)
+            requested = len(subscriptions)
+        else:
+            requested_ids = list(dict.fromkeys(subscription_ids or []))
+            requested = len(requested_ids)
+            subscriptions = self.subscription_repo.get_by_ids_with_box_details(requested_ids)
+            found_ids = {subscription.id for subscription in subscriptions}
+            failures.extend(
+                BulkBoxGenerationFailure(subscription_id=subscription_id, reason="Подписка не найдена")
+                for subscription_id in requested_ids if subscription_id not in found_ids
+            )
+
+        configs_by_plan = get_plan_configs_by_plan(self.db)
+
+        child_ids = list({s.child_id for s in subscriptions})
+        recent_boxes = self.box_repo.get_recent_boxes_by_child_ids(child_ids, limit=3)
+        # Повторный запуск для тех же подписок не должен создавать наборы второй раз
+        planned_dates = self.box_repo.get_planned_delivery_dates(child_ids)
+        inventory_limits = self.inventory_service.get_limits_snapshot()
+
+        prepared: List[Tuple[int, Dict[str, Any], List[Dict[str, Any]]]] = []
+        for subscription in subscriptions:
+            child_boxes = recent_boxes.get(subscription.child_id, [])
+            delivery_date = self._next_delivery_date(subscription, child_boxes)
+            if (subscription.child_id, delivery_date) in planned_dates:
+                failures.append(BulkBoxGenerationFailure(
+                    subscription_id=subscription.id, reason="Набор на эту дату уже создан"
+                ))
+                continue
+            try:
+                box_data, items_data = self._compose_box(
+                    subscription,
+                    configs_by_plan.get(subscription.plan_id, []),
+                    child_boxes,
+                    delivery_date,
+                    inventory_limits
+                )
+            except ValueError as e:
+                failures.append(BulkBoxGenerationFailure(subscription_id=subscription.id, reason=str(e)))
+                continue
+            planned_dates.add((subscription.child_id, delivery_date))
+            prepared.append((subscription.id, box_data, items_data))
+
+        # Каждая пачка - в своем SAVEPOINT: ошибка одной пачки не откатывает остальные
+        box_ids: List[int] = []
+        batch_size = max(settings.BULK_BOX_BATCH_SIZE, 1)
+        for start in range(0, len(prepared), batch_size):
+            batch = prepared[start:start + batch_size]
+            try:
+                with self.db.begin_nested():
+                    # Резервируем остатки под всю пачку; наборы без остатка не создаем
+                    reserved = self.inventory_service.reserve_for_boxes([items_data for _, _, items_data in batch])
+                    failures.extend(
+                        BulkBoxGenerationFailure(subscription_id=subscription_id, reason="Недостаточно остатков на складе")
+                        for (subscription_id, _, _), ok in zip(batch, reserved) if not ok
+                    )
+                    batch = [entry for entry, ok in zip(batch, reserved) if ok]
+                    batch_items = [items_data for _, _, items_data in batch]
+                    created_ids = self.box_repo.bulk_create_boxes(
+                        [box_data for _, box_data, _ in batch], batch_items
+                    )
+                    self.inventory_service.record_box_reservations(created_ids, batch_items)
+                box_ids.extend(created_ids)
+            except SQLAlchemyError as e:
+                logger.warning("Пакетная вставка наборов для %s подписок не удалась: %s", len(batch), e)
+                failures.extend(
+                    BulkBoxGenerationFailure(subscription_id=subscription_id, reason="Ошибка сохранения набора")
+                    for subscription_id, _, _ in batch
+                )
+
+        duration = time.perf_counter() - started
+        return BulkBoxGenerationResponse(
+            requested=requested,
+            created=len(box_ids),
+            box_ids=box_ids,
+            failures=failures,
+            duration_ms=round(duration * 1000, 2),
+            boxes_per_second=round(len(box_ids) / duration, 2) if duration > 0 else 0.0
+        )
+
+    def _next_delivery_date(self, subscription: Subscription, recent_boxes: List[ToyBox]) -> date:
+        """Дата доставки следующего набора подписки
+
+        Следующий набор приезжает после возврата текущего, как в превью следующего
+        набора. Уже запланированные наборы текущими не считаются, поэтому повторный
+        запуск получает ту же дату и находит созданный ранее набор.
+        """
+        current_box = next((box for box in recent_boxes if box.status != ToyBoxStatus.PLANNED), None)
+        if current_box and current_box.return_date:
+            return current_box.return_date + timedelta(days=settings.NEXT_DELIVERY_PERIOD)
+        delivery_info = subscription.delivery_info
+        if delivery_info and delivery_info.date:
+            return delivery_info.date
+        return date.today() + timedelta(days=settings.INITIAL_DELIVERY_PERIOD)
+
+    def _compose_box(self, subscription: Subscription, plan_configs: List,
+                     recent_boxes: List[ToyBox], delivery_date: date,
+                     inventory_limits: InventoryLimits) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Данные набора и его состав для одной подписки (те же правила, что в create_box_for_subscription)"""
+        if subscription.status != SubscriptionStatus.ACTIVE:
+            raise ValueError(f"Подписка {subscription.id} не активна")
+
+        child = subscription.child
+        if not child:
+            raise ValueError(f"Не найден ребенок для создания бокса при подписке {subscription.id}")
+
+        if not plan_configs:
+            raise ValueError(f"Конфигурация для плана {subscription.plan_id} не найдена")
+
+        delivery_info = subscription.delivery_info
+        delivery_time = delivery_info.time if delivery_info else None
+
+        recent_categories = {item.toy_category_id for box in recent_boxes for item in box.items}
+        scored_categories = self.mapping_service.get_categories_with_scores(
+            [interest.id for interest in child.interests],
+            [skill.id for skill in child.skills]
+        )
+        items_data = compose_box_items(
+            sum(config.quantity for config in plan_configs),
+            scored_categories,
+            recent_categories,
+            inventory_limits
+        )
+
+        box_data = {
+            "subscription_id": subscription.id,
+            "child_id": subscription.child_id,
+            "delivery_info_id": subscription.delivery_info_id,
+            "status": ToyBoxStatus.PLANNED,
+            "delivery_date": delivery_date,
+            "return_date": delivery_date + timedelta(days=settings.RENTAL_PERIOD),
+            "delivery_time": delivery_time,
+            "return_time": delivery_time,  # Используем то же время для возврата
+            "interest_tags": build_interest_tags(child),
+        }
+        return box_data, items_data
@@ -4,6 +4,7 @@ from repositories.toy_category_repository import ToyCategoryRepository
 from repositories.interest_repository import InterestRepository
 from repositories.skill_repository import SkillRepository
 from models.toy_category import ToyCategory
+from core.category_affinity_index import get_affinity_index, invalidate_affinity_index_on_commit
 import logging
 
 logger = logging.getLogger(__name__)
@@ -45,21 +46,17 @@ class CategoryMappingService:
         
         return 0.0
     
-    def get_categories_with_scores(self, child_interests: List, child_skills: List) -> List[Dict[str, Any]]:
-        """Получить все категории с их скорингом для ребенка"""
-        categories = self.category_repo.get_all()
-        scored_categories = []
-        
-        for category in categories:
-            score = self.get_category_score(category, child_interests, child_skills)
-            scored_categories.append({
-                "category": category,
-                "score": score
-            })
-        
-        # Сортируем по убыванию скоринга
-        scored_categories.sort(key=lambda x: x["score"], reverse=True)
-        return scored_categories
+    def get_categories_with_scores(self, child_interest_ids: List[int], child_skill_ids: List[int]) -> List[Dict[str, Any]]:
+        """Получить ID всех категорий с их скорингом для ребенка
+
+        Скоринг считается по индексу связей в памяти (см. CategoryAffinityIndex),
+        поэтому не загружает категории с их интересами и навыками на каждый вызов.
+        """
+        index = get_affinity_index(self.db)
+        return [
+            {"category_id": category_id, "score": score}
+            for category_id, score in index.score(child_interest_ids, child_skill_ids)
+        ]
     
     def add_interest_to_category(self, category_id: int, interest_id: int) -> bool:
         """Добавить интерес к категории"""
@@ -75,6 +72,7 @@ class CategoryMappingService:
         
         result = self.category_repo.add_interest(category_id, interest)
         if result:
+            invalidate_affinity_index_on_commit(self.db)
             logger.info(f"Добавлен интерес {interest.name} к категории {category.name}")
         else:
             logger.info(f"Интерес {interest.name} уже существует в категории {category.name}")
@@ -95,6 +93,7 @@ class CategoryMappingService:
         
         result = self.category_repo.add_skill(category_id, skill)
         if result:
+            invalidate_affinity_index_on_commit(self.db)
             logger.info(f"Добавлен навык {skill.name} к категории {category.name}")
         else:
             logger.info(f"Навык {skill.name} уже существует в категории {category.name}")
@@ -115,6 +114,7 @@ class CategoryMappingService:
         
         result = self.category_repo.remove_interest(category_id, interest)
         if result:
+            invalidate_affinity_index_on_commit(self.db)
             logger.info(f"Удален интерес {interest.name} из категории {category.name}")
         else:
             logger.info(f"Интерес {interest.name} не найден в категории {category.name}")
@@ -135,6 +135,7 @@ class CategoryMappingService:
         
         result = self.category_repo.remove_skill(category_id, skill)
         if result:
+            invalidate_affinity_index_on_commit(self.db)
             logger.info(f"Удален навык {skill.name} из категории {category.name}")
         else:
             logger.info(f"Навык {skill.name} не найден в категории {category.name}")
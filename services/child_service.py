@@ -1,11 +1,14 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.child import Child, Gender
 from models.interest import Interest
 from models.skill import Skill
 from typing import Optional, List, Callable
 from datetime import date
 from fastapi import HTTPException
-from repositories.child_repository import ChildRepository
+from repositories.child_repository import ChildRepository, ChildLoad
+from services.ownership_service import OwnershipService, CHILD, invalidate_ownership_cache
+from repositories.async_child_repository import AsyncChildRepository
 from schemas.child_schemas import ChildUpdate, ChildResponse
 from services.interest_service import InterestService
 from services.skill_service import SkillService
@@ -119,7 +122,7 @@ class ChildService:
             on_delete: Callback функция, вызываемая после удаления с parent_id
         """
         # Получаем ребенка перед удалением, чтобы знать parent_id
-        child = self._repository.get_by_id(child_id)
+        child = self._repository.get_by_id(child_id, ChildLoad.OWNERSHIP)
         if not child:
             return False
         
@@ -127,6 +130,10 @@ class ChildService:
         
         # Удаляем ребенка
         result = self._repository.delete(child_id)
+        if result:
+            # Ребенок и его наборы/подписки больше никому не принадлежат
+            OwnershipService(self._repository._db).forget(CHILD, child_id)
+            invalidate_ownership_cache()
         
         # Вызываем callback после удаления ребенка
         if result and on_delete:
@@ -152,4 +159,23 @@ class ChildService:
         
         # Ребенок должен быть от 0 до 18 лет
         if age > 18:
-            raise HTTPException(status_code=400, detail="Возраст ребенка должен быть от 0 до 18 лет") 
\ No newline at end of file
+            raise HTTPException(status_code=400, detail="Возраст ребенка должен быть от 0 до 18 лет")
+
+
+class AsyncChildService:
+    """Асинхронный сервис детей для чтения (DB_ASYNC_ENABLED)"""
+    
+    def __init__(self, db: AsyncSession):
+        self._repository = AsyncChildRepository(db)
+    
+    async def get_children_by_parent(self, parent_id: int) -> List[ChildResponse]:
+        """Получает детей пользователя с интересами и навыками"""
+        children = await self._repository.get_by_parent_id(parent_id)
+        return [ChildResponse.model_validate(child) for child in children]
+    
+    async def get_child_by_id(self, child_id: int) -> Optional[ChildResponse]:
+        """Получает ребенка по ID с интересами и навыками"""
+        child = await self._repository.get_by_id(child_id)
+        if not child:
+            return None
+        return ChildResponse.model_validate(child)
@@ -1,5 +1,7 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from repositories.delivery_info_repository import DeliveryInfoRepository
+from repositories.async_delivery_info_repository import AsyncDeliveryInfoRepository
 from services.toy_box_service import ToyBoxService
 from schemas.delivery_info_schemas import (
     DeliveryInfoCreate, 
@@ -10,6 +12,13 @@ from schemas.delivery_info_schemas import (
 from typing import Optional
 
 
+def _build_addresses_response(addresses) -> DeliveryInfoListResponse:
+    address_responses = [
+        DeliveryInfoResponse.model_validate(address) for address in addresses
+    ]
+    return DeliveryInfoListResponse(addresses=address_responses)
+
+
 class DeliveryInfoService:
     """Сервис для работы с адресами доставки"""
     
@@ -20,10 +29,7 @@ class DeliveryInfoService:
     def get_user_addresses(self, user_id: int, limit: Optional[int] = None) -> DeliveryInfoListResponse:
         """Получить адреса доставки пользователя"""
         addresses = self._repository.get_by_user_id(user_id, limit)
-        address_responses = [
-            DeliveryInfoResponse.model_validate(address) for address in addresses
-        ]
-        return DeliveryInfoListResponse(addresses=address_responses)
+        return _build_addresses_response(addresses)
     
     def create_address(self, user_id: int, address_data: DeliveryInfoCreate) -> DeliveryInfoResponse:
         """Создать новый адрес доставки для пользователя"""
@@ -73,4 +79,16 @@ class DeliveryInfoService:
     
     def delete_address(self, user_id: int, address_id: int) -> bool:
         """Удалить адрес доставки пользователя"""
-        return self._repository.delete(address_id, user_id) 
\ No newline at end of file
+        return self._repository.delete(address_id, user_id)
+
+
+class AsyncDeliveryInfoService:
+    """Асинхронный сервис адресов доставки для чтения (DB_ASYNC_ENABLED)"""
+    
+    def __init__(self, db: AsyncSession):
+        self._repository = AsyncDeliveryInfoRepository(db)
+    
+    async def get_user_addresses(self, user_id: int, limit: Optional[int] = None) -> DeliveryInfoListResponse:
+        """Получить адреса доставки пользователя"""
+        addresses = await self._repository.get_by_user_id(user_id, limit)
+        return _build_addresses_response(addresses)
@@ -1,8 +1,18 @@
 from typing import List
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from repositories.interest_repository import InterestRepository
+from repositories.async_interest_repository import AsyncInterestRepository
 from schemas.interest_schemas import InterestResponse, InterestsListResponse
 from core.i18n import translate
+from core.reference_cache import get_reference_cache, INTERESTS
+
+
+def _build_interests_response(interests, lang: str) -> InterestsListResponse:
+    interest_responses = [
+        InterestResponse(id=interest.id, name=translate(interest.name, lang)) for interest in interests
+    ]
+    return InterestsListResponse(interests=interest_responses)
 
 
 class InterestService:
@@ -12,17 +22,32 @@ class InterestService:
         self._repository = InterestRepository(db)
     
     def get_all_interests(self, lang: str = 'ru') -> InterestsListResponse:
-        """Получить все интересы"""
-        interests = self._repository.get_all()
-        interest_responses = [
-            InterestResponse(id=interest.id, name=translate(interest.name, lang)) for interest in interests
-        ]
-        return InterestsListResponse(interests=interest_responses)
+        """Получить все интересы (из кэша справочников)"""
+        return get_reference_cache().get_or_load(
+            INTERESTS, f"list:{lang}",
+            lambda: _build_interests_response(self._repository.get_all(), lang)
+        )
     
     def validate_interest_ids(self, interest_ids: List[int]) -> bool:
         """Проверить что все ID интересов существуют"""
         if not interest_ids:
             return True
         
-        existing_interests = self._repository.get_by_ids(interest_ids)
-        return len(existing_interests) == len(interest_ids) 
\ No newline at end of file
+        known_ids = get_reference_cache().get_or_load(
+            INTERESTS, "ids", lambda: {interest.id for interest in self._repository.get_all()}
+        )
+        return len(set(interest_ids)) == len(interest_ids) and set(interest_ids) <= known_ids 
+
+
+class AsyncInterestService:
+    """Асинхронный сервис интересов (DB_ASYNC_ENABLED)"""
+    
+    def __init__(self, db: AsyncSession):
+        self._repository = AsyncInterestRepository(db)
+    
+    async def get_all_interests(self, lang: str = 'ru') -> InterestsListResponse:
+        """Получить все интересы"""
+        async def load():
+            return _build_interests_response(await self._repository.get_all(), lang)
+        
+        return await get_reference_cache().get_or_load_async(INTERESTS, f"list:{lang}", load)
@@ -1,5 +1,10 @@
 
 import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set
+from sqlalchemy import event
 from sqlalchemy.orm.session import Session
 from core.config import settings
 from repositories.inventory_repository import InventoryRepository
@@ -8,6 +13,44 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def max_count_for_quantity(available: int) -> int:
+    """Лимит игрушек категории в наборе по остатку на складе"""
+    if available <= 5:
+        return 1      # low
+    elif available <= 15:
+        return 2      # medium (X//3 для X=6)
+    return 3          # high (X//2 для X=6)
+
+
+class InventoryLimits:
+    """Снимок лимитов по всем категориям для генерации наборов без запросов к БД"""
+
+    def __init__(self, quantities: Dict[int, int]):
+        self.quantities = quantities
+        self.limits = {category_id: max_count_for_quantity(available)
+                       for category_id, available in quantities.items()}
+
+    def get_max_count(self, category_id: int) -> int:
+        """Лимит для категории; без остатков - лимит по умолчанию (low)"""
+        limit = self.limits.get(category_id)
+        if limit is None:
+            logger.warning(f"Остатки для категории {category_id} не найдены, используем лимит по умолчанию")
+            return 1
+        return limit
+
+
+_snapshot: Optional[InventoryLimits] = None
+_snapshot_at = 0.0
+_snapshot_lock = threading.Lock()
+
+
+def invalidate_inventory_snapshot() -> None:
+    """Сбрасывает кэшированный снимок остатков"""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
+
+
 class InventoryService:
     """Сервис для работы со складом"""
     
@@ -32,7 +75,10 @@ class InventoryService:
             return False
         
         try:
-            self.inventory_repository._db.flush()
+            db = self.inventory_repository._db
+            db.flush()
+            invalidate_inventory_snapshot()
+            event.listen(db, "after_commit", lambda session: invalidate_inventory_snapshot(), once=True)
             logger.info(f"Обновлены остатки для категории {inventory.category_id}: {inventory.available_quantity}")
             return True
         except Exception as e:
@@ -47,13 +93,107 @@ class InventoryService:
             logger.warning(f"Остатки для категории {category_id} не найдены, используем лимит по умолчанию")
             return 1  # По умолчанию low
 
-        available = inventory.available_quantity
-        if available <= 5:
-            logger.debug(f"Категория {category_id}: низкие остатки ({available}), лимит: 1")
-            return 1      # low
-        elif available <= 15:
-            logger.debug(f"Категория {category_id}: средние остатки ({available}), лимит: 2")
-            return 2      # medium (X//3 для X=6)
+        return max_count_for_quantity(inventory.available_quantity)
+    
+    def get_limits_snapshot(self) -> InventoryLimits:
+        """Лимиты по всем категориям одним запросом
+
+        Снимок кэшируется на INVENTORY_SNAPSHOT_TTL_SECONDS: лимиты грубые
+        (low/medium/high), так что несколько секунд устаревания допустимы.
+        """
+        global _snapshot, _snapshot_at
+        ttl = settings.INVENTORY_SNAPSHOT_TTL_SECONDS
+        if ttl <= 0:
+            return InventoryLimits(self.inventory_repository.get_quantities_by_category())
+
+        snapshot = _snapshot
+        if snapshot is not None and time.monotonic() - _snapshot_at < ttl:
+            return snapshot
+
+        with _snapshot_lock:
+            if _snapshot is None or time.monotonic() - _snapshot_at >= ttl:
+                _snapshot = InventoryLimits(self.inventory_repository.get_quantities_by_category())
+                _snapshot_at = time.monotonic()
+            return _snapshot
+    
+    # Резервирование остатков под наборы
+    def reserve_items(self, items_data: List[Dict[str, Any]]) -> Set[int]:
+        """Атомарно зарезервировать состав набора целиком
+
+        Возвращает категории, по которым остатка не хватило; в этом случае
+        ничего не резервируется (откат до SAVEPOINT). Категории без строки
+        остатков склад не учитывает: они не резервируются и не считаются
+        нехваткой (как лимит по умолчанию в InventoryLimits).
+        """
+        db = self.inventory_repository._db
+        failed = set()
+        savepoint = db.begin_nested()
+        for item in sorted(items_data, key=lambda item: item["toy_category_id"]):
+            if not self.inventory_repository.try_reserve(item["toy_category_id"], item["quantity"]):
+                failed.add(item["toy_category_id"])
+
+        if failed:
+            # Отличаем нехватку от категорий без учета остатков (лишний запрос только при неудаче)
+            untracked = failed - self.inventory_repository.get_tracked_category_ids(failed)
+            if untracked:
+                logger.warning("Остатки для категорий %s не найдены, резерв не ведется", sorted(untracked))
+                failed -= untracked
+
+        if failed:
+            savepoint.rollback()
+            logger.warning(f"Недостаточно остатков для категорий {sorted(failed)}")
         else:
-            logger.debug(f"Категория {category_id}: высокие остатки ({available}), лимит: 3")
-            return 3      # high (X//2 для X=6) 
\ No newline at end of file
+            savepoint.commit()
+        return failed
+
+    def reserve_for_boxes(self, boxes_items: List[List[Dict[str, Any]]]) -> List[bool]:
+        """Зарезервировать остатки под пачку наборов
+
+        Строки нужных категорий блокируются одним SELECT ... FOR UPDATE, наборы
+        принимаются по очереди, пока хватает остатка, затем счетчики обновляются
+        одним executemany. Возвращает признак резерва для каждого набора.
+        """
+        category_ids = {item["toy_category_id"] for items in boxes_items for item in items}
+        remaining = self.inventory_repository.lock_available(category_ids)
+
+        # Категории без строки остатков склад не учитывает: они не ограничивают наборы
+        untracked = category_ids - remaining.keys()
+        if untracked:
+            logger.warning("Остатки для категорий %s не найдены, резерв не ведется", sorted(untracked))
+
+        reserved: Dict[int, int] = defaultdict(int)
+        accepted = []
+        for items in boxes_items:
+            tracked_items = [item for item in items if item["toy_category_id"] in remaining]
+            fits = all(remaining[item["toy_category_id"]] >= item["quantity"] for item in tracked_items)
+            if fits:
+                for item in tracked_items:
+                    remaining[item["toy_category_id"]] -= item["quantity"]
+                    reserved[item["toy_category_id"]] += item["quantity"]
+            accepted.append(fits)
+
+        self.inventory_repository.reserve_locked(dict(reserved))
+        return accepted
+
+    def record_box_reservations(self, box_ids: List[int], boxes_items: List[List[Dict[str, Any]]]) -> None:
+        """Записать резервы созданных наборов в журнал (box_ids[i] соответствует boxes_items[i])
+
+        Категории без строки остатков в журнал не попадают: по ним ничего не
+        резервировалось, и возврат набора не должен их пополнять.
+        """
+        tracked = self.inventory_repository.get_tracked_category_ids(
+            item["toy_category_id"] for items in boxes_items for item in items
+        )
+        self.inventory_repository.add_reservations([
+            {"box_id": box_id, "category_id": item["toy_category_id"], "quantity": item["quantity"]}
+            for box_id, items in zip(box_ids, boxes_items)
+            for item in items
+            if item["toy_category_id"] in tracked
+        ])
+
+    def release_box_reservations(self, box_ids: List[int]) -> Dict[int, int]:
+        """Вернуть на склад резервы наборов (при возврате); повторный вызов ничего не меняет"""
+        released = self.inventory_repository.release_boxes(box_ids)
+        if released:
+            logger.info(f"Освобождены резервы наборов {box_ids}: {released}")
+        return released
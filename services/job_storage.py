@@ -0,0 +1,95 @@
+from collections import OrderedDict
+from typing import Dict, Optional
+import json
+import logging
+import threading
+import time
+from core.interfaces import IJobStorage
+from core.config import settings
+from core.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryJobStorage(IJobStorage):
+    """Хранилище состояний задач в памяти процесса с ограничением размера
+
+    Каждая запись продлевает срок задачи на JOB_TTL_SECONDS и переносит ее в конец
+    OrderedDict, поэтому порядок совпадает с порядком истечения: истекшие задачи
+    снимаются с начала при каждой записи, а при заполнении до JOB_MEMORY_MAX_ENTRIES
+    вытесняется самая старая. Так задачи, которые никто не опрашивает, не копятся.
+
+    Состояние видно только текущему процессу и теряется при перезапуске; при
+    нескольких воркерах uvicorn/gunicorn нужен RedisJobStorage.
+    """
+    
+    def __init__(self, max_entries: int = settings.JOB_MEMORY_MAX_ENTRIES,
+                 ttl_seconds: int = settings.JOB_TTL_SECONDS):
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._max_entries = max(max_entries, 1)
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+    
+    def _sweep_locked(self, now: float) -> None:
+        """Снимает истекшие задачи с начала очереди; вызывается под блокировкой"""
+        while self._jobs:
+            job_id, data = next(iter(self._jobs.items()))
+            if data["_expires_at"] >= now:
+                break
+            del self._jobs[job_id]
+    
+    def __len__(self) -> int:
+        return len(self._jobs)
+    
+    def save_job(self, job_id: str, data: Dict) -> bool:
+        """Сохраняет копию состояния вместе со временем истечения"""
+        now = time.time()
+        with self._lock:
+            self._sweep_locked(now)
+            self._jobs.pop(job_id, None)
+            self._jobs[job_id] = {**data, "_expires_at": now + self._ttl}
+            while len(self._jobs) > self._max_entries:
+                self._jobs.popitem(last=False)
+        return True
+    
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Возвращает состояние задачи, если оно не истекло"""
+        with self._lock:
+            data = self._jobs.get(job_id)
+            if not data:
+                return None
+            
+            if data["_expires_at"] < time.time():
+                del self._jobs[job_id]
+                return None
+            
+            return {key: value for key, value in data.items() if key != "_expires_at"}
+
+
+class RedisJobStorage(IJobStorage):
+    """Хранилище состояний задач в Redis (общее для всех воркеров)"""
+    
+    def __init__(self, redis_url: str):
+        self._redis = get_redis_client(redis_url)
+    
+    def _get_key(self, job_id: str) -> str:
+        """Генерирует ключ для Redis"""
+        return f"job:{job_id}"
+    
+    def save_job(self, job_id: str, data: Dict) -> bool:
+        """Сохраняет состояние задачи с TTL"""
+        try:
+            self._redis.set(self._get_key(job_id), json.dumps(data), ex=settings.JOB_TTL_SECONDS)
+            return True
+        except Exception as e:
+            logger.warning("Ошибка Redis при сохранении задачи: %s", e)
+            return False
+    
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Возвращает состояние задачи"""
+        try:
+            raw = self._redis.get(self._get_key(job_id))
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning("Ошибка Redis при чтении задачи: %s", e)
+            return None
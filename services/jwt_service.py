@@ -1,5 +1,9 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from functools import lru_cache
 from jose import JWTError, jwt
 from core.config import settings
@@ -13,6 +17,11 @@ class JWTService:
         self.algorithm = settings.ALGORITHM
         self.access_token_expire_minutes = settings.ACCESS_TOKEN_EXPIRE_MINUTES
         self.refresh_token_expire_days = 30  # Refresh token живет 30 дней
+        # LRU уже проверенных токенов: ключ - (секрет, алгоритм, sha256 токена),
+        # значение - (payload, exp). Подпись проверяется один раз за жизнь токена.
+        self.cache_max_entries = max(settings.JWT_CACHE_MAX_ENTRIES, 0)
+        self._verified: "OrderedDict[Tuple[str, str, bytes], Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
     
     def create_access_token(self, user_id: int, phone_number: str, name: Optional[str] = None) -> str:
         """Создает access token для пользователя"""
@@ -38,11 +47,54 @@ class JWTService:
     
     def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Проверяет и декодирует токен"""
+        return self.decode(token, self.secret_key, self.algorithm)
+
+    def decode(self, token: str, secret_key: str, algorithm: str) -> Optional[Dict[str, Any]]:
+        """
+        Проверяет подпись токена заданным секретом с кэшированием результата.
+
+        Успешно проверенный токен запоминается до своего exp, повторные запросы
+        с тем же токеном не пересчитывают HMAC. Секрет и алгоритм входят в ключ,
+        поэтому токен, проверенный одним секретом, не считается валидным для другого.
+        Невалидные токены не кэшируются.
+        """
+        if not self.cache_max_entries:
+            return self._decode(token, secret_key, algorithm)
+
+        key = (secret_key, algorithm, hashlib.sha256(token.encode()).digest())
+        now = time.time()
+        with self._lock:
+            cached = self._verified.get(key)
+            if cached is not None:
+                payload, exp = cached
+                if exp > now:
+                    self._verified.move_to_end(key)
+                    return dict(payload)
+                del self._verified[key]
+
+        payload = self._decode(token, secret_key, algorithm)
+        exp = payload.get("exp") if payload else None
+        # Токены без exp не кэшируем: у записи не было бы срока жизни
+        if isinstance(exp, (int, float)) and exp > now:
+            with self._lock:
+                self._verified[key] = (dict(payload), float(exp))
+                self._verified.move_to_end(key)
+                while len(self._verified) > self.cache_max_entries:
+                    self._verified.popitem(last=False)
+        return payload
+
+    @staticmethod
+    def _decode(token: str, secret_key: str, algorithm: str) -> Optional[Dict[str, Any]]:
+        """Полная проверка подписи и claims без кэша"""
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
+            return jwt.decode(token, secret_key, algorithms=[algorithm])
         except JWTError:
             return None
+
+    def clear_cache(self) -> None:
+        """Сбрасывает кэш проверенных токенов"""
+        with self._lock:
+            self._verified.clear()
     
     def extract_user_id(self, token: str) -> Optional[int]:
         """Извлекает ID пользователя из токена"""
@@ -1,3 +1,4 @@
+import logging
 import uuid
 import random
 import asyncio
@@ -5,6 +6,8 @@ from datetime import datetime, timedelta, timezone
 from typing import Dict
 from core.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 class MockPaymentGateway:
     """Имитация внешнего платежного API (ЮKassa, Stripe, etc.)"""
@@ -42,7 +45,7 @@ class MockPaymentGateway:
         
         # Имитация результата (вероятность из конфигурации)
         success = random.random() < settings.MOCK_PAYMENT_SUCCESS_RATE
-        print(f"Processing payment {external_payment_id} with status {success}")
+        logger.debug("Обработан платеж %s, успех: %s", external_payment_id, success)
         return {
             "id": external_payment_id,
             "status": "succeeded" if success else "failed",
@@ -1,15 +1,29 @@
+import logging
 from functools import lru_cache
-from core.interfaces import IOTPStorage
+from urllib.parse import urlsplit
+from core.interfaces import IOTPStorage, IAsyncOTPStorage
 from core.config import settings
-from .otp_storage import InMemoryOTPStorage, RedisOTPStorage
+from .otp_storage import InMemoryOTPStorage, RedisOTPStorage, AsyncRedisOTPStorage, AsyncOTPStorageAdapter
+
+logger = logging.getLogger(__name__)
 
 
 @lru_cache()
 def get_otp_storage() -> IOTPStorage:
     """Создает singleton экземпляр OTP storage в зависимости от конфигурации"""
     if settings.OTP_STORAGE_TYPE == "redis":
-        print(f"Используется Redis OTP storage: {settings.REDIS_URL}")
+        # В лог только адрес сервера: REDIS_URL может содержать пароль
+        redis_url = urlsplit(settings.REDIS_URL)
+        logger.info("Используется Redis OTP storage: %s:%s", redis_url.hostname, redis_url.port or 6379)
         return RedisOTPStorage(settings.REDIS_URL)
     else:
-        print("Используется In-Memory OTP storage")
-        return InMemoryOTPStorage() 
\ No newline at end of file
+        logger.info("Используется In-Memory OTP storage")
+        return InMemoryOTPStorage()
+
+
+@lru_cache()
+def get_async_otp_storage() -> IAsyncOTPStorage:
+    """Асинхронный OTP storage; в памяти - поверх того же хранилища, что и get_otp_storage"""
+    if settings.OTP_STORAGE_TYPE == "redis":
+        return AsyncRedisOTPStorage(settings.REDIS_URL)
+    return AsyncOTPStorageAdapter(get_otp_storage())
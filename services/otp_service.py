@@ -1,9 +1,12 @@
+import logging
 from typing import Dict, Optional
 import random
 import time
-from core.interfaces import IOTPStorage
+from core.interfaces import IOTPStorage, IAsyncOTPStorage, OTPCheck
 from core.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 class OTPService:
     """Сервис для отправки и проверки OTP кодов"""
@@ -14,46 +17,65 @@ class OTPService:
     def send_code(self, phone: str) -> bool:
         """Отправляет OTP код (мок)"""
         # Генерируем случайный 4-значный код
-        code = str(random.randint(1000, 9999))
+        code = generate_code()
         
         # Сохраняем код через storage
         success = self.storage.store_code(phone, code)
         
         if success:
             # В реальной жизни здесь будет отправка SMS
-            print(f"[MOCK] SMS отправлена на {phone}: код {code}")
+            logger.info("[MOCK] SMS отправлена на %s: код %s", phone, code)
             return True
         
         return False
     
     def verify_code(self, phone: str, code: str) -> bool:
-        """Проверяет OTP код"""
-        stored_data = self.storage.get_code_data(phone)
-        
-        if not stored_data:
-            print(f"Нет кода для {phone}")
-            return False
-        
-        # Проверяем количество попыток
-        if stored_data["attempts"] >= settings.OTP_MAX_ATTEMPTS:
-            print(f"Превышено количество попыток для {phone}")
-            self.storage.delete_code(phone)
-            return False
-        
-        # Проверяем время (код действителен OTP_TTL_SECONDS)
-        if time.time() - stored_data["timestamp"] > settings.OTP_TTL_SECONDS:
-            print(f"Время истекло для {phone}")
-            self.storage.delete_code(phone)
-            return False
-        
-        # Увеличиваем счетчик попыток
-        attempts = self.storage.increment_attempts(phone)
-        
-        # Проверяем код
-        if stored_data["code"] == code:
-            print(f"Код {code} для {phone} проверен успешно")
-            self.storage.delete_code(phone)  # Удаляем использованный код
+        """Проверяет OTP код (проверка попыток, срока и расход кода - одной операцией хранилища)"""
+        result, attempts = self.storage.verify_code(
+            phone, code, settings.OTP_MAX_ATTEMPTS, settings.OTP_TTL_SECONDS, time.time()
+        )
+        return log_otp_check(phone, code, result, attempts)
+
+
+def generate_code() -> str:
+    """Генерирует случайный 4-значный код"""
+    return str(random.randint(1000, 9999))
+
+
+def log_otp_check(phone: str, code: str, result: OTPCheck, attempts: int) -> bool:
+    """Логирует результат проверки кода и возвращает, прошла ли она"""
+    if result == OTPCheck.OK:
+        logger.debug("Код для %s проверен успешно", phone)
+        return True
+    if result == OTPCheck.MISSING:
+        logger.debug("Нет кода для %s", phone)
+    elif result == OTPCheck.TOO_MANY_ATTEMPTS:
+        logger.info("Превышено количество попыток для %s", phone)
+    elif result == OTPCheck.EXPIRED:
+        logger.debug("Время истекло для %s", phone)
+    else:
+        logger.debug("Код для %s не прошел проверку. Попытка %s/%s", phone, attempts, settings.OTP_MAX_ATTEMPTS)
+    return False
+
+
+class AsyncOTPService:
+    """Асинхронный сервис OTP кодов для async-роутов: обращения к хранилищу не блокируют event loop"""
+    
+    def __init__(self, storage: IAsyncOTPStorage):
+        self.storage = storage
+    
+    async def send_code(self, phone: str) -> bool:
+        """Отправляет OTP код (мок)"""
+        code = generate_code()
+        if await self.storage.store_code(phone, code):
+            # В реальной жизни здесь будет отправка SMS
+            logger.info("[MOCK] SMS отправлена на %s: код %s", phone, code)
             return True
-        
-        print(f"Код {code} для {phone} не прошел проверку. Попытка {attempts}/{settings.OTP_MAX_ATTEMPTS}")
-        return False 
\ No newline at end of file
+        return False
+    
+    async def verify_code(self, phone: str, code: str) -> bool:
+        """Проверяет OTP код одним обращением к хранилищу"""
+        result, attempts = await self.storage.verify_code(
+            phone, code, settings.OTP_MAX_ATTEMPTS, settings.OTP_TTL_SECONDS, time.time()
+        )
+        return log_otp_check(phone, code, result, attempts)
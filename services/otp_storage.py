@@ -1,115 +1,293 @@
-from typing import Dict, Optional
+import logging
+import threading
 import time
-import json
-from core.interfaces import IOTPStorage
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from core.interfaces import IOTPStorage, IAsyncOTPStorage, OTPCheck
 from core.config import settings
+from core.redis_client import get_redis_client, get_async_redis_client
+
+logger = logging.getLogger(__name__)
 
 
 class InMemoryOTPStorage(IOTPStorage):
-    """Реализация хранилища OTP кодов в памяти"""
+    """Хранилище OTP кодов в памяти процесса с ограничением размера и вытеснением по сроку
+
+    У всех кодов одинаковый срок жизни OTP_TTL_SECONDS, поэтому порядок записи
+    совпадает с порядком истечения: OrderedDict (повторная отправка переносит
+    код в конец) дает очередь истечения без кучи, и все операции - O(1).
+    Истекшие коды снимаются с начала очереди при каждой записи и фоновым
+    проходом раз в OTP_MEMORY_SWEEP_SECONDS; при заполнении до OTP_MEMORY_MAX_ENTRIES
+    вытесняется самый старый код. Все операции выполняются под блокировкой.
+    """
+    
+    def __init__(self, max_entries: int = settings.OTP_MEMORY_MAX_ENTRIES,
+                 ttl_seconds: int = settings.OTP_TTL_SECONDS,
+                 sweep_interval: float = settings.OTP_MEMORY_SWEEP_SECONDS):
+        self._codes: "OrderedDict[str, Dict]" = OrderedDict()
+        self._max_entries = max(max_entries, 1)
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        if sweep_interval > 0:
+            threading.Thread(
+                target=self._sweep_periodically, args=(sweep_interval,),
+                name="otp-sweeper", daemon=True
+            ).start()
+    
+    def _is_expired(self, data: Dict, now: float) -> bool:
+        return now - data["timestamp"] > self._ttl
+    
+    def _sweep_locked(self, now: float) -> int:
+        """Снимает истекшие коды с начала очереди; вызывается под блокировкой"""
+        removed = 0
+        while self._codes:
+            phone, data = next(iter(self._codes.items()))
+            if not self._is_expired(data, now):
+                break
+            del self._codes[phone]
+            removed += 1
+        return removed
+    
+    def sweep(self) -> int:
+        """Удаляет истекшие коды, возвращает их количество"""
+        with self._lock:
+            return self._sweep_locked(time.time())
+    
+    def _sweep_periodically(self, interval: float) -> None:
+        while not self._stopped.wait(interval):
+            self.sweep()
     
-    def __init__(self):
-        self._codes: Dict[str, Dict] = {}
+    def close(self) -> None:
+        """Останавливает фоновую очистку"""
+        self._stopped.set()
+    
+    def __len__(self) -> int:
+        return len(self._codes)
     
     def store_code(self, phone: str, code: str) -> bool:
         """Сохраняет код с timestamp"""
-        self._codes[phone] = {
-            "code": code,
-            "timestamp": time.time(),
-            "attempts": 0
-        }
+        now = time.time()
+        with self._lock:
+            self._sweep_locked(now)
+            self._codes.pop(phone, None)
+            while len(self._codes) >= self._max_entries:
+                self._codes.popitem(last=False)
+            self._codes[phone] = {
+                "code": code,
+                "timestamp": now,
+                "attempts": 0
+            }
         return True
     
+    def _get_live(self, phone: str, now: float) -> Optional[Dict]:
+        data = self._codes.get(phone)
+        if data is not None and self._is_expired(data, now):
+            del self._codes[phone]
+            return None
+        return data
+    
     def get_code_data(self, phone: str) -> Optional[Dict]:
-        """Возвращает данные кода"""
-        return self._codes.get(phone)
+        """Возвращает данные кода (копию; истекший код не возвращается)"""
+        with self._lock:
+            data = self._get_live(phone, time.time())
+            return dict(data) if data is not None else None
     
     def increment_attempts(self, phone: str) -> int:
         """Увеличивает счетчик попыток"""
-        if phone in self._codes:
-            self._codes[phone]["attempts"] += 1
-            return self._codes[phone]["attempts"]
-        return 0
+        with self._lock:
+            data = self._get_live(phone, time.time())
+            if data is None:
+                return 0
+            data["attempts"] += 1
+            return data["attempts"]
     
     def delete_code(self, phone: str) -> bool:
         """Удаляет код"""
-        if phone in self._codes:
-            del self._codes[phone]
-            return True
-        return False
+        with self._lock:
+            return self._codes.pop(phone, None) is not None
+    
+    def verify_code(self, phone: str, code: str, max_attempts: int, ttl_seconds: int,
+                    now: float) -> Tuple[OTPCheck, int]:
+        """Проверяет код атомарно под блокировкой: параллельные попытки не обходят лимит"""
+        with self._lock:
+            data = self._codes.get(phone)
+            if data is None:
+                return OTPCheck.MISSING, 0
+            
+            if data["attempts"] >= max_attempts:
+                del self._codes[phone]
+                return OTPCheck.TOO_MANY_ATTEMPTS, data["attempts"]
+            
+            if now - data["timestamp"] > ttl_seconds:
+                del self._codes[phone]
+                return OTPCheck.EXPIRED, data["attempts"]
+            
+            data["attempts"] += 1
+            if data["code"] == code:
+                del self._codes[phone]
+                return OTPCheck.OK, data["attempts"]
+            return OTPCheck.INVALID, data["attempts"]
+
+
+# Проверка кода за одно обращение к Redis: попытки, срок, расход попытки и удаление - атомарно на сервере
+# KEYS[1] - ключ кода; ARGV: код, макс. попыток, текущее время, срок жизни (сек)
+VERIFY_SCRIPT = """
+local data = redis.call('HMGET', KEYS[1], 'code', 'timestamp', 'attempts')
+if not data[1] then
+    return {'missing', 0}
+end
+local attempts = tonumber(data[3]) or 0
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return {'too_many_attempts', attempts}
+end
+if tonumber(ARGV[3]) - tonumber(data[2]) > tonumber(ARGV[4]) then
+    redis.call('DEL', KEYS[1])
+    return {'expired', attempts}
+end
+attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+if data[1] == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return {'ok', attempts}
+end
+return {'invalid', attempts}
+"""
+
+
+def _get_key(phone: str) -> str:
+    """Генерирует ключ для Redis"""
+    return f"otp:{phone}"
+
+
+def _code_mapping(code: str) -> Dict[str, str]:
+    return {
+        "code": code,
+        "timestamp": str(time.time()),
+        "attempts": "0"
+    }
+
+
+def _parse_code_data(data: Dict) -> Optional[Dict]:
+    if not data:
+        return None
+    # Преобразуем строки обратно в числа
+    return {
+        "code": data["code"],
+        "timestamp": float(data["timestamp"]),
+        "attempts": int(data["attempts"])
+    }
 
 
 class RedisOTPStorage(IOTPStorage):
-    """Реализация хранилища OTP кодов в Redis"""
+    """Реализация хранилища OTP кодов в Redis (общий пул соединений процесса)"""
     
     def __init__(self, redis_url: str):
-        try:
-            import redis
-            self._redis = redis.from_url(redis_url, decode_responses=True)
-        except ImportError:
-            raise ImportError("Для Redis storage нужен пакет redis: pip install redis")
-    
-    def _get_key(self, phone: str) -> str:
-        """Генерирует ключ для Redis"""
-        return f"otp:{phone}"
+        self._redis = get_redis_client(redis_url)
+        self._verify = self._redis.register_script(VERIFY_SCRIPT)
     
     def store_code(self, phone: str, code: str) -> bool:
         """Сохраняет код с TTL"""
-        key = self._get_key(phone)
-        data = {
-            "code": code,
-            "timestamp": str(time.time()),
-            "attempts": "0"
-        }
+        key = _get_key(phone)
         
         try:
-            # Используем pipeline для атомарности
+            # Используем pipeline (MULTI/EXEC) - одно обращение и атомарность
             pipe = self._redis.pipeline()
-            pipe.hset(key, mapping=data)
+            pipe.hset(key, mapping=_code_mapping(code))
             pipe.expire(key, settings.OTP_TTL_SECONDS)
             pipe.execute()
             return True
         except Exception as e:
-            print(f"Redis error storing code: {e}")
+            logger.warning("Ошибка Redis при сохранении кода: %s", e)
             return False
     
     def get_code_data(self, phone: str) -> Optional[Dict]:
         """Возвращает данные кода"""
-        key = self._get_key(phone)
-        
         try:
-            data = self._redis.hgetall(key)
-            if not data:
-                return None
-            
-            # Преобразуем строки обратно в числа
-            return {
-                "code": data["code"],
-                "timestamp": float(data["timestamp"]),
-                "attempts": int(data["attempts"])
-            }
+            return _parse_code_data(self._redis.hgetall(_get_key(phone)))
         except Exception as e:
-            print(f"Redis error getting code: {e}")
+            logger.warning("Ошибка Redis при чтении кода: %s", e)
             return None
     
     def increment_attempts(self, phone: str) -> int:
         """Увеличивает счетчик попыток"""
-        key = self._get_key(phone)
-        
         try:
-            attempts = self._redis.hincrby(key, "attempts", 1)
-            return attempts
+            return self._redis.hincrby(_get_key(phone), "attempts", 1)
         except Exception as e:
-            print(f"Redis error incrementing attempts: {e}")
+            logger.warning("Ошибка Redis при увеличении числа попыток: %s", e)
             return 0
     
     def delete_code(self, phone: str) -> bool:
         """Удаляет код"""
-        key = self._get_key(phone)
+        try:
+            return self._redis.delete(_get_key(phone)) > 0
+        except Exception as e:
+            logger.warning("Ошибка Redis при удалении кода: %s", e)
+            return False
+    
+    def verify_code(self, phone: str, code: str, max_attempts: int, ttl_seconds: int,
+                    now: float) -> Tuple[OTPCheck, int]:
+        """Проверяет код одним вызовом Lua-скрипта (EVALSHA)"""
+        try:
+            status, attempts = self._verify(keys=[_get_key(phone)], args=[code, max_attempts, now, ttl_seconds])
+            return OTPCheck(status), int(attempts)
+        except Exception as e:
+            logger.warning("Ошибка Redis при проверке кода: %s", e)
+            return OTPCheck.MISSING, 0
+
+
+class AsyncRedisOTPStorage(IAsyncOTPStorage):
+    """Асинхронное хранилище OTP кодов в Redis (redis.asyncio), те же ключи и скрипт"""
+    
+    def __init__(self, redis_url: str):
+        self._redis = get_async_redis_client(redis_url)
+        self._verify = self._redis.register_script(VERIFY_SCRIPT)
+    
+    async def store_code(self, phone: str, code: str) -> bool:
+        """Сохраняет код с TTL"""
+        key = _get_key(phone)
         
         try:
-            result = self._redis.delete(key)
-            return result > 0
+            pipe = self._redis.pipeline()
+            pipe.hset(key, mapping=_code_mapping(code))
+            pipe.expire(key, settings.OTP_TTL_SECONDS)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning("Ошибка Redis при сохранении кода: %s", e)
+            return False
+    
+    async def get_code_data(self, phone: str) -> Optional[Dict]:
+        """Возвращает данные кода"""
+        try:
+            return _parse_code_data(await self._redis.hgetall(_get_key(phone)))
+        except Exception as e:
+            logger.warning("Ошибка Redis при чтении кода: %s", e)
+            return None
+    
+    async def verify_code(self, phone: str, code: str, max_attempts: int, ttl_seconds: int,
+                          now: float) -> Tuple[OTPCheck, int]:
+        """Проверяет код одним вызовом Lua-скрипта (EVALSHA)"""
+        try:
+            status, attempts = await self._verify(keys=[_get_key(phone)], args=[code, max_attempts, now, ttl_seconds])
+            return OTPCheck(status), int(attempts)
         except Exception as e:
-            print(f"Redis error deleting code: {e}")
-            return False 
\ No newline at end of file
+            logger.warning("Ошибка Redis при проверке кода: %s", e)
+            return OTPCheck.MISSING, 0
+
+
+class AsyncOTPStorageAdapter(IAsyncOTPStorage):
+    """Асинхронный интерфейс над хранилищем в памяти процесса (операции не ждут ввода-вывода)"""
+    
+    def __init__(self, storage: IOTPStorage):
+        self._storage = storage
+    
+    async def store_code(self, phone: str, code: str) -> bool:
+        return self._storage.store_code(phone, code)
+    
+    async def get_code_data(self, phone: str) -> Optional[Dict]:
+        return self._storage.get_code_data(phone)
+    
+    async def verify_code(self, phone: str, code: str, max_attempts: int, ttl_seconds: int,
+                          now: float) -> Tuple[OTPCheck, int]:
+        return self._storage.verify_code(phone, code, max_attempts, ttl_seconds, now)
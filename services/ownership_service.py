@@ -0,0 +1,85 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from core.config import settings
+from models.child import Child
+from models.subscription import Subscription
+from models.toy_box import ToyBox
+
+# Виды объектов, владельца которых можно проверить
+CHILD = "child"
+BOX = "box"
+SUBSCRIPTION = "subscription"
+
+_MISSING = object()
+
+# Необязательный кэш процесса: (вид, id) -> (parent_id, истекает); включается OWNERSHIP_CACHE_TTL_SECONDS
+_cache: Dict[Tuple[str, int], Tuple[Optional[int], float]] = {}
+_lock = threading.Lock()
+
+
+def invalidate_ownership_cache() -> None:
+    """Сбрасывает кэш владельцев (после удаления ребенка)"""
+    with _lock:
+        _cache.clear()
+
+
+class OwnershipService:
+    """Проверка "принадлежит ли ребенок/набор/подписка пользователю" без загрузки объектов
+
+    Владелец читается одним скалярным запросом по первичному ключу (parent_id
+    ребенка, не удаленного). Ответ запоминается в session.info до конца запроса,
+    так что повторные проверки в разных сервисах одной сессии не ходят в БД.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._memo: Dict[Tuple[str, int], Optional[int]] = db.info.setdefault("ownership_memo", {})
+
+    def get_owner_id(self, kind: str, object_id: int) -> Optional[int]:
+        """ID родителя-владельца объекта или None, если объекта нет"""
+        key = (kind, object_id)
+        owner = self._memo.get(key, _MISSING)
+        if owner is not _MISSING:
+            return owner
+
+        ttl = settings.OWNERSHIP_CACHE_TTL_SECONDS
+        cached = _cache.get(key) if ttl > 0 else None
+        if cached and cached[1] > time.monotonic():
+            owner = cached[0]
+        else:
+            owner = self.db.execute(self._owner_query(kind, object_id)).scalar_one_or_none()
+            if ttl > 0 and owner is not None:
+                with _lock:
+                    _cache[key] = (owner, time.monotonic() + ttl)
+
+        self._memo[key] = owner
+        return owner
+
+    def _owner_query(self, kind: str, object_id: int):
+        query = select(Child.parent_id).where(Child.is_deleted == False)
+        if kind == CHILD:
+            return query.where(Child.id == object_id)
+        if kind == BOX:
+            return query.join(ToyBox, ToyBox.child_id == Child.id).where(ToyBox.id == object_id)
+        if kind == SUBSCRIPTION:
+            return query.join(Subscription, Subscription.child_id == Child.id).where(Subscription.id == object_id)
+        raise ValueError(f"Неизвестный вид объекта: {kind}")
+
+    def owns(self, user_id: int, kind: str, object_id: int) -> bool:
+        return self.get_owner_id(kind, object_id) == user_id
+
+    def get_child_owner_id(self, child_id: int) -> Optional[int]:
+        return self.get_owner_id(CHILD, child_id)
+
+    def get_box_owner_id(self, box_id: int) -> Optional[int]:
+        return self.get_owner_id(BOX, box_id)
+
+    def get_subscription_owner_id(self, subscription_id: int) -> Optional[int]:
+        return self.get_owner_id(SUBSCRIPTION, subscription_id)
+
+    def forget(self, kind: str, object_id: int) -> None:
+        """Убирает объект из памяти запроса (после его удаления)"""
+        self._memo.pop((kind, object_id), None)
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+from core.config import settings
+from core.database import SessionLocal
+from core.interfaces import IJobStorage
+from schemas.payment_schemas import PaymentJobStatusEnum
+from services.job_storage import InMemoryJobStorage, RedisJobStorage
+from services.mock_payment_gateway import MockPaymentGateway
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentJobQueue:
+    """Очередь фоновой обработки платежей с пулом воркеров
+
+    HTTP-запрос только ставит платеж в очередь и сразу отвечает. Воркер сначала
+    захватывает платеж в БД (PENDING/FAILED -> PROCESSING), поэтому параллельные
+    задачи одного платежа не спишут деньги дважды. Ответа банка воркеры ждут в
+    event loop, а запись результата и создание наборов
+    (PaymentService.apply_gateway_result) выполняют в пуле потоков в собственной
+    сессии БД и повторяют попытку при ошибках.
+
+    Сама очередь живет в памяти процесса: задачи, не обработанные до перезапуска,
+    теряются, а с InMemoryJobStorage их состояние видно только этому процессу.
+    Захваченный, но не завершенный платеж остается в PROCESSING до сверки с банком.
+    """
+
+    def __init__(self, storage: IJobStorage,
+                 session_factory: Callable[[], Session] = SessionLocal,
+                 gateway: Optional[MockPaymentGateway] = None,
+                 workers: int = settings.PAYMENT_JOB_WORKERS,
+                 max_attempts: int = settings.PAYMENT_JOB_MAX_ATTEMPTS,
+                 retry_delay: float = settings.PAYMENT_JOB_RETRY_DELAY_SECONDS):
+        self.storage = storage
+        self._session_factory = session_factory
+        self._gateway = gateway or MockPaymentGateway()  # В продакшне будет RealPaymentGateway
+        self._workers_count = workers
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._retries: set = set()
+
+    async def start(self) -> None:
+        """Запускает воркеры в текущем event loop"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"payment-worker-{i}")
+            for i in range(self._workers_count)
+        ]
+
+    async def stop(self) -> None:
+        """Останавливает воркеры и отложенные повторы"""
+        tasks = self._workers + list(self._retries)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._retries.clear()
+        self._queue = None
+
+    def enqueue(self, payment_id: int, user_id: int) -> Dict:
+        """Ставит платеж в очередь и возвращает состояние созданной задачи"""
+        if self._queue is None:
+            raise RuntimeError("Очередь платежей не запущена")
+
+        now = datetime.now(timezone.utc).isoformat()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "payment_id": payment_id,
+            "user_id": user_id,
+            "status": PaymentJobStatusEnum.QUEUED.value,
+            "attempts": 0,
+            "payment_succeeded": None,
+            "external_payment_id": None,
+            "gateway_status": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        if not self.storage.save_job(job["job_id"], job):
+            raise RuntimeError("Не удалось сохранить задачу платежа")
+        self._queue.put_nowait(job["job_id"])
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Возвращает состояние задачи"""
+        return self.storage.get_job(job_id)
+
+    def _update_job(self, job: Dict, **changes) -> bool:
+        job.update(changes, updated_at=datetime.now(timezone.utc).isoformat())
+        return self.storage.save_job(job["job_id"], job)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except Exception:
+                logger.exception("Ошибка воркера платежей, задача %s", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: str) -> None:
+        job = self.storage.get_job(job_id)
+        if not job:
+            return
+
+        # Без сохраненного состояния задачи нельзя ни обращаться в банк, ни сообщить результат
+        if not self._update_job(job, status=PaymentJobStatusEnum.PROCESSING.value, attempts=job["attempts"] + 1):
+            logger.error("Не удалось сохранить состояние задачи платежа %s, обработка отменена", job_id)
+            return
+
+        try:
+            # Результат банка сохраняется в задаче до записи в БД: при сбое записи
+            # повтор только применяет его и не списывает деньги второй раз
+            if job.get("gateway_status") is None:
+                external_payment_id = await asyncio.to_thread(self._claim_for_processing, job["payment_id"])
+                if external_payment_id is None:
+                    self._update_job(job, status=PaymentJobStatusEnum.FAILED.value, payment_succeeded=False,
+                                     error="Платеж нельзя обработать")
+                    return
+                try:
+                    gateway_response = await self._gateway.process_payment_async(external_payment_id)
+                except Exception as e:
+                    # Списал ли банк деньги - неизвестно, поэтому не повторяем: платеж
+                    # остается в PROCESSING до сверки с банком
+                    logger.error("Банк не ответил по платежу %s, задача %s: %s", job["payment_id"], job_id, e)
+                    self._update_job(job, status=PaymentJobStatusEnum.FAILED.value, error=str(e))
+                    return
+                if not self._update_job(job, external_payment_id=external_payment_id,
+                                        gateway_status=gateway_response["status"]):
+                    # Результат банка уже в памяти воркера - применяем его, а не теряем
+                    logger.error("Не удалось сохранить ответ банка в задаче %s", job_id)
+
+            success = await asyncio.to_thread(
+                self._apply_gateway_result, job["payment_id"], job["gateway_status"] == "succeeded"
+            )
+        except Exception as e:
+            logger.warning("Попытка %s задачи платежа %s не удалась: %s", job["attempts"], job_id, e)
+            if job["attempts"] < self._max_attempts and \
+                    self._update_job(job, status=PaymentJobStatusEnum.QUEUED.value, error=str(e)):
+                self._schedule_retry(job_id, self._retry_delay * job["attempts"])
+            else:
+                self._update_job(job, status=PaymentJobStatusEnum.FAILED.value, error=str(e))
+            return
+
+        # Отказ банка - окончательный результат, повторять не нужно
+        status = PaymentJobStatusEnum.SUCCEEDED if success else PaymentJobStatusEnum.FAILED
+        self._update_job(job, status=status.value, payment_succeeded=success, error=None)
+
+    # Работа с БД синхронная и выполняется в пуле потоков в собственной сессии,
+    # чтобы не блокировать event loop; в loop остается только ожидание банка
+
+    def _claim_for_processing(self, payment_id: int) -> Optional[str]:
+        # Импорт здесь: payment_service тянет за собой все сервисы наборов
+        from services.payment_service import PaymentService
+
+        # Захват фиксируется до обращения в банк, чтобы его видели другие воркеры и процессы
+        db = self._session_factory()
+        try:
+            external_payment_id = PaymentService(db).claim_for_processing(payment_id)
+            db.commit()
+            return external_payment_id
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _apply_gateway_result(self, payment_id: int, success: bool) -> bool:
+        from services.payment_service import PaymentService
+
+        db = self._session_factory()
+        try:
+            result = PaymentService(db).apply_gateway_result(payment_id, success)
+            db.commit()
+            return result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _schedule_retry(self, job_id: str, delay: float) -> None:
+        async def retry():
+            await asyncio.sleep(delay)
+            if self._queue is not None:
+                self._queue.put_nowait(job_id)
+
+        task = asyncio.create_task(retry())
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+
+@lru_cache()
+def get_payment_job_queue() -> PaymentJobQueue:
+    """Создает единую очередь платежей для процесса"""
+    if settings.JOB_STORAGE_TYPE == "redis":
+        storage = RedisJobStorage(settings.REDIS_URL)
+    else:
+        storage = InMemoryJobStorage()
+    return PaymentJobQueue(storage)
@@ -1,15 +1,18 @@
+import logging
 from sqlalchemy.orm import Session
 from repositories.payment_repository import PaymentRepository
 from repositories.subscription_repository import SubscriptionRepository
 from services.mock_payment_gateway import MockPaymentGateway
 from models.payment import Payment, PaymentStatus
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from models.subscription import Subscription
 from schemas.payment_schemas import PaymentResult, PaymentStatusEnum
 
 # Для прямого вызова создания ToyBox
 from services.toy_box_service import ToyBoxService
 
+logger = logging.getLogger(__name__)
+
 
 class PaymentService:
     def __init__(self, db: Session):
@@ -55,8 +58,6 @@ class PaymentService:
     def create_batch_payment(self, subscription_ids: List[int]) -> Dict:
         """Создает пакетный платеж для нескольких подписок"""
         
-        print(f"📦 Создаем пакетный платеж для подписок: {subscription_ids}")
-        
         # Получаем подписки
         subscriptions = []
         for subscription_id in subscription_ids:
@@ -66,7 +67,6 @@ class PaymentService:
             if subscription.payment_id:
                 raise ValueError(f"Подписка с ID {subscription_id} уже привязана к платежу")
             subscriptions.append(subscription)
-            print(f"  📋 Подписка {subscription_id}: план {subscription.plan_id}, цена {subscription.individual_price}")
         
         # Проверяем что все подписки принадлежат одному пользователю
         user_ids = set(sub.child.parent_id for sub in subscriptions)
@@ -77,24 +77,48 @@ class PaymentService:
         
         # Рассчитываем общую сумму
         total_amount = sum(sub.individual_price for sub in subscriptions)
-        print(f"💰 Общая сумма: {total_amount}")
         
         # Создаем платеж
         payment_response = self.create_payment(user_id, total_amount)
         payment_id = payment_response["payment_id"]
+        logger.info(
+            "Создан пакетный платеж %s на сумму %s для подписок %s",
+            payment_id, total_amount, subscription_ids,
+        )
         
         # Привязываем подписки к платежу
         for subscription in subscriptions:
             subscription.payment_id = payment_id
             self.db.flush()
+        self.subscription_repo.sync_statuses(subscription_ids=[sub.id for sub in subscriptions])
         
         payment_response["subscription_count"] = len(subscriptions)
         return payment_response
 
     async def create_and_process_payment(self, subscription_ids: List[int]) -> PaymentResult:
         """Создает платеж и сразу его обрабатывает"""
+        payment_id, amount = self.prepare_payment_for_subscriptions(subscription_ids)
         
-        print(f"🔍 Обрабатываем подписки: {subscription_ids}")
+        # Обрабатываем платеж
+        success = await self.process_payment_async(payment_id)
+        
+        if success:
+            return PaymentResult(
+                status=PaymentStatusEnum.SUCCESS,
+                message="Платеж успешно обработан, подписки активированы",
+                payment_id=payment_id,
+                amount=amount
+            )
+        else:
+            return PaymentResult(
+                status=PaymentStatusEnum.FAILED,
+                message="Платеж не прошел",
+                payment_id=payment_id,
+                amount=amount
+            )
+
+    def prepare_payment_for_subscriptions(self, subscription_ids: List[int]) -> Tuple[int, float]:
+        """Находит подходящий платеж для набора подписок или создает новый, возвращает (payment_id, amount)"""
         
         # Проверяем есть ли уже платеж с этим набором подписок
         existing_payment = self._find_payment_by_subscriptions(subscription_ids)
@@ -103,48 +127,33 @@ class PaymentService:
         current_total = self._calculate_subscriptions_total(subscription_ids)
         
         if existing_payment:
-            print(f"✅ Найден существующий платеж {existing_payment.id} с суммой {existing_payment.amount}")
-            print(f"💰 Текущая сумма подписок: {current_total}")
+            logger.debug(
+                "Найден платеж %s с суммой %s, текущая сумма подписок %s",
+                existing_payment.id, existing_payment.amount, current_total,
+            )
             
             # Проверяем соответствие суммы
             if abs(existing_payment.amount - current_total) < 0.01:  # Учитываем погрешность float
                 payment_id = existing_payment.id
                 amount = existing_payment.amount
-                print(f"✅ Сумма платежа соответствует текущим ценам")
             else:
-                print(f"⚠️ Сумма платежа не соответствует текущим ценам, создаем новый")
+                logger.info(
+                    "Сумма платежа %s не соответствует текущим ценам, создаем новый",
+                    existing_payment.id,
+                )
                 # Отвязываем подписки от старого платежа
                 self._unlink_subscriptions_from_payment(subscription_ids)
                 # Создаем новый пакетный платеж
                 payment_response = self.create_batch_payment(subscription_ids)
                 payment_id = payment_response["payment_id"]
                 amount = payment_response["amount"]
-                print(f"💰 Создан новый платеж {payment_id} с суммой {amount}")
         else:
-            print(f"🆕 Создаем новый платеж для подписок {subscription_ids}")
             # Создаем новый пакетный платеж
             payment_response = self.create_batch_payment(subscription_ids)
             payment_id = payment_response["payment_id"]
             amount = payment_response["amount"]
-            print(f"💰 Создан платеж {payment_id} с суммой {amount}")
-        
-        # Обрабатываем платеж
-        success = await self.process_payment_async(payment_id)
         
-        if success:
-            return PaymentResult(
-                status=PaymentStatusEnum.SUCCESS,
-                message="Платеж успешно обработан, подписки активированы",
-                payment_id=payment_id,
-                amount=amount
-            )
-        else:
-            return PaymentResult(
-                status=PaymentStatusEnum.FAILED,
-                message="Платеж не прошел",
-                payment_id=payment_id,
-                amount=amount
-            )
+        return payment_id, amount
 
     def _find_payment_by_subscriptions(self, subscription_ids: List[int]) -> Optional[Payment]:
         """Находит платеж с точно таким же набором подписок"""
@@ -183,26 +192,47 @@ class PaymentService:
             if subscription and subscription.payment_id:
                 subscription.payment_id = None  # type: ignore
                 self.db.flush()
+        self.subscription_repo.sync_statuses(subscription_ids=subscription_ids)
 
     async def process_payment_async(self, payment_id: int, simulate_delay: bool = True) -> bool:
         """Асинхронная обработка платежа через внешний API"""
-        payment = self.payment_repo.get_by_id(payment_id)
-        
-        if not payment:
-            print(f"Payment {payment_id} not found")
-            return False
-        
-        if payment.status not in [PaymentStatus.PENDING, PaymentStatus.FAILED]:
-            print(f"Payment {payment_id} cannot be reprocessed, status is {payment.status}")
+        external_payment_id = self.claim_for_processing(payment_id)
+        if external_payment_id is None:
             return False
         
         # Вызываем внешний API для обработки
         gateway_response = await self.gateway.process_payment_async(
-            payment.external_payment_id, simulate_delay
+            external_payment_id, simulate_delay
         )
+        return self.apply_gateway_result(payment_id, gateway_response["status"] == "succeeded")
+
+    def claim_for_processing(self, payment_id: int) -> Optional[str]:
+        """Захватывает платеж (PENDING или FAILED -> PROCESSING) перед обращением в банк
+
+        Возвращает внешний ID платежа или None, если платеж не найден либо уже
+        обработан или обрабатывается параллельно - тогда в банк обращаться нельзя.
+        """
+        external_payment_id = self.payment_repo.claim_for_processing(payment_id)
+        if external_payment_id is None:
+            logger.warning("Платеж %s не найден или уже обрабатывается", payment_id)
+        return external_payment_id
+
+    def apply_gateway_result(self, payment_id: int, success: bool) -> bool:
+        """Записывает результат банка и при успехе создает наборы подписок платежа
+
+        Платеж должен быть захвачен через claim_for_processing. Повторный вызов после
+        зафиксированного результата ничего не меняет, поэтому его можно повторять
+        при сбое сохранения, не обращаясь к банку снова.
+        """
+        payment = self.payment_repo.get_by_id(payment_id)
+        if not payment:
+            logger.warning("Платеж %s не найден", payment_id)
+            return False
+        if payment.status != PaymentStatus.PROCESSING:
+            logger.info("Результат платежа %s уже записан, статус %s", payment_id, payment.status)
+            return payment.status == PaymentStatus.COMPLETED
         
         # Обновляем статус в нашей БД
-        success = gateway_response["status"] == "succeeded"
         new_status = PaymentStatus.COMPLETED if success else PaymentStatus.FAILED
         self.payment_repo.update_status(payment_id, new_status)
         
@@ -213,33 +243,28 @@ class PaymentService:
                 subscriptions = self.subscription_repo.get_by_payment_id(payment_id)
                 
                 if not subscriptions:
-                    print(f"Subscriptions for payment {payment_id} not found")
+                    logger.warning("Подписки платежа %s не найдены", payment_id)
                     return False
                 
                 # Создаем ToyBox для каждой подписки
                 for subscription in subscriptions:
                     toy_box = self.toy_box_service.create_box_for_subscription(subscription.id)
-                    print(f"Created ToyBox {toy_box.id} for subscription {subscription.id}")
+                    logger.info("Создан набор %s для подписки %s", toy_box.id, subscription.id)
                     
             except Exception as e:
-                print(f"Failed to create ToyBox: {e}")
+                logger.exception("Не удалось создать набор для платежа %s", payment_id)
                 # Не останавливаем процесс если создание ToyBox не удалось
         
         return success
 
     def process_payment(self, payment_id: int) -> bool:
         """Синхронная обработка платежа"""
-        payment = self.payment_repo.get_by_id(payment_id)
-        if not payment:
-            print(f"Payment {payment_id} not found")
-            return False
-        
-        if payment.status not in [PaymentStatus.PENDING, PaymentStatus.FAILED]:
-            print(f"Payment {payment_id} cannot be reprocessed, status is {payment.status}")
+        external_payment_id = self.claim_for_processing(payment_id)
+        if external_payment_id is None:
             return False
         
         # Вызываем внешний API
-        gateway_response = self.gateway.process_payment_sync(payment.external_payment_id)
+        gateway_response = self.gateway.process_payment_sync(external_payment_id)
         
         # Обновляем статус в БД
         success = gateway_response["status"] == "succeeded"
@@ -1,8 +1,18 @@
 from typing import List
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from repositories.skill_repository import SkillRepository
+from repositories.async_skill_repository import AsyncSkillRepository
 from schemas.skill_schemas import SkillResponse, SkillsListResponse
 from core.i18n import translate
+from core.reference_cache import get_reference_cache, SKILLS
+
+
+def _build_skills_response(skills, lang: str) -> SkillsListResponse:
+    skill_responses = [
+        SkillResponse(id=skill.id, name=translate(skill.name, lang)) for skill in skills
+    ]
+    return SkillsListResponse(skills=skill_responses)
 
 
 class SkillService:
@@ -12,17 +22,32 @@ class SkillService:
         self._repository = SkillRepository(db)
     
     def get_all_skills(self, lang: str = 'ru') -> SkillsListResponse:
-        """Получить все навыки"""
-        skills = self._repository.get_all()
-        skill_responses = [
-            SkillResponse(id=skill.id, name=translate(skill.name, lang)) for skill in skills
-        ]
-        return SkillsListResponse(skills=skill_responses)
+        """Получить все навыки (из кэша справочников)"""
+        return get_reference_cache().get_or_load(
+            SKILLS, f"list:{lang}",
+            lambda: _build_skills_response(self._repository.get_all(), lang)
+        )
     
     def validate_skill_ids(self, skill_ids: List[int]) -> bool:
         """Проверить что все ID навыков существуют"""
         if not skill_ids:
             return True
         
-        existing_skills = self._repository.get_by_ids(skill_ids)
-        return len(existing_skills) == len(skill_ids) 
\ No newline at end of file
+        known_ids = get_reference_cache().get_or_load(
+            SKILLS, "ids", lambda: {skill.id for skill in self._repository.get_all()}
+        )
+        return len(set(skill_ids)) == len(skill_ids) and set(skill_ids) <= known_ids 
+
+
+class AsyncSkillService:
+    """Асинхронный сервис навыков (DB_ASYNC_ENABLED)"""
+    
+    def __init__(self, db: AsyncSession):
+        self._repository = AsyncSkillRepository(db)
+    
+    async def get_all_skills(self, lang: str = 'ru') -> SkillsListResponse:
+        """Получить все навыки"""
+        async def load():
+            return _build_skills_response(await self._repository.get_all(), lang)
+        
+        return await get_reference_cache().get_or_load_async(SKILLS, f"list:{lang}", load)
@@ -1,54 +1,118 @@
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from repositories.subscription_plan_repository import SubscriptionPlanRepository
 from repositories.plan_toy_configuration_repository import PlanToyConfigurationRepository
+from repositories.async_subscription_plan_repository import AsyncSubscriptionPlanRepository
 from schemas.subscription_plan_schemas import (
     SubscriptionPlanResponse, 
     SubscriptionPlansListResponse,
     ToyCategoryConfigResponse
 )
 from core.i18n import translate
+from core.reference_cache import get_reference_cache, PLANS
+
+
+class CategorySnapshot(NamedTuple):
+    """Данные категории в конфигурации плана (безопасно хранить в кэше между сессиями)"""
+    id: int
+    name: str
+    description: Optional[str]
+    icon: Optional[str]
+
+
+class PlanConfigSnapshot(NamedTuple):
+    """Конфигурация плана без привязки к сессии БД"""
+    id: int
+    plan_id: int
+    category_id: int
+    quantity: int
+    category: Optional[CategorySnapshot]
+
+
+def get_plan_configs_by_plan(db: Session) -> Dict[int, List[PlanConfigSnapshot]]:
+    """Конфигурации всех планов (plan_id -> список) из кэша справочников"""
+    def load():
+        configs_by_plan = defaultdict(list)
+        for config in PlanToyConfigurationRepository(db).get_all_with_categories():
+            category = config.category
+            configs_by_plan[config.plan_id].append(PlanConfigSnapshot(
+                id=config.id,
+                plan_id=config.plan_id,
+                category_id=config.category_id,
+                quantity=config.quantity,
+                category=CategorySnapshot(
+                    id=category.id,
+                    name=category.name,
+                    description=category.description,
+                    icon=category.icon
+                ) if category else None
+            ))
+        return dict(configs_by_plan)
+    
+    return get_reference_cache().get_or_load(PLANS, "configs", load)
+
+
+def _build_plan_response(plan, configurations, lang: str) -> SubscriptionPlanResponse:
+    """Собирает ответ для плана с его конфигурациями"""
+    # Преобразуем конфигурации в ответ
+    toy_configs = []
+    for config in configurations:
+        # Создаем dict для ToyCategoryConfigResponse
+        toy_config_data = {
+            "id": getattr(config.category, 'id'),
+            "name": translate(getattr(config.category, 'name'), lang),
+            "description": translate(getattr(config.category, 'description'), lang) if getattr(config.category, 'description') else None,
+            "icon": getattr(config.category, 'icon'),
+            "quantity": getattr(config, 'quantity')
+        }
+        toy_config = ToyCategoryConfigResponse(**toy_config_data)
+        toy_configs.append(toy_config)
+    
+    # Создаем ответ для плана
+    plan_data = {
+        "id": getattr(plan, 'id'),
+        "name": translate(getattr(plan, 'name'), lang),
+        "price_monthly": getattr(plan, 'price_monthly'),
+        "toy_count": getattr(plan, 'toy_count'),
+        "description": translate(getattr(plan, 'description'), lang) if getattr(plan, 'description') else None,
+        "toy_configurations": toy_configs
+    }
+    return SubscriptionPlanResponse(**plan_data)
 
 
 class SubscriptionPlanService:
     """Сервис для работы с планами подписки"""
     
     def __init__(self, db: Session):
+        self.db = db
         self._plan_repository = SubscriptionPlanRepository(db)
-        self._config_repository = PlanToyConfigurationRepository(db)
     
     def get_all_plans(self, lang: str = 'ru') -> SubscriptionPlansListResponse:
-        """Получить все планы подписки с конфигурациями"""
-        plans = self._plan_repository.get_all()
-        plan_responses = []
+        """Получить все планы подписки с конфигурациями (из кэша справочников)"""
+        def load():
+            plans = self._plan_repository.get_all()
+            configs_by_plan = get_plan_configs_by_plan(self.db)
+            return SubscriptionPlansListResponse(plans=[
+                _build_plan_response(plan, configs_by_plan.get(plan.id, []), lang) for plan in plans
+            ])
         
-        for plan in plans:
-            # Получаем конфигурации для каждого плана
-            configurations = self._config_repository.get_by_plan_id(getattr(plan, 'id'))
-            
-            # Преобразуем конфигурации в ответ
-            toy_configs = []
-            for config in configurations:
-                # Создаем dict для ToyCategoryConfigResponse
-                toy_config_data = {
-                    "id": getattr(config.category, 'id'),
-                    "name": translate(getattr(config.category, 'name'), lang),
-                    "description": translate(getattr(config.category, 'description'), lang) if getattr(config.category, 'description') else None,
-                    "icon": getattr(config.category, 'icon'),
-                    "quantity": getattr(config, 'quantity')
-                }
-                toy_config = ToyCategoryConfigResponse(**toy_config_data)
-                toy_configs.append(toy_config)
-            
-            # Создаем ответ для плана
-            plan_data = {
-                "id": getattr(plan, 'id'),
-                "name": translate(getattr(plan, 'name'), lang),
-                "price_monthly": getattr(plan, 'price_monthly'),
-                "toy_count": getattr(plan, 'toy_count'),
-                "description": translate(getattr(plan, 'description'), lang) if getattr(plan, 'description') else None,
-                "toy_configurations": toy_configs
-            }
-            plan_response = SubscriptionPlanResponse(**plan_data)
-            plan_responses.append(plan_response)
+        return get_reference_cache().get_or_load(PLANS, f"list:{lang}", load)
+
+
+class AsyncSubscriptionPlanService:
+    """Асинхронный сервис планов подписки (DB_ASYNC_ENABLED)"""
+    
+    def __init__(self, db: AsyncSession):
+        self._plan_repository = AsyncSubscriptionPlanRepository(db)
+    
+    async def get_all_plans(self, lang: str = 'ru') -> SubscriptionPlansListResponse:
+        """Получить все планы подписки с конфигурациями (одним набором запросов)"""
+        async def load():
+            plans = await self._plan_repository.get_all()
+            return SubscriptionPlansListResponse(plans=[
+                _build_plan_response(plan, plan.toy_configurations, lang) for plan in plans
+            ])
         
-        return SubscriptionPlansListResponse(plans=plan_responses) 
\ No newline at end of file
+        return await get_reference_cache().get_or_load_async(PLANS, f"list:{lang}", load)
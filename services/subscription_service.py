@@ -1,14 +1,20 @@
 from sqlalchemy.orm import Session
+from core.config import settings
 from repositories.subscription_repository import SubscriptionRepository, SubscriptionUpdateFields
-from repositories.child_repository import ChildRepository
+from repositories.child_repository import ChildRepository, ChildLoad
 from repositories.subscription_plan_repository import SubscriptionPlanRepository
 from repositories.delivery_info_repository import DeliveryInfoRepository
 from models.subscription import Subscription, SubscriptionStatus
 from services.payment_service import PaymentService
+from services.ownership_service import OwnershipService
 from schemas.subscription_schemas import SubscriptionCreateRequest, SubscriptionResponse, SubscriptionUpdateRequest, SubscriptionWithDetailsResponse
 from dateutil.relativedelta import relativedelta
-from typing import List, Optional
+from collections import defaultdict
+from typing import Dict, List, Optional
 from datetime import datetime, timezone
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class SubscriptionService:
@@ -19,12 +25,13 @@ class SubscriptionService:
         self.plan_repo = SubscriptionPlanRepository(db)
         self.delivery_repo = DeliveryInfoRepository(db)
         self.payment_service = PaymentService(db)
+        self.ownership = OwnershipService(db)
 
     def create_subscription_order(self, request: SubscriptionCreateRequest) -> SubscriptionResponse:
         """Создает заказ подписки (без платежа, только подписка)"""
         
         # Валидация данных
-        child = self.child_repo.get_by_id(request.child_id)
+        child = self.child_repo.get_by_id(request.child_id, ChildLoad.OWNERSHIP)
         if not child:
             raise ValueError(f"Ребенок с ID {request.child_id} не найден")
         
@@ -112,7 +119,7 @@ class SubscriptionService:
     def _calculate_discount(self, user_id: int) -> float:
         """Рассчитывает скидку для пользователя"""
         # Получаем количество детей у пользователя
-        children_count = len(self.child_repo.get_by_parent_id(user_id))
+        children_count = len(self.child_repo.get_by_parent_id(user_id, ChildLoad.OWNERSHIP))
         
         # Скидка 20% для второго ребенка и далее
         if children_count >= 2:
@@ -122,45 +129,32 @@ class SubscriptionService:
 
     def _calculate_discount_for_user(self, user_id: int) -> dict[int, float]:
         """Рассчитывает скидки для всех детей пользователя согласно бизнес-логике (N-1 самых дешевых наборов)"""
-        children = self.child_repo.get_by_parent_id(user_id)
+        children = self.child_repo.get_by_parent_ids([user_id])
         if len(children) <= 1:
             return {child.id: 0.0 for child in children}
+        effective = self.subscription_repo.get_effective_by_parent_ids([user_id])
+        return self._calculate_discounts([child.id for child in children], effective)
 
-        # Получаем все релевантные подписки (исключаем отмененные и истекшие)
-        subscriptions = []
-        for child in children:
-            # Получаем активную подписку
-            subscription = self.subscription_repo.get_active_by_child_id(child.id)
-            if subscription and subscription.status not in [SubscriptionStatus.CANCELLED, SubscriptionStatus.EXPIRED]:
-                subscriptions.append(subscription)
-                continue
-            # Получаем ожидающую оплаты подписку
-            subscription = self.subscription_repo.get_pending_payment_by_child_id(child.id)
-            if subscription and subscription.status not in [SubscriptionStatus.CANCELLED, SubscriptionStatus.EXPIRED]:
-                subscriptions.append(subscription)
-                continue
-            # Получаем приостановленную подписку (если есть)
-            paused_subscription = self.subscription_repo.get_paused_by_child_id(child.id)
-            if paused_subscription and paused_subscription.status == SubscriptionStatus.PAUSED:
-                subscriptions.append(paused_subscription)
+    def _calculate_discounts(self, child_ids: List[int], effective: Dict[int, Subscription]) -> Dict[int, float]:
+        """Скидки детей одного пользователя по их действующим подпискам (child_id -> Subscription)"""
+        # Релевантные подписки: активная, иначе ожидающая оплаты, иначе приостановленная
+        subscriptions = [effective[child_id] for child_id in child_ids if child_id in effective]
 
-        if len(subscriptions) <= 1:
-            return {child.id: 0.0 for child in children}
+        discounts = {child_id: 0.0 for child_id in child_ids}
+        if len(child_ids) <= 1 or len(subscriptions) <= 1:
+            return discounts
 
         # Разделяем подписки на оплаченные и новые
         paid_subscriptions = [
             s for s in subscriptions
-            if s.payment and s.payment.status.value == "completed"
-            and s.status in [SubscriptionStatus.ACTIVE, SubscriptionStatus.PAUSED]
+            if s.status in [SubscriptionStatus.ACTIVE, SubscriptionStatus.PAUSED]
         ]
         new_subscriptions = [
             s for s in subscriptions
-            if not s.payment or s.payment.status.value != "completed"
-            or s.status == SubscriptionStatus.PENDING_PAYMENT
+            if s.status == SubscriptionStatus.PENDING_PAYMENT
         ]
 
-        discounts = {child.id: 0.0 for child in children}
-        n = len(children)
+        n = len(child_ids)
         if not paid_subscriptions:
             # Только новые подписки: скидка к (N-1) самым дешевым
             sorted_subs = sorted(subscriptions, key=lambda s: s.plan.price_monthly)
@@ -178,35 +172,56 @@ class SubscriptionService:
 
     def recalculate_discounts_for_user(self, user_id: int) -> None:
         """Пересчитывает скидки для всех подписок пользователя"""
-        discounts = self._calculate_discount_for_user(user_id)
-        
-        for child_id, discount_percent in discounts.items():
-            # Получаем подписку ребенка (активную или ожидающую оплаты)
-            subscription = self.subscription_repo.get_active_by_child_id(child_id)
-            if not subscription:
-                subscription = self.subscription_repo.get_pending_payment_by_child_id(child_id)
-            
-            if subscription:
-                # Пересчитываем цену
-                new_price = subscription.plan.price_monthly * (1 - discount_percent / 100)
-                
-                if (subscription.discount_percent != discount_percent or 
-                    subscription.individual_price != new_price):
-                    update_data = SubscriptionUpdateFields(
-                        discount_percent=discount_percent,
-                        individual_price=new_price
-                    )
-                    self.subscription_repo.update(subscription.id, update_data)
+        self.recalculate_discounts_for_users([user_id])
+
+    def recalculate_discounts_for_users(self, user_ids: List[int]) -> int:
+        """Пересчитывает скидки подписок многих пользователей (например, после изменения цены плана)
+
+        На пачку из DISCOUNT_RECALC_BATCH_SIZE пользователей - запрос детей, запрос
+        действующих подписок с планами и один UPDATE измененных цен.
+        Возвращает количество обновленных подписок.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        batch_size = max(settings.DISCOUNT_RECALC_BATCH_SIZE, 1)
+        updated = 0
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+
+            child_ids_by_user: Dict[int, List[int]] = defaultdict(list)
+            for child in self.child_repo.get_by_parent_ids(batch):
+                child_ids_by_user[child.parent_id].append(child.id)
+            effective = self.subscription_repo.get_effective_by_parent_ids(batch)
+
+            prices = []
+            for child_ids in child_ids_by_user.values():
+                for child_id, discount_percent in self._calculate_discounts(child_ids, effective).items():
+                    # Подписка ребенка (активная или ожидающая оплаты); приостановленные не пересчитываем
+                    subscription = effective.get(child_id)
+                    if not subscription or subscription.status == SubscriptionStatus.PAUSED:
+                        continue
+
+                    new_price = subscription.plan.price_monthly * (1 - discount_percent / 100)
+                    if (subscription.discount_percent != discount_percent or
+                        subscription.individual_price != new_price):
+                        prices.append({
+                            "id": subscription.id,
+                            "discount_percent": discount_percent,
+                            "individual_price": new_price
+                        })
+
+            updated += self.subscription_repo.bulk_update_prices(prices)
+        return updated
+
+    def recalculate_discounts_for_plan(self, plan_id: Optional[int] = None) -> int:
+        """Пересчитывает скидки всех пользователей с подписками на план (или всех пользователей с подписками)"""
+        return self.recalculate_discounts_for_users(self.subscription_repo.get_parent_ids_by_plan(plan_id))
 
     def get_user_subscriptions(self, user_id: int) -> List[SubscriptionWithDetailsResponse]:
         """Получает подписки пользователя с подробными данными"""
-        print(f"DEBUG: get_user_subscriptions вызван для user_id={user_id}")
         subscriptions = self.subscription_repo.get_by_user_id(user_id)
-        print(f"DEBUG: Получено {len(subscriptions)} подписок из БД")
         
         result = []
-        for i, subscription in enumerate(subscriptions):
-            print(f"DEBUG: Обрабатываем подписку {i+1}/{len(subscriptions)}, id={subscription.id}")
+        for subscription in subscriptions:
             try:
                 subscription_data = SubscriptionWithDetailsResponse(
                     id=subscription.id,
@@ -226,14 +241,14 @@ class SubscriptionService:
                     user_name=subscription.user.name
                 )
                 result.append(subscription_data)
-                print(f"DEBUG: Подписка {subscription.id} успешно обработана")
-            except Exception as e:
-                print(f"ERROR: Ошибка при обработке подписки {subscription.id}: {e}")
-                print(f"ERROR: Данные подписки: id={subscription.id}, child_id={subscription.child_id}, plan_id={subscription.plan_id}")
-                print(f"ERROR: is_paused={subscription.is_paused}, status={subscription.status}")
-                raise e
-        
-        print(f"DEBUG: Возвращаем {len(result)} обработанных подписок")
+            except Exception:
+                logger.exception(
+                    "Ошибка при обработке подписки %s (child_id=%s, plan_id=%s, is_paused=%s)",
+                    subscription.id, subscription.child_id, subscription.plan_id, subscription.is_paused,
+                )
+                raise
+        
+        logger.debug("get_user_subscriptions: user_id=%s, подписок %s", user_id, len(result))
         return result
 
     def get_subscription_by_id(self, subscription_id: int) -> Optional[Subscription]:
@@ -262,14 +277,17 @@ class SubscriptionService:
 
     def pause_subscription(self, subscription_id: int, user_id: int) -> bool:
         """Приостанавливает подписку по ID (без возврата средств)"""
+        # Проверяем права доступа одним запросом, до загрузки подписки
+        owner_id = self.ownership.get_subscription_owner_id(subscription_id)
+        if owner_id is None:
+            raise ValueError(f"Подписка с ID {subscription_id} не найдена")
+        if owner_id != user_id:
+            raise ValueError("Нет доступа к этой подписке")
+        
         subscription = self.subscription_repo.get_by_id(subscription_id)
         if not subscription:
             raise ValueError(f"Подписка с ID {subscription_id} не найдена")
         
-        # Проверяем права доступа
-        if subscription.user.id != user_id:
-            raise ValueError("Нет доступа к этой подписке")
-        
         # Проверяем что подписка активна
         if subscription.status != SubscriptionStatus.ACTIVE:
             raise ValueError("Можно приостановить только активную подписку")
@@ -285,14 +303,17 @@ class SubscriptionService:
 
     def resume_subscription(self, subscription_id: int, user_id: int) -> bool:
         """Возобновляет приостановленную подписку по ID"""
+        # Проверяем права доступа одним запросом, до загрузки подписки
+        owner_id = self.ownership.get_subscription_owner_id(subscription_id)
+        if owner_id is None:
+            raise ValueError(f"Подписка с ID {subscription_id} не найдена")
+        if owner_id != user_id:
+            raise ValueError("Нет доступа к этой подписке")
+        
         subscription = self.subscription_repo.get_by_id(subscription_id)
         if not subscription:
             raise ValueError(f"Подписка с ID {subscription_id} не найдена")
         
-        # Проверяем права доступа
-        if subscription.user.id != user_id:
-            raise ValueError("Нет доступа к этой подписке")
-        
         # Проверяем что подписка приостановлена
         if subscription.status != SubscriptionStatus.PAUSED:
             raise ValueError("Можно возобновить только приостановленную подписку")
@@ -321,12 +342,13 @@ class SubscriptionService:
             return None
         
         # Валидация данных ПЕРЕД обновлением
+        owner_id = self.ownership.get_subscription_owner_id(subscription_id)
         if update_data.child_id is not None:
-            child = self.child_repo.get_by_id(update_data.child_id)
-            if not child:
+            child_owner_id = self.ownership.get_child_owner_id(update_data.child_id)
+            if child_owner_id is None:
                 raise ValueError(f"Ребенок с ID {update_data.child_id} не найден")
             # Проверяем, что ребенок принадлежит тому же пользователю
-            if child.parent_id != subscription.user.id:
+            if child_owner_id != owner_id:
                 raise ValueError("Ребенок не принадлежит владельцу подписки")
         
         if update_data.plan_id is not None:
@@ -339,7 +361,7 @@ class SubscriptionService:
             if not delivery_info:
                 raise ValueError(f"Адрес доставки с ID {update_data.delivery_info_id} не найден")
             # Проверяем, что адрес принадлежит пользователю
-            if delivery_info.user_id != subscription.user.id:
+            if delivery_info.user_id != owner_id:
                 raise ValueError("Адрес доставки не принадлежит пользователю")
         
         # Обновляем только переданные поля (кроме status - он вычисляется)
@@ -1,18 +1,159 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from repositories.toy_box_repository import ToyBoxRepository
 from repositories.subscription_repository import SubscriptionRepository
-from repositories.child_repository import ChildRepository
-from repositories.plan_toy_configuration_repository import PlanToyConfigurationRepository
+from repositories.child_repository import ChildRepository, ChildLoad
+from services.ownership_service import OwnershipService
 from repositories.toy_category_repository import ToyCategoryRepository
 from repositories.delivery_info_repository import DeliveryInfoRepository
-from models.toy_box import ToyBox, ToyBoxReview, ToyBoxStatus
-from models.subscription import SubscriptionStatus
-from schemas.toy_box_schemas import NextBoxResponse, NextBoxItemResponse
+from repositories.async_toy_box_repository import AsyncToyBoxRepository
+from models.toy_box import ToyBox, ToyBoxReview, ToyBoxStatus, STATUS_TRANSITIONS
+from models.subscription import SubscriptionStatus, _as_utc
+from schemas.toy_box_schemas import (
+    NextBoxResponse, NextBoxItemResponse, BoxStatusTransitionResponse, BoxStatusTransitionReject
+)
 from core.config import settings
-from typing import List, Optional, Dict, Any
-from datetime import timedelta, date
-from services.inventory_service import InventoryService
+from typing import List, Optional, Dict, Any, Set, Tuple
+from datetime import timedelta, date, datetime, timezone
+from services.inventory_service import InventoryService, InventoryLimits
 from services.category_mapping_service import CategoryMappingService
+from services.subscription_plan_service import get_plan_configs_by_plan
+from core.next_box_preview_cache import get_next_box_preview_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _history_page(boxes: List[ToyBox], limit: int) -> Tuple[List[ToyBox], Optional[int]]:
+    """Обрезает выборку limit + 1 до страницы; курсор - ID последнего набора, если есть еще"""
+    if len(boxes) > limit:
+        boxes = boxes[:limit]
+        return boxes, boxes[-1].id
+    return boxes, None
+
+
+def build_next_box_response(plan_configs, current_box: Optional[ToyBox]) -> NextBoxResponse:
+    """Собрать следующий набор из конфигураций плана (с загруженными категориями) и текущего набора"""
+    # Рассчитываем даты и время ТОЛЬКО на основе текущего набора
+    if current_box and current_box.return_date:
+        # Есть текущий набор - можем рассчитать следующий
+        next_delivery_date = current_box.return_date + timedelta(days=settings.NEXT_DELIVERY_PERIOD)
+        next_return_date = next_delivery_date + timedelta(days=settings.RENTAL_PERIOD)
+        delivery_time = current_box.delivery_time
+        return_time = current_box.return_time
+    else:
+        # Нет текущего набора - нельзя рассчитать даты
+        next_delivery_date = None
+        next_return_date = None
+        delivery_time = None
+        return_time = None
+
+    # Формируем состав следующего набора
+    items = []
+    for config in plan_configs:
+        category = config.category
+        if category:
+            items.append(NextBoxItemResponse(
+                category_id=category.id,
+                category_name=category.name,
+                category_icon=category.icon,
+                quantity=config.quantity
+            ))
+
+    return NextBoxResponse(
+        items=items,
+        delivery_date=next_delivery_date,
+        return_date=next_return_date,
+        delivery_time=delivery_time,
+        return_time=return_time,
+        message="Следующий набор будет создан после возврата текущего"
+    )
+
+
+def build_interest_tags(child) -> Optional[List[str]]:
+    """Теги набора из интересов и навыков ребенка"""
+    tags = []
+    
+    # Добавляем интересы ребенка
+    if child.interests:
+        for interest in child.interests:
+            tags.append(interest.name)
+    
+    # Добавляем навыки ребенка
+    if child.skills:
+        for skill in child.skills:
+            tags.append(skill.name)
+    
+    # Возвращаем список тегов (JSONB автоматически сериализует в JSON)
+    return tags if tags else None
+
+
+def compose_box_items(total_toys: int, scored_categories: List[Dict[str, Any]],
+                      recent_categories: Set[int], inventory_limits: InventoryLimits) -> List[Dict[str, Any]]:
+    """Распределить игрушки набора по категориям без обращений к БД
+
+    scored_categories - результат CategoryMappingService.get_categories_with_scores
+    (список изменяется: применяется штраф за повторения).
+    """
+    max_categories = 6  # X = 6 (максимальное разнообразие)
+    
+    # Применяем штраф за повторения
+    for scored_category in scored_categories:
+        if scored_category["category_id"] in recent_categories:
+            scored_category["score"] *= 0.3  # Штраф 70%
+    
+    # Сортируем по скорингу
+    scored_categories.sort(key=lambda x: x["score"], reverse=True)
+    
+    # Распределяем игрушки
+    items_data = []
+    remaining_toys = total_toys
+    used_categories = 0
+    
+    for scored_category in scored_categories:
+        if remaining_toys <= 0 or used_categories >= max_categories:
+            break
+            
+        category_id = scored_category["category_id"]
+        max_count = inventory_limits.get_max_count(category_id)
+        
+        # Определяем количество для этой категории
+        if remaining_toys <= max_count:
+            quantity = remaining_toys
+        else:
+            quantity = max_count
+        
+        if quantity > 0:
+            items_data.append({
+                "toy_category_id": category_id,
+                "quantity": quantity
+            })
+            remaining_toys -= quantity
+            used_categories += 1
+    
+    # Если остались игрушки, распределяем по оставшимся категориям
+    if remaining_toys > 0:
+        # Скоринг уже содержит все категории - повторно загружать их не нужно
+        all_category_ids = sorted(scored["category_id"] for scored in scored_categories)
+        for category_id in all_category_ids:
+            if remaining_toys <= 0:
+                break
+                
+            # Проверяем, не использовали ли уже эту категорию
+            if any(item["toy_category_id"] == category_id for item in items_data):
+                continue
+            
+            max_count = inventory_limits.get_max_count(category_id)
+            quantity = min(remaining_toys, max_count)
+            
+            if quantity > 0:
+                items_data.append({
+                    "toy_category_id": category_id,
+                    "quantity": quantity
+                })
+                remaining_toys -= quantity
+    
+    return items_data
 
 
 class ToyBoxService:
@@ -21,7 +162,6 @@ class ToyBoxService:
         self.box_repo = ToyBoxRepository(db)
         self.subscription_repo = SubscriptionRepository(db)
         self.child_repo = ChildRepository(db)
-        self.config_repo = PlanToyConfigurationRepository(db)
         self.category_repo = ToyCategoryRepository(db)
         self.delivery_repo = DeliveryInfoRepository(db)
         self.inventory_service = InventoryService(db)
@@ -38,7 +178,7 @@ class ToyBoxService:
             raise ValueError(f"Подписка {subscription_id} не активна")
 
         # Получаем ребенка и его интересы/навыки
-        child = self.child_repo.get_by_id(child_id=subscription.child_id)
+        child = self.child_repo.get_by_id(subscription.child_id, ChildLoad.TAGS)
         if not child:
             raise ValueError(f"Не найден ребенок для создания бокса при подписке {subscription.id}")
 
@@ -58,8 +198,8 @@ class ToyBoxService:
         
         return_date = delivery_date + timedelta(days=settings.RENTAL_PERIOD)
 
-        # Генерируем состав набора на основе интересов и навыков
-        items_data = self._generate_box_items(child, subscription.plan_id)
+        # Генерируем состав набора на основе интересов и навыков и резервируем его на складе
+        items_data = self._reserve_box_items(child, subscription.plan_id)
         
         # Создаем теги на основе интересов и навыков ребенка
         interest_tags = self._generate_interest_tags(child)
@@ -80,35 +220,48 @@ class ToyBoxService:
         
         # Добавляем состав набора
         self.box_repo.add_items(box.id, items_data)
+        self.inventory_service.record_box_reservations([box.id], [items_data])
         
         return box
 
     def _generate_interest_tags(self, child) -> List[str]:
         """Генерировать теги на основе интересов и навыков ребенка"""
-        tags = []
-        
-        # Добавляем интересы ребенка
-        if child.interests:
-            for interest in child.interests:
-                tags.append(interest.name)
-        
-        # Добавляем навыки ребенка
-        if child.skills:
-            for skill in child.skills:
-                tags.append(skill.name)
-        
-        # Возвращаем список тегов (JSONB автоматически сериализует в JSON)
-        return tags if tags else None
+        return build_interest_tags(child)
+
+    def _reserve_box_items(self, child, plan_id: int) -> List[Dict[str, Any]]:
+        """Сгенерировать состав и атомарно зарезервировать его на складе
+
+        Если параллельный набор уже забрал остаток категории, состав
+        пересобирается без нее (снимок остатков может быть устаревшим).
+        Если зарезервировать нечего, набор все равно создается (как и до учета
+        резервов) - уже оплаченная подписка не должна остаться без набора, а
+        пустой состав дозаполняется после пополнения склада.
+        """
+        excluded_categories: Set[int] = set()
+        for _ in range(settings.BOX_RESERVATION_ATTEMPTS):
+            items_data = self._generate_box_items(child, plan_id, excluded_categories)
+            if not items_data:
+                break
+            failed = self.inventory_service.reserve_items(items_data)
+            if not failed:
+                return items_data
+            excluded_categories |= failed
+        
+        logger.warning(
+            "Недостаточно остатков на складе для набора ребенка %s, набор создан без состава "
+            "и требует пополнения склада", child.id
+        )
+        return []
 
-    def _generate_box_items(self, child, plan_id: int) -> List[Dict[str, Any]]:
+    def _generate_box_items(self, child, plan_id: int,
+                            excluded_categories: Optional[Set[int]] = None) -> List[Dict[str, Any]]:
         """Генерировать состав набора на основе интересов и навыков ребенка"""
         # Получаем конфигурацию плана для определения общего количества игрушек
-        plan_configs = self.config_repo.get_by_plan_id(plan_id)
+        plan_configs = get_plan_configs_by_plan(self.db).get(plan_id)
         if not plan_configs:
             raise ValueError(f"Конфигурация для плана {plan_id} не найдена")
         
         total_toys = sum(config.quantity for config in plan_configs)
-        max_categories = 6  # X = 6 (максимальное разнообразие)
         
         # Получаем историю наборов ребенка для избежания повторений
         recent_boxes = self.box_repo.get_boxes_by_child(child.id, limit=3)
@@ -118,69 +271,21 @@ class ToyBoxService:
                 recent_categories.add(item.toy_category_id)
         
         # Получаем категории с скорингом
-        child_interests = list(child.interests) if child.interests else []
-        child_skills = list(child.skills) if child.skills else []
+        child_interest_ids = [interest.id for interest in child.interests] if child.interests else []
+        child_skill_ids = [skill.id for skill in child.skills] if child.skills else []
         
         scored_categories = self.mapping_service.get_categories_with_scores(
-            child_interests, child_skills
+            child_interest_ids, child_skill_ids
         )
+        if excluded_categories:
+            scored_categories = [
+                scored for scored in scored_categories if scored["category_id"] not in excluded_categories
+            ]
         
-        # Применяем штраф за повторения
-        for scored_category in scored_categories:
-            if scored_category["category"].id in recent_categories:
-                scored_category["score"] *= 0.3  # Штраф 70%
+        # Лимиты по всем категориям - одним запросом (или из кэшированного снимка)
+        inventory_limits = self.inventory_service.get_limits_snapshot()
         
-        # Сортируем по скорингу
-        scored_categories.sort(key=lambda x: x["score"], reverse=True)
-        
-        # Распределяем игрушки
-        items_data = []
-        remaining_toys = total_toys
-        used_categories = 0
-        
-        for scored_category in scored_categories:
-            if remaining_toys <= 0 or used_categories >= max_categories:
-                break
-                
-            category = scored_category["category"]
-            max_count = self.inventory_service.get_max_count(category.id)
-            
-            # Определяем количество для этой категории
-            if remaining_toys <= max_count:
-                quantity = remaining_toys
-            else:
-                quantity = max_count
-            
-            if quantity > 0:
-                items_data.append({
-                    "toy_category_id": category.id,
-                    "quantity": quantity
-                })
-                remaining_toys -= quantity
-                used_categories += 1
-        
-        # Если остались игрушки, распределяем по оставшимся категориям
-        if remaining_toys > 0:
-            all_categories = self.category_repo.get_all()
-            for category in all_categories:
-                if remaining_toys <= 0:
-                    break
-                    
-                # Проверяем, не использовали ли уже эту категорию
-                if any(item["toy_category_id"] == category.id for item in items_data):
-                    continue
-                
-                max_count = self.inventory_service.get_max_count(category.id)
-                quantity = min(remaining_toys, max_count)
-                
-                if quantity > 0:
-                    items_data.append({
-                        "toy_category_id": category.id,
-                        "quantity": quantity
-                    })
-                    remaining_toys -= quantity
-        
-        return items_data
+        return compose_box_items(total_toys, scored_categories, recent_categories, inventory_limits)
 
     def get_current_box_by_child(self, child_id: int) -> Optional[ToyBox]:
         """Получить текущий набор ребёнка"""
@@ -188,90 +293,79 @@ class ToyBoxService:
 
     def get_current_box_by_user(self, user_id: int) -> Optional[ToyBox]:
         """Получить текущий набор для любого ребёнка пользователя"""
-        children = self.child_repo.get_by_parent_id(user_id)
+        children = self.child_repo.get_by_parent_id(user_id, ChildLoad.OWNERSHIP)
         
+        # Текущие наборы всех детей одним запросом, приоритет - по порядку детей
+        current_boxes = self.box_repo.get_current_boxes_by_child_ids([child.id for child in children])
         for child in children:
-            current_box = self.get_current_box_by_child(child.id)
+            current_box = current_boxes.get(child.id)
             if current_box:
                 return current_box
         
         return None
 
     def generate_next_box_for_child(self, child_id: int) -> Optional[NextBoxResponse]:
-        """Генерировать следующий набор на лету (не сохраняется в БД)"""
-        child = self.child_repo.get_by_id(child_id)
-        print(f"generate_next_box_for_child: Child: {child}")
-        if not child:
+        """Генерировать следующий набор на лету (не сохраняется в БД)
+
+        Доступ пользователя к ребенку проверяет вызывающий (check_child_access).
+        Результат кэшируется по ребенку (get_next_box_preview_cache) и сбрасывается
+        при изменении наборов, подписок, планов и категорий, а также удалении ребенка.
+        """
+        # Существование ребенка проверяется до кэша: превью удаленного ребенка не отдается
+        if OwnershipService(self.db).get_child_owner_id(child_id) is None:
             raise ValueError(f"Ребёнок {child_id} не найден")
 
+        preview_cache = get_next_box_preview_cache()
+        if preview_cache is not None:
+            hit, preview = preview_cache.get(child_id)
+            if hit:
+                return preview
+
         # Получаем активную подписку
         subscription = self.subscription_repo.get_active_by_child_id(child_id)
-        print(f"generate_next_box_for_child: Subscription: {subscription}")
         if not subscription:
+            logger.debug("generate_next_box_for_child: у ребенка %s нет активной подписки", child_id)
+            if preview_cache is not None:
+                preview_cache.set(child_id, None)
             return None
 
-        # Получаем конфигурацию плана
-        plan_configs = self.config_repo.get_by_plan_id(subscription.plan_id)
-        print(f"generate_next_box_for_child: Plan configs: {plan_configs}")
+        # Превью не должно пережить истечение подписки
+        ttl = None
+        if subscription.expires_at is not None:
+            ttl = (_as_utc(subscription.expires_at) - datetime.now(timezone.utc)).total_seconds()
+
+        # Получаем конфигурацию плана (из кэша справочников)
+        plan_configs = get_plan_configs_by_plan(self.db).get(subscription.plan_id)
         if not plan_configs:
+            logger.debug("generate_next_box_for_child: нет конфигурации плана %s", subscription.plan_id)
+            if preview_cache is not None:
+                preview_cache.set(child_id, None, ttl)
             return None
 
         # Рассчитываем даты и берем время из текущего набора
         current_box = self.get_current_box_by_child(child_id)
-        print(f"generate_next_box_for_child: Current box: {current_box}")
-        
-        # Рассчитываем даты и время ТОЛЬКО на основе текущего набора
-        if current_box and current_box.return_date:
-            # Есть текущий набор - можем рассчитать следующий
-            next_delivery_date = current_box.return_date + timedelta(days=settings.NEXT_DELIVERY_PERIOD)
-            next_return_date = next_delivery_date + timedelta(days=settings.RENTAL_PERIOD)
-            delivery_time = current_box.delivery_time
-            return_time = current_box.return_time
-        else:
-            # Нет текущего набора - нельзя рассчитать даты
-            next_delivery_date = None
-            next_return_date = None
-            delivery_time = None
-            return_time = None
-
-        # Формируем состав следующего набора
-        items = []
-        for config in plan_configs:
-            category = self.category_repo.get_by_id(config.category_id)
-            if category:
-                items.append(NextBoxItemResponse(
-                    category_id=category.id,
-                    category_name=category.name,
-                    category_icon=category.icon,
-                    quantity=config.quantity
-                ))
-
-        next_box_response = NextBoxResponse(
-            items=items,
-            delivery_date=next_delivery_date,
-            return_date=next_return_date,
-            delivery_time=delivery_time,
-            return_time=return_time,
-            message="Следующий набор будет создан после возврата текущего"
+        next_box_response = build_next_box_response(plan_configs, current_box)
+        logger.debug(
+            "generate_next_box_for_child: child=%s subscription=%s current_box=%s items=%s",
+            child_id, subscription.id, current_box.id if current_box else None, len(next_box_response.items),
         )
-        
-        print(f"generate_next_box_for_child: Next box response: {next_box_response}")
+        if preview_cache is not None:
+            preview_cache.set(child_id, next_box_response, ttl)
         return next_box_response
 
     def add_review(self, box_id: int, user_id: int, rating: int, comment: Optional[str] = None) -> Dict[str, Any]:
         """Добавить отзыв к набору"""
-        # Проверяем права доступа
-        box = self.box_repo.get_by_id(box_id)
-        if not box:
+        # Проверяем права доступа: статус и владелец читаются скалярными запросами, без загрузки набора
+        box_status = self.box_repo.get_statuses([box_id]).get(box_id)
+        if box_status is None:
             return {"success": False, "error": "Набор не найден"}
 
         # Проверяем, что пользователь является родителем ребёнка
-        child = self.child_repo.get_by_id(box.child_id)
-        if not child or child.parent_id != user_id:
+        if OwnershipService(self.db).get_box_owner_id(box_id) != user_id:
             return {"success": False, "error": "Нет прав доступа к этому набору"}
 
         # Проверяем статус набора (только доставленные можно оценивать)
-        if box.status != ToyBoxStatus.DELIVERED:
+        if box_status != ToyBoxStatus.DELIVERED:
             return {"success": False, "error": "Отзыв можно оставить только на доставленный набор"}
 
         # Проверяем, что пользователь ещё не оставлял отзыв на этот набор
@@ -298,77 +392,99 @@ class ToyBoxService:
         """Получить все отзывы для набора"""
         return self.box_repo.get_reviews_by_box(box_id)
 
-    def get_box_history_by_user(self, user_id: int, limit: int = 10, statuses: Optional[List[ToyBoxStatus]] = None) -> List[ToyBox]:
-        """Получить историю наборов для всех детей пользователя"""
-        children = self.child_repo.get_by_parent_id(user_id)
-        
-        all_boxes = []
-        for child in children:
-            boxes = self.box_repo.get_boxes_by_child(child.id, limit)
-            all_boxes.extend(boxes)
-        
-        # Фильтруем по статусам если указаны
-        if statuses:
-            all_boxes = [box for box in all_boxes if box.status in statuses]
-        
-        # Сортируем по дате создания
-        all_boxes.sort(key=lambda x: x.created_at, reverse=True)
-        
-        return all_boxes[:limit]
+    def get_box_history_page(self, user_id: int, limit: int = 10, statuses: Optional[List[ToyBoxStatus]] = None,
+                             after_id: Optional[int] = None) -> Tuple[List[ToyBox], Optional[int]]:
+        """Страница истории наборов всех детей пользователя и курсор следующей страницы
+
+        Один запрос наборов (фильтр статусов и сортировка в БД) и пакетные запросы
+        состава и отзывов, независимо от числа детей и размера страницы. История - только чтение, запросы идут в реплику.
+        """
+        # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+        boxes = self.box_repo.get_history_page(user_id, limit + 1, statuses, after_id)
+        return _history_page(boxes, limit)
 
     def update_box_status(self, box_id: int, status: ToyBoxStatus) -> Optional[ToyBox]:
-        """Обновить статус набора"""
-        return self.box_repo.update_status(box_id, status)
+        """Обновить статус набора (при возврате резерв игрушек освобождается)"""
+        box = self.box_repo.update_status(box_id, status)
+        if box and status == ToyBoxStatus.RETURNED:
+            self.inventory_service.release_box_reservations([box.id])
+        return box
+
+    def transition_boxes_status(self, box_ids: List[int], status: ToyBoxStatus) -> BoxStatusTransitionResponse:
+        """Перевести наборы в статус по правилам STATUS_TRANSITIONS
+
+        Допустимость перехода проверяется в самом UPDATE (условие на текущий статус),
+        поэтому вся партия обрабатывается одним запросом; причины отказов читаются
+        отдельным запросом только для отклоненных наборов.
+        """
+        box_ids = list(dict.fromkeys(box_ids))
+        updated_ids = self.box_repo.transition_status(box_ids, status, STATUS_TRANSITIONS.get(status, []))
+        if status == ToyBoxStatus.RETURNED and updated_ids:
+            self.inventory_service.release_box_reservations(updated_ids)
+
+        updated = set(updated_ids)
+        rejected_ids = [box_id for box_id in box_ids if box_id not in updated]
+        current_statuses = self.box_repo.get_statuses(rejected_ids)
+        rejects = []
+        for box_id in rejected_ids:
+            current = current_statuses.get(box_id)
+            if current is None:
+                reason = "Набор не найден"
+            elif current == status:
+                reason = "Набор уже в этом статусе"
+            else:
+                reason = f"Недопустимый переход {current.value} -> {status.value}"
+            rejects.append(BoxStatusTransitionReject(box_id=box_id, current_status=current, reason=reason))
+
+        if rejects:
+            logger.info("Перевод наборов в %s: изменено %s, отклонено %s", status.value, len(updated_ids), len(rejects))
+        return BoxStatusTransitionResponse(
+            requested=len(box_ids),
+            updated=len(updated_ids),
+            box_ids=updated_ids,
+            rejects=rejects
+        )
 
     def sync_active_boxes_with_delivery_date(self, delivery_info_id: int, user_id: int, new_date: date) -> List[ToyBox]:
         """Синхронизировать активные наборы с обновленной датой доставки"""
-        from datetime import timedelta
-        
-        # Получаем только активные наборы пользователя с этим delivery_info_id
-        active_boxes = self.box_repo.get_active_boxes_by_delivery_info_id(delivery_info_id, user_id)
-        
-        updated_boxes = []
-        for box in active_boxes:
-            # Рассчитываем новую дату возврата
-            return_date = new_date + timedelta(days=settings.RENTAL_PERIOD)
-            
-            # Обновляем дату доставки
-            updated_box = self.box_repo.update_delivery_date(box.id, new_date, return_date)
-            if updated_box:
-                updated_boxes.append(updated_box)
-        
-        return updated_boxes
+        return self.box_repo.update_active_boxes_delivery(delivery_info_id, user_id, {
+            "delivery_date": new_date,
+            "return_date": new_date + timedelta(days=settings.RENTAL_PERIOD),
+        })
 
     def sync_active_boxes_with_delivery_time(self, delivery_info_id: int, user_id: int, new_time: str) -> List[ToyBox]:
         """Синхронизировать активные наборы с обновленным временем доставки"""
-        
-        # Получаем только активные наборы пользователя с этим delivery_info_id
-        active_boxes = self.box_repo.get_active_boxes_by_delivery_info_id(delivery_info_id, user_id)
-        
-        updated_boxes = []
-        for box in active_boxes:
-            # Обновляем время доставки
-            updated_box = self.box_repo.update_delivery_time(box.id, new_time)
-            if updated_box:
-                updated_boxes.append(updated_box)
-        
-        return updated_boxes
+        return self.box_repo.update_active_boxes_delivery(delivery_info_id, user_id, {
+            "delivery_time": new_time,
+            "return_time": new_time,  # Используем то же время для возврата
+        })
 
     def sync_active_boxes_with_delivery_date_and_time(self, delivery_info_id: int, user_id: int, new_date: date, new_time: str) -> List[ToyBox]:
         """Синхронизировать активные наборы с обновленной датой и временем доставки"""
-        from datetime import timedelta
-        
-        # Получаем только активные наборы пользователя с этим delivery_info_id
-        active_boxes = self.box_repo.get_active_boxes_by_delivery_info_id(delivery_info_id, user_id)
-        
-        updated_boxes = []
-        for box in active_boxes:
-            # Рассчитываем новую дату возврата
-            return_date = new_date + timedelta(days=settings.RENTAL_PERIOD)
-            
-            # Обновляем дату и время доставки
-            updated_box = self.box_repo.update_delivery_date_and_time(box.id, new_date, new_time, return_date)
-            if updated_box:
-                updated_boxes.append(updated_box)
-        
-        return updated_boxes 
\ No newline at end of file
+        return self.box_repo.update_active_boxes_delivery(delivery_info_id, user_id, {
+            "delivery_date": new_date,
+            "return_date": new_date + timedelta(days=settings.RENTAL_PERIOD),
+            "delivery_time": new_time,
+            "return_time": new_time,
+        })
+
+    def shift_delivery_window(self, date_from: date, date_to: date, days: int) -> List[ToyBox]:
+        """Перенести доставки активных наборов из окна дат на days дней (например, из-за праздников)"""
+        return self.box_repo.shift_delivery_dates(date_from, date_to, days)
+
+
+class AsyncToyBoxService:
+    """Асинхронный сервис наборов для чтения (DB_ASYNC_ENABLED)"""
+    
+    def __init__(self, db: AsyncSession):
+        self.box_repo = AsyncToyBoxRepository(db)
+    
+    async def get_current_box_by_child(self, child_id: int) -> Optional[ToyBox]:
+        """Получить текущий набор ребёнка"""
+        return await self.box_repo.get_current_box_by_child(child_id)
+    
+    async def get_box_history_page(self, user_id: int, limit: int = 10, statuses: Optional[List[ToyBoxStatus]] = None,
+                                   after_id: Optional[int] = None) -> Tuple[List[ToyBox], Optional[int]]:
+        """Страница истории наборов всех детей пользователя и курсор следующей страницы"""
+        boxes = await self.box_repo.get_history_page(user_id, limit + 1, statuses, after_id)
+        return _history_page(boxes, limit)
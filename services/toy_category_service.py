@@ -1,7 +1,22 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from repositories.toy_category_repository import ToyCategoryRepository
+from repositories.async_toy_category_repository import AsyncToyCategoryRepository
 from schemas.toy_category_schemas import ToyCategoryResponse, ToyCategoriesListResponse
 from core.i18n import translate
+from core.reference_cache import get_reference_cache, CATEGORIES
+
+
+def _build_categories_response(categories, lang: str) -> ToyCategoriesListResponse:
+    category_responses = [
+        ToyCategoryResponse(
+            id=category.id,
+            name=translate(category.name, lang),
+            description=translate(category.description, lang) if category.description else None,
+            icon=category.icon
+        ) for category in categories
+    ]
+    return ToyCategoriesListResponse(categories=category_responses)
 
 
 class ToyCategoryService:
@@ -11,14 +26,22 @@ class ToyCategoryService:
         self._repository = ToyCategoryRepository(db)
     
     def get_all_categories(self, lang: str = 'ru') -> ToyCategoriesListResponse:
+        """Получить все категории игрушек (из кэша справочников)"""
+        return get_reference_cache().get_or_load(
+            CATEGORIES, f"list:{lang}",
+            lambda: _build_categories_response(self._repository.get_all(), lang)
+        )
+
+
+class AsyncToyCategoryService:
+    """Асинхронный сервис категорий игрушек (DB_ASYNC_ENABLED)"""
+    
+    def __init__(self, db: AsyncSession):
+        self._repository = AsyncToyCategoryRepository(db)
+    
+    async def get_all_categories(self, lang: str = 'ru') -> ToyCategoriesListResponse:
         """Получить все категории игрушек"""
-        categories = self._repository.get_all()
-        category_responses = [
-            ToyCategoryResponse(
-                id=category.id,
-                name=translate(category.name, lang),
-                description=translate(category.description, lang) if category.description else None,
-                icon=category.icon
-            ) for category in categories
-        ]
-        return ToyCategoriesListResponse(categories=category_responses) 
\ No newline at end of file
+        async def load():
+            return _build_categories_response(await self._repository.get_all(), lang)
+        
+        return await get_reference_cache().get_or_load_async(CATEGORIES, f"list:{lang}", load)
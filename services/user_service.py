@@ -1,4 +1,6 @@
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from repositories.async_user_repository import AsyncUserRepository
 from models.user import User
 from typing import Optional, List
 
@@ -28,4 +30,15 @@ class UserService:
     
     def get_all_users(self) -> List[User]:
         """Получает всех пользователей (для админки)"""
-        return self.db.query(User).all() 
\ No newline at end of file
+        return self.db.query(User).all()
+
+
+class AsyncUserService:
+    """Асинхронный сервис пользователей для чтения (DB_ASYNC_ENABLED)"""
+    
+    def __init__(self, db: AsyncSession):
+        self._repository = AsyncUserRepository(db)
+    
+    async def get_user_by_id(self, user_id: int) -> Optional[User]:
+        """Получает пользователя по ID"""
+        return await self._repository.get_by_id(user_id)